@@ -0,0 +1,160 @@
+# Alarmo/alarmo.py
+"""
+Command line entry point: python -m alarmo <command>
+
+Command modules (and tkinter for the GUI) are imported inside each
+handler so headless commands never pay for the GUI.
+"""
+import argparse
+import sys
+
+
+def _cmd_migrate(args) -> int:
+    from modules.storage import migrate_json_to_sqlite
+    counts = migrate_json_to_sqlite(args.json, args.history, args.sqlite)
+    print(f"Migrated {counts['alarms']} alarms and {counts['history']} history entries into {args.sqlite}")
+    return 0
+
+
+def _cmd_import(args) -> int:
+    from modules.alarmIO import guess_format, read_records
+    from modules.alarmManager import AlarmManager
+    fmt = args.format or guess_format(args.file)
+    manager = AlarmManager(args.db)
+    try:
+        if args.file == "-":
+            created = manager.import_alarms(read_records(sys.stdin, fmt))
+        else:
+            with open(args.file, newline='') as f:
+                created = manager.import_alarms(read_records(f, fmt))
+    except ValueError as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        manager.close()
+    print(f"Imported {len(created)} alarms")
+    return 0
+
+
+def _cmd_export(args) -> int:
+    from modules.alarmIO import guess_format
+    from modules.alarmManager import AlarmManager
+    fmt = args.format or guess_format(args.file)
+    manager = AlarmManager(args.db)
+    try:
+        if args.file == "-":
+            manager.export_alarms(sys.stdout, fmt)
+        else:
+            with open(args.file, 'w', newline='') as f:
+                count = manager.export_alarms(f, fmt)
+            print(f"Exported {count} alarms to {args.file}")
+    finally:
+        manager.close()
+    return 0
+
+
+def _cmd_daemon(args) -> int:
+    from modules.daemon import run_daemon
+    return run_daemon(args.db, args.history, sound=args.sound, http_port=args.http_port,
+                      host=args.host, unix_socket=args.unix_socket, stats_file=args.stats_file,
+                      stats_interval=args.stats_interval, notify_log=args.notify_log, webhook=args.webhook,
+                      shards=args.shards)
+
+
+def _cmd_gui(args) -> int:
+    import time
+    started = time.perf_counter()
+    import tkinter as tk
+    from gui.alarmo_app import AlarmoApp
+    from modules.notifier import LogFileSink, WebhookSink
+    sinks = []
+    if args.notify_log:
+        sinks.append(LogFileSink(args.notify_log))
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook))
+    metrics = None
+    if args.stats_file:
+        from modules.metrics import Metrics
+        metrics = Metrics()
+        metrics.start_writer(args.stats_file, args.stats_interval)
+    root = tk.Tk()
+    app = AlarmoApp(root, metrics=metrics, sinks=sinks, startup_report=args.startup_report, started=started,
+                    shards=args.shards)
+    root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    root.mainloop()
+    return 0
+
+
+def _add_db_argument(parser: argparse.ArgumentParser):
+    parser.add_argument("--db", default="database/alarms.json",
+                        help="alarms database (.json, or .db/.sqlite for SQLite)")
+
+
+def _add_stats_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--stats-file", help="collect timing metrics and write them to this JSON file")
+    parser.add_argument("--stats-interval", type=float, default=60.0,
+                        help="seconds between stats file writes (default 60)")
+
+
+def _add_notify_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--notify-log", help="also append each triggered alarm to this JSONL file")
+    parser.add_argument("--webhook", help="also POST triggered alarms to this local URL")
+
+
+def _add_shards_argument(parser: argparse.ArgumentParser):
+    parser.add_argument("--shards", type=int, default=0,
+                        help="schedule alarms in this many worker processes split by time of day (default: in-process)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="alarmo", description="Alarmo - Time Management Tool")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="copy JSON alarms and history into a SQLite database")
+    migrate.add_argument("--json", default="database/alarms.json", help="source alarms file")
+    migrate.add_argument("--history", default="database/history.jsonl", help="source history log")
+    migrate.add_argument("--sqlite", default="database/alarms.db", help="target SQLite database")
+    migrate.set_defaults(func=_cmd_migrate)
+
+    import_cmd = commands.add_parser("import", help="bulk-create alarms from a CSV or JSONL file")
+    import_cmd.add_argument("file", help="input file, or - for stdin")
+    import_cmd.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    _add_db_argument(import_cmd)
+    import_cmd.set_defaults(func=_cmd_import)
+
+    export_cmd = commands.add_parser("export", help="write every alarm to a CSV or JSONL file")
+    export_cmd.add_argument("file", help="output file, or - for stdout")
+    export_cmd.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    _add_db_argument(export_cmd)
+    export_cmd.set_defaults(func=_cmd_export)
+
+    daemon = commands.add_parser("daemon", help="run the alarm engine headless, without tkinter")
+    _add_db_argument(daemon)
+    daemon.add_argument("--history", default="database/history.jsonl", help="history log (JSON storage only)")
+    daemon.add_argument("--sound", action="store_true", help="also play the alarm sound")
+    daemon.add_argument("--http-port", type=int, help="serve the control API on this localhost port")
+    daemon.add_argument("--host", default="127.0.0.1", help="address for --http-port")
+    daemon.add_argument("--unix-socket", help="serve the control API on this Unix socket path")
+    _add_stats_arguments(daemon)
+    _add_notify_arguments(daemon)
+    _add_shards_argument(daemon)
+    daemon.set_defaults(func=_cmd_daemon)
+
+    gui = commands.add_parser("gui", help="open the desktop window (same as main.py)")
+    _add_stats_arguments(gui)
+    _add_notify_arguments(gui)
+    _add_shards_argument(gui)
+    gui.add_argument("--startup-report", action="store_true",
+                     help="print how long each startup phase took, up to the alarms being listed")
+    gui.set_defaults(func=_cmd_gui)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
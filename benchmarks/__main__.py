@@ -0,0 +1,91 @@
+"""
+Command line entry point: python -m benchmarks <command>
+
+    run      build synthetic databases and write timings to JSON
+    compare  flag regressions between two result files (exit status 1 if any)
+"""
+import argparse
+import json
+import sys
+import tempfile
+from benchmarks.compare import DEFAULT_MIN_DELTA, DEFAULT_THRESHOLD, REGRESSION, compare_results, format_report
+from benchmarks.suite import BACKENDS, DEFAULT_SIZES, run_suite
+
+
+def _cmd_run(args) -> int:
+    sizes = [int(size) for size in args.sizes.split(',')]
+    backends = args.backends.split(',')
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        print(f"Unknown backend(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if args.ops < 1:
+        print("--ops must be at least 1", file=sys.stderr)
+        return 2
+    progress = lambda message: print(message, file=sys.stderr, flush=True)
+    if args.workdir:
+        report = run_suite(args.workdir, sizes, backends, args.ops, args.budget, args.history_ratio,
+                           args.durability, not args.no_gui, args.seed, progress)
+    else:
+        with tempfile.TemporaryDirectory(prefix="alarmo-bench-") as workdir:
+            report = run_suite(workdir, sizes, backends, args.ops, args.budget, args.history_ratio,
+                               args.durability, not args.no_gui, args.seed, progress)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(report['results'])} measurements to {args.output}", file=sys.stderr)
+    return 0
+
+
+def _cmd_compare(args) -> int:
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare_results(base, new, args.statistic, args.threshold, args.min_delta)
+    print(format_report(rows, base, new))
+    return 1 if any(row[3] == REGRESSION for row in rows) else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Alarmo benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="benchmark synthetic databases and write JSON results")
+    run.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                     help="comma-separated alarm counts (default %(default)s)")
+    run.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated: json, sqlite")
+    run.add_argument("--ops", type=int, default=200, help="samples per latency measurement")
+    run.add_argument("--budget", type=float, default=5.0,
+                     help="seconds after which a latency measurement stops sampling early")
+    run.add_argument("--history-ratio", type=float, default=1.0,
+                     help="history entries to seed per alarm (default 1.0)")
+    run.add_argument("--durability", choices=("every_op", "batched"), default="every_op")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--no-gui", action="store_true", help="skip the Tk list refresh measurements")
+    run.add_argument("--workdir", help="keep the synthetic databases here instead of a temporary directory")
+    run.add_argument("-o", "--output", default="-", help="results file, or - for stdout")
+    run.set_defaults(func=_cmd_run)
+
+    compare = commands.add_parser("compare", help="compare two result files and flag regressions")
+    compare.add_argument("base", help="earlier results")
+    compare.add_argument("new", help="results to judge")
+    compare.add_argument("--statistic", default="p50", choices=("mean", "min", "p50", "p90", "p99", "max"))
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                         help="relative slowdown that counts as a regression (default %(default)s)")
+    compare.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                         help="ignore changes smaller than this many seconds (default %(default)s)")
+    compare.set_defaults(func=_cmd_compare)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
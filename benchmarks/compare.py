@@ -0,0 +1,65 @@
+"""
+Compare Module - Handles flagging regressions between two benchmark result files
+"""
+from typing import Dict, List, Tuple
+
+DEFAULT_THRESHOLD = 0.20
+# Changes smaller than this many seconds are treated as noise whatever the ratio
+DEFAULT_MIN_DELTA = 0.0001
+
+# Run settings that make two result files not directly comparable
+SETTINGS = ('durability', 'history_ratio', 'seed', 'ops', 'budget', 'python', 'platform')
+
+REGRESSION = "REGRESSION"
+IMPROVED = "improved"
+UNCHANGED = ""
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 0.001:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def compare_results(base: Dict, new: Dict, statistic: str = 'p50', threshold: float = DEFAULT_THRESHOLD,
+                    min_delta: float = DEFAULT_MIN_DELTA) -> List[Tuple[str, float, float, str]]:
+    """Return (key, base value, new value, verdict) for every measurement present in both runs"""
+    rows = []
+    base_results, new_results = base['results'], new['results']
+    for key in sorted(set(base_results) & set(new_results)):
+        before = base_results[key][statistic]
+        after = new_results[key][statistic]
+        verdict = UNCHANGED
+        if abs(after - before) >= min_delta:
+            if after > before * (1 + threshold):
+                verdict = REGRESSION
+            elif after < before * (1 - threshold):
+                verdict = IMPROVED
+        rows.append((key, before, after, verdict))
+    return rows
+
+
+def format_report(rows: List[Tuple[str, float, float, str]], base: Dict, new: Dict) -> str:
+    """Render compare_results() as a table, noting measurements only one run has"""
+    width = max([len(row[0]) for row in rows] + [11])
+    lines = []
+    for setting in SETTINGS:
+        before, after = base['meta'].get(setting), new['meta'].get(setting)
+        if before != after:
+            lines.append(f"Note: {setting} differs ({before!r} vs {after!r})")
+    lines.append(f"{'measurement':<{width}}  {'base':>10}  {'new':>10}  {'change':>8}")
+    for key, before, after, verdict in rows:
+        change = f"{(after - before) / before:+.1%}" if before else "n/a"
+        lines.append(f"{key:<{width}}  {format_duration(before):>10}  {format_duration(after):>10}  "
+                     f"{change:>8}  {verdict}".rstrip())
+    only_base = sorted(set(base['results']) - set(new['results']))
+    only_new = sorted(set(new['results']) - set(base['results']))
+    if only_base:
+        lines.append(f"Missing from new run: {', '.join(only_base)}")
+    if only_new:
+        lines.append(f"New in this run: {', '.join(only_new)}")
+    regressions = sum(1 for row in rows if row[3] == REGRESSION)
+    lines.append(f"{regressions} regression(s) in {len(rows)} measurements")
+    return "\n".join(lines)
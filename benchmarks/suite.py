@@ -0,0 +1,234 @@
+"""
+Suite Module - Handles timing AlarmManager, the scheduler, history and the GUI list at each database size
+"""
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import count, islice
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional
+from modules.alarmManager import AlarmManager
+from modules.timeUtils import TimeChecker
+from benchmarks.synthetic import build_database
+
+BACKENDS = {'json': 'alarms.json', 'sqlite': 'alarms.db'}
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+# Each latency measurement stops at `ops` samples, or once it has run for
+# `budget` seconds and has at least this many samples
+MIN_SAMPLES = 5
+
+
+def summarize(samples: List[float]) -> Dict:
+    """Count, mean and percentiles of durations in seconds"""
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def quantile(q: float) -> float:
+        return ordered[min(n - 1, int(q * n))]
+    return {
+        'count': n,
+        'mean': sum(ordered) / n,
+        'min': ordered[0],
+        'p50': quantile(0.5),
+        'p90': quantile(0.9),
+        'p99': quantile(0.99),
+        'max': ordered[-1]
+    }
+
+
+def once(function: Callable) -> Dict:
+    """Time a single call"""
+    started = time.perf_counter()
+    function()
+    return summarize([time.perf_counter() - started])
+
+
+def repeat(function: Callable, ops: int, budget: float) -> Dict:
+    """Time up to `ops` calls, stopping early once `budget` seconds have been spent"""
+    samples = []
+    deadline = time.perf_counter() + budget
+    for _ in range(ops):
+        started = time.perf_counter()
+        function()
+        finished = time.perf_counter()
+        samples.append(finished - started)
+        if finished > deadline and len(samples) >= MIN_SAMPLES:
+            break
+    return summarize(samples)
+
+
+def bench_manager(manager: AlarmManager, rng: random.Random, ops: int, budget: float) -> Dict[str, Dict]:
+    """CRUD latency plus read_alarms/check_alarms tick cost and history reads"""
+    results = {}
+    ids = [alarm.id for alarm in manager.read_alarms()]
+    results['read_alarms'] = repeat(manager.read_alarms, ops, budget)
+    results['get_alarm_by_id'] = repeat(lambda: manager.get_alarm_by_id(rng.choice(ids)), ops, budget)
+
+    created = []
+
+    def create():
+        alarm = manager.create_alarm(rng.randint(1, 12), rng.randrange(60), rng.randrange(60),
+                                     rng.choice(('AM', 'PM')), "benchmark")
+        created.append(alarm.id)
+    results['create_alarm'] = repeat(create, ops, budget)
+    results['update_alarm'] = repeat(
+        lambda: manager.update_alarm(rng.choice(ids), note=f"updated n{rng.randrange(1000)}"), ops, budget)
+    # Delete what was created so every size keeps its alarm count; each delete also appends to history
+    results['delete_alarm'] = repeat(lambda: manager.delete_alarm(created.pop()), len(created), budget)
+    # The budget may stop the timed deletes early; the rest still go, untimed
+    while created:
+        manager.delete_alarm(created.pop())
+    results['flush'] = once(manager.flush)
+
+    # One-second ticks as the GUI loop used to run them, on a clock advanced per call
+    checker = TimeChecker()
+    clock = count(time.time())
+    results['check_alarms_first'] = once(lambda: checker.check_alarms(manager.read_alarms(), next(clock)))
+    results['tick'] = repeat(lambda: checker.check_alarms(manager.read_alarms(), next(clock)), ops, budget)
+    results['time_checker.load'] = once(lambda: TimeChecker().load(manager.snapshot()))
+
+    results['get_history'] = once(manager.get_history)
+    results['history_newest_20'] = repeat(lambda: list(islice(manager.iter_history(newest_first=True), 20)),
+                                          ops, budget)
+    results['search_history_first'] = once(lambda: list(manager.search_history("n1")))
+    results['search_history'] = repeat(
+        lambda: list(manager.search_history(f"n{rng.randrange(1, len(ids) + 1)}")), ops, budget)
+    return results
+
+
+def bench_gui(manager: AlarmManager, ops: int, budget: float) -> Dict[str, Dict]:
+    """Time AlarmoApp._refresh_alarm_list, including the redraw, against this manager"""
+    import tkinter as tk
+    from gui.alarm_list_view import AlarmListView
+    from gui.alarmo_app import AlarmoApp, WINDOW_HEIGHT, WINDOW_WIDTH
+
+    root = tk.Tk()
+    try:
+        root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
+        # Just the pieces _refresh_alarm_list touches, so no checker thread or sound player starts
+        app = SimpleNamespace(alarm_manager=manager)
+        app.alarm_list = AlarmListView(root, lambda alarm: AlarmoApp._format_alarm_row(app, alarm))
+        root.update()
+
+        def refresh():
+            AlarmoApp._refresh_alarm_list(app)
+            root.update()
+        return {
+            'gui.refresh_alarm_list_first': once(refresh),
+            'gui.refresh_alarm_list': repeat(refresh, ops, budget)
+        }
+    finally:
+        root.destroy()
+
+
+@contextmanager
+def virtual_display() -> Iterator[Optional[str]]:
+    """Yield a usable X display, starting Xvfb when none is set; None when there is no way to get one"""
+    if os.environ.get('DISPLAY'):
+        yield os.environ['DISPLAY']
+        return
+    xvfb = shutil.which('Xvfb')
+    if xvfb is None:
+        yield None
+        return
+    number = next(n for n in range(99, 200) if not os.path.exists(f"/tmp/.X{n}-lock"))
+    display = f":{number}"
+    process = subprocess.Popen([xvfb, display, '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 10
+        while not os.path.exists(f"/tmp/.X11-unix/X{number}") and time.time() < deadline:
+            if process.poll() is not None:
+                break
+            time.sleep(0.05)
+        if process.poll() is not None:
+            yield None
+            return
+        os.environ['DISPLAY'] = display
+        try:
+            yield display
+        finally:
+            del os.environ['DISPLAY']
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(workdir: str, sizes=DEFAULT_SIZES, backends=tuple(BACKENDS), ops: int = 200, budget: float = 5.0,
+              history_ratio: float = 1.0, durability: str = "every_op", gui: bool = True, seed: int = 1,
+              progress: Callable[[str], None] = print) -> Dict:
+    """Benchmark every backend at every size; results are keyed '<backend>/<size>/<measurement>'"""
+    if ops < 1:
+        raise ValueError("ops must be at least 1")
+    os.makedirs(workdir, exist_ok=True)
+    results = {}
+    gui_status = "disabled"
+    display_context = virtual_display() if gui else _no_display()
+    with display_context as display:
+        if gui:
+            gui_status = display or "skipped: no DISPLAY and Xvfb not found"
+        for backend in backends:
+            for size in sizes:
+                prefix = f"{backend}/{size}"
+                db_path = os.path.join(workdir, BACKENDS[backend])
+                history_path = os.path.join(workdir, "history.jsonl")
+                progress(f"{prefix}: building")
+                elapsed = build_database(db_path, history_path, size, int(size * history_ratio), seed)
+                measured = {'build': summarize([elapsed])}
+
+                progress(f"{prefix}: measuring")
+                started = time.perf_counter()
+                manager = AlarmManager(db_path, history_path, durability=durability)
+                manager.read_alarms()
+                measured['load'] = summarize([time.perf_counter() - started])
+                # Closing waits for the binary snapshot that first load started writing
+                manager.close()
+                started = time.perf_counter()
+                manager = AlarmManager(db_path, history_path, durability=durability)
+                manager.read_alarms()
+                measured['load_snapshot'] = summarize([time.perf_counter() - started])
+                try:
+                    measured.update(bench_manager(manager, random.Random(seed), ops, budget))
+                    if display:
+                        measured.update(bench_gui(manager, ops, budget))
+                finally:
+                    manager.close()
+                results.update({f"{prefix}/{name}": value for name, value in measured.items()})
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'sizes': list(sizes),
+            'backends': list(backends),
+            'ops': ops,
+            'budget': budget,
+            'history_ratio': history_ratio,
+            'durability': durability,
+            'seed': seed,
+            'gui': gui_status
+        },
+        'results': results
+    }
+
+
+@contextmanager
+def _no_display():
+    yield None
@@ -0,0 +1,226 @@
+import tkinter as tk
+import tkinter.font as tkfont
+from typing import Callable, Dict, List, Optional
+from modules.alarmRecord import Alarm
+
+# Above this many rows the list switches to virtualized rendering
+VIRTUALIZE_THRESHOLD = 2000
+
+
+class AlarmListView:
+    """Active-alarm listbox that applies row diffs instead of rebuilding
+
+    Keeps the alarms in display order with a row<->ID map. In virtualized
+    mode the Listbox only holds the rows currently on screen and the
+    scrollbar drives an offset into the full list, so the widget stays
+    the same size whatever the number of alarms.
+    """
+
+    def __init__(self, parent, formatter: Callable[[Alarm], str], on_select: Callable = None,
+                 virtualize: Optional[bool] = None, **listbox_options):
+        self.formatter = formatter
+        self.on_select = on_select
+        self.force_virtual = virtualize
+        self.virtual = bool(virtualize)
+        self.offset = 0
+        self.selected_id: Optional[int] = None
+        self._alarms: List[Alarm] = []
+        self._row_of: Dict[int, int] = {}
+
+        self.scrollbar = tk.Scrollbar(parent)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(parent, yscrollcommand=self._on_listbox_scroll, **listbox_options)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.listbox.bind('<<ListboxSelect>>', self._on_listbox_select)
+        self.listbox.bind('<MouseWheel>', self._on_mousewheel)
+        self.listbox.bind('<Button-4>', lambda e: self._scroll_virtual(-3))
+        self.listbox.bind('<Button-5>', lambda e: self._scroll_virtual(3))
+        self.listbox.bind('<Configure>', lambda e: self._render_window())
+        self.scrollbar.config(command=self._on_scrollbar)
+        self._line_height = max(1, tkfont.Font(font=self.listbox.cget('font')).metrics('linespace'))
+
+    def __len__(self) -> int:
+        return len(self._alarms)
+
+    # Model -----------------------------------------------------------------
+
+    def set_alarms(self, alarms: List[Alarm]):
+        """Replace the whole list"""
+        self._alarms = list(alarms)
+        self._row_of = {}
+        self._reindex(0)
+        if self._update_mode():
+            return
+        if self.virtual:
+            self.listbox.delete(0, tk.END)
+            self._render_window()
+        else:
+            self.listbox.delete(0, tk.END)
+            if self._alarms:
+                self.listbox.insert(tk.END, *[self.formatter(a) for a in self._alarms])
+
+    def apply(self, event: str, payload):
+        """Apply an AlarmManager change event as a row diff"""
+        if event == 'created':
+            self.insert(payload)
+        elif event == 'imported':
+            for alarm in payload:
+                self.insert(alarm, render=False)
+            self._after_bulk_change()
+        elif event == 'updated':
+            if payload.active:
+                self.update(payload)
+            else:
+                self.remove(payload.id)
+        elif event == 'deleted':
+            self.remove(payload.id)
+        elif event == 'reloaded':
+            self.set_alarms(payload)
+
+    def insert(self, alarm: Alarm, render: bool = True):
+        """Append one alarm row"""
+        if alarm.id in self._row_of:
+            self.update(alarm)
+            return
+        self._row_of[alarm.id] = len(self._alarms)
+        self._alarms.append(alarm)
+        if not render:
+            return
+        if not self.virtual and self._update_mode():
+            return
+        if self.virtual:
+            self._render_window()
+        else:
+            self.listbox.insert(tk.END, self.formatter(alarm))
+
+    def update(self, alarm: Alarm):
+        """Re-render a single changed row"""
+        row = self._row_of.get(alarm.id)
+        if row is None:
+            self.insert(alarm)
+            return
+        self._alarms[row] = alarm
+        index = row - self.offset if self.virtual else row
+        if 0 <= index < self.listbox.size():
+            self.listbox.delete(index)
+            self.listbox.insert(index, self.formatter(alarm))
+            if alarm.id == self.selected_id:
+                self.listbox.selection_set(index)
+
+    def remove(self, alarm_id: int):
+        """Drop one alarm row"""
+        row = self._row_of.pop(alarm_id, None)
+        if row is None:
+            return
+        self._alarms.pop(row)
+        self._reindex(row)
+        if alarm_id == self.selected_id:
+            self.selected_id = None
+        if self.virtual:
+            if not self._update_mode():
+                self._render_window()
+        else:
+            self.listbox.delete(row)
+
+    def id_at(self, index: int) -> Optional[int]:
+        """Map a listbox index to an alarm ID"""
+        row = index + self.offset if self.virtual else index
+        if 0 <= row < len(self._alarms):
+            return self._alarms[row].id
+        return None
+
+    def _reindex(self, start: int):
+        """Refresh the ID->row map from `start` onwards"""
+        for row in range(start, len(self._alarms)):
+            self._row_of[self._alarms[row].id] = row
+
+    def _after_bulk_change(self):
+        """Render rows appended with render=False"""
+        if not self._update_mode():
+            if self.virtual:
+                self._render_window()
+            else:
+                current = self.listbox.size()
+                rows = [self.formatter(a) for a in self._alarms[current:]]
+                if rows:
+                    self.listbox.insert(tk.END, *rows)
+
+    def _update_mode(self) -> bool:
+        """Switch between full and virtualized rendering; returns True if it re-rendered"""
+        if self.force_virtual is not None:
+            wanted = self.force_virtual
+        else:
+            wanted = len(self._alarms) > VIRTUALIZE_THRESHOLD
+        if wanted == self.virtual:
+            return False
+        self.virtual = wanted
+        self.offset = 0
+        self.set_alarms(self._alarms)
+        return True
+
+    # Virtualized rendering ---------------------------------------------------
+
+    def _visible_rows(self) -> int:
+        height = self.listbox.winfo_height()
+        if height <= 1:
+            return int(self.listbox.cget('height'))
+        return max(1, height // self._line_height)
+
+    def _render_window(self):
+        """Materialize only the rows that fit on screen"""
+        if not self.virtual:
+            return
+        visible = self._visible_rows()
+        self.offset = max(0, min(self.offset, len(self._alarms) - visible))
+        window = self._alarms[self.offset:self.offset + visible]
+        self.listbox.delete(0, tk.END)
+        if window:
+            self.listbox.insert(tk.END, *[self.formatter(a) for a in window])
+        if self.selected_id is not None:
+            row = self._row_of.get(self.selected_id)
+            if row is not None and self.offset <= row < self.offset + visible:
+                self.listbox.selection_set(row - self.offset)
+        self._update_scrollbar(visible)
+
+    def _update_scrollbar(self, visible: int):
+        total = len(self._alarms)
+        if total == 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+
+    def _scroll_virtual(self, rows: int):
+        if self.virtual:
+            self.offset += rows
+            self._render_window()
+        else:
+            self.listbox.yview_scroll(rows, 'units')
+        return 'break'
+
+    def _on_scrollbar(self, *args):
+        if not self.virtual:
+            self.listbox.yview(*args)
+            return
+        visible = self._visible_rows()
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * len(self._alarms))
+        elif args[0] == 'scroll':
+            step = visible if args[2] == 'pages' else 1
+            self.offset += int(args[1]) * step
+        self._render_window()
+
+    def _on_listbox_scroll(self, first, last):
+        # In virtualized mode the scrollbar reflects the offset, not the listbox view
+        if not self.virtual:
+            self.scrollbar.set(first, last)
+
+    def _on_mousewheel(self, event):
+        return self._scroll_virtual(-1 if event.delta > 0 else 1)
+
+    def _on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        self.selected_id = self.id_at(selection[0])
+        if self.on_select is not None and self.selected_id is not None:
+            self.on_select(self.selected_id)
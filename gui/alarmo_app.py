@@ -1,16 +1,69 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from modules.alarmManager import AlarmManager
+from modules.alarmManager import AlarmManager, validate_alarm_fields
+from modules.metrics import instrument_engine
+from modules.notifier import NotificationDispatcher
 from modules.timeUtils import TimeChecker
-from modules.soundPlayer import play_alarm_sound
+from modules.soundPlayer import SoundPlayer
+from gui.alarm_list_view import AlarmListView
+from gui.history_window import HistoryWindow
+from gui.notification_panel import NotificationPanel
 import threading
+import time
 from datetime import datetime
 import os
 
 WINDOW_WIDTH = 1200
 WINDOW_HEIGHT = 700
+LOGO_NAME = "2227930.png"
+LOGO_SUBSAMPLE = 8
+# Load the alarms anyway if the window has not been exposed by then (e.g. started minimized)
+FIRST_EXPOSE_TIMEOUT_MS = 2000
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Pre-scaled logo written on first run; PhotoImage decodes it far faster than the full-size source
+LOGO_CACHE_DIR = os.path.join(BASE_DIR, "assets", "cache")
+
+
+def load_logo():
+    """Return the title logo at 1/LOGO_SUBSAMPLE size, from the thumbnail cache when it is fresh"""
+    source = os.path.join(BASE_DIR, "assets", "assets", "sounds", LOGO_NAME)
+    if not os.path.exists(source):
+        source = os.path.join("assets", "assets", "sounds", LOGO_NAME)
+    try:
+        source_mtime = os.path.getmtime(source)
+    except OSError:
+        return None
+    cache = os.path.join(LOGO_CACHE_DIR, f"{os.path.splitext(LOGO_NAME)[0]}.x{LOGO_SUBSAMPLE}.png")
+    try:
+        if os.path.getmtime(cache) >= source_mtime:
+            return tk.PhotoImage(file=cache)
+    except (OSError, tk.TclError):
+        pass
+    image = tk.PhotoImage(file=source).subsample(LOGO_SUBSAMPLE, LOGO_SUBSAMPLE)
+    try:
+        os.makedirs(LOGO_CACHE_DIR, exist_ok=True)
+        tmp_path = cache + ".tmp"
+        image.write(tmp_path, format="png")
+        os.replace(tmp_path, cache)
+    except (OSError, tk.TclError) as e:
+        print(f"Could not cache logo thumbnail: {e}")
+    return image
+
+
 class AlarmoApp:
-    def __init__(self, root):
+    """Main window
+
+    Startup builds and paints the window first. The alarms are loaded
+    on the checker thread once the window is first exposed and drawn,
+    then handed to the list.
+    With startup_report set, the time each phase finished is printed
+    once loading is done (and recorded as metrics when enabled).
+    """
+
+    def __init__(self, root, metrics=None, sinks=None, startup_report=False, started=None, shards=0):
+        self.started = time.perf_counter() if started is None else started
+        self.startup_phases = {}
+        self.startup_report = startup_report
         self.root = root
         self.root.title("Alarmo - Time Management Tool")
         self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
@@ -18,14 +71,61 @@ class AlarmoApp:
         self.root.geometry(f"+{int(self.root.winfo_screenwidth()/2 - WINDOW_WIDTH/2)}+{int(self.root.winfo_screenheight()/2 - WINDOW_HEIGHT/2)}")
 
         self.alarm_manager = AlarmManager()
-        self.time_checker = TimeChecker()
+        if shards:
+            from modules.shardedScheduler import ShardedScheduler
+            self.time_checker = ShardedScheduler(shards)
+        else:
+            self.time_checker = TimeChecker()
+        self.sound_player = SoundPlayer()
+        self.sound_player.start()
+        # Triggers are batched into one non-modal panel; extra sinks (log file, webhook) run alongside it
+        self.notification_panel = NotificationPanel(self.root)
+        self.notifier = NotificationDispatcher([self.notification_panel] + list(sinks or []),
+                                               self.alarm_manager.format_alarm_time)
+        self.notifier.start()
+        self.metrics = metrics
+        if metrics is not None:
+            instrument_engine(metrics, self.alarm_manager, self.time_checker, self.sound_player, self.notifier)
         self.selected_alarm_id = None
         self.running = True
         self.check_thread = threading.Thread(target=self._check_alarms_loop, daemon=True)
-        self.check_thread.start()
+        self._mark_phase('engine')
         
         self._create_widgets()
+        self._mark_phase('widgets')
+        # Idle work queued now would run in the same pass that maps the window, before anything is drawn
+        self._first_expose = self.root.bind('<Expose>', self._on_first_expose, '+')
+        self.root.after(FIRST_EXPOSE_TIMEOUT_MS, self._on_first_expose)
+    
+    def _mark_phase(self, phase):
+        self.startup_phases[phase] = time.perf_counter() - self.started
+    
+    def _on_first_expose(self, event=None):
+        """Start loading once the window is on screen and its first redraw has run"""
+        if self._first_expose is None:
+            return
+        self.root.unbind('<Expose>', self._first_expose)
+        self._first_expose = None
+        # The exposure queued the widgets' redraws as idle work; finish them before counting the frame
+        self.root.update_idletasks()
+        self._mark_phase('first_frame')
+        self.check_thread.start()
+    
+    def _on_data_loaded(self):
+        """Tk side of startup once the checker thread has loaded the alarms"""
+        if not self.running:
+            return
         self._refresh_alarm_list()
+        self.alarm_manager.add_listener(self._on_alarms_changed)
+        # Other Alarmo processes' edits arrive as change events
+        self.alarm_manager.watch_storage()
+        self._mark_phase('alarms_loaded')
+        if self.metrics is not None:
+            for phase, elapsed in self.startup_phases.items():
+                self.metrics.observe(f"startup.{phase}", elapsed)
+        if self.startup_report:
+            phases = ", ".join(f"{phase} {elapsed * 1000:.1f}ms" for phase, elapsed in self.startup_phases.items())
+            print(f"Startup: {phases}", flush=True)
     
     def _create_widgets(self):
         main_frame = tk.Frame(self.root, bg="#f0f0f0")
@@ -35,21 +135,9 @@ class AlarmoApp:
         title_frame = tk.Frame(left_frame, bg="#ffffff")
         title_frame.pack(pady=20)
         try:
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            logo_path = os.path.join(base_dir, "assets", "assets", "sounds", "2227930.png")
-            
-            if os.path.exists(logo_path):
-                logo_image = tk.PhotoImage(file=logo_path)
-                logo_image = logo_image.subsample(8, 8)
-                self.logo_image = logo_image
-            else:
-                logo_path_rel = os.path.join("assets", "assets", "sounds", "2227930.png")
-                if os.path.exists(logo_path_rel):
-                    logo_image = tk.PhotoImage(file=logo_path_rel)
-                    logo_image = logo_image.subsample(8, 8)
-                    self.logo_image = logo_image
-                else:
-                    logo_image = None
+            logo_image = load_logo()
+            self.logo_image = logo_image
+            self._mark_phase('logo')
         except Exception as e:
             print(f"Could not load logo image: {e}")
             logo_image = None
@@ -185,23 +273,18 @@ class AlarmoApp:
         history_button.pack(side=tk.LEFT, padx=5)
         list_frame = tk.Frame(right_frame, bg="#ffffff")
         list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.alarm_listbox = tk.Listbox(
+        self.alarm_list = AlarmListView(
             list_frame,
+            formatter=self._format_alarm_row,
+            on_select=self._on_alarm_select,
             font=("Arial", 14),
             bg="#e0e0e0",
             relief=tk.SUNKEN,
             borderwidth=2,
-            yscrollcommand=scrollbar.set,
             selectmode=tk.SINGLE,
             height=15
         )
-        self.alarm_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.alarm_listbox.bind('<<ListboxSelect>>', self._on_alarm_select)
-        
-        scrollbar.config(command=self.alarm_listbox.yview)
+        self.alarm_listbox = self.alarm_list.listbox
     
     def _add_alarm(self):
         try:
@@ -210,19 +293,12 @@ class AlarmoApp:
             second = int(self.second_var.get())
             period = self.period_var.get()
             note = self.note_text.get("1.0", tk.END).strip()
-            if not (0 <= hour <= 12):
-                messagebox.showerror("Error", "Hour must be between 0 and 12")
-                return
-            if not (0 <= minute <= 59):
-                messagebox.showerror("Error", "Minute must be between 0 and 59")
-                return
-            if not (0 <= second <= 59):
-                messagebox.showerror("Error", "Second must be between 0 and 59")
+            try:
+                hour = validate_alarm_fields(hour, minute, second, period)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
                 return
-            if hour == 0:
-                hour = 12
             self.alarm_manager.create_alarm(hour, minute, second, period, note)
-            self._refresh_alarm_list()
             self._clear_inputs()
             messagebox.showinfo("Success", "Alarm added successfully!")
         except ValueError:
@@ -236,7 +312,6 @@ class AlarmoApp:
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this alarm?"):
             self.alarm_manager.delete_alarm(self.selected_alarm_id)
             self.selected_alarm_id = None
-            self._refresh_alarm_list()
             messagebox.showinfo("Success", "Alarm deleted successfully!")
     
     def _update_alarm(self):
@@ -250,17 +325,11 @@ class AlarmoApp:
             second = int(self.second_var.get())
             period = self.period_var.get()
             note = self.note_text.get("1.0", tk.END).strip()
-            if not (0 <= hour <= 12):
-                messagebox.showerror("Error", "Hour must be between 0 and 12")
-                return
-            if not (0 <= minute <= 59):
-                messagebox.showerror("Error", "Minute must be between 0 and 59")
-                return
-            if not (0 <= second <= 59):
-                messagebox.showerror("Error", "Second must be between 0 and 59")
+            try:
+                hour = validate_alarm_fields(hour, minute, second, period)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
                 return
-            if hour == 0:
-                hour = 12
             self.alarm_manager.update_alarm(
                 self.selected_alarm_id,
                 hour=hour,
@@ -269,7 +338,6 @@ class AlarmoApp:
                 period=period,
                 note=note
             )
-            self._refresh_alarm_list()
             self.selected_alarm_id = None
             self._clear_inputs()
             messagebox.showinfo("Success", "Alarm updated successfully!")
@@ -277,44 +345,21 @@ class AlarmoApp:
             messagebox.showerror("Error", "Please enter valid numbers for time")
     
     def _show_history(self):
-        history = self.alarm_manager.get_history()
-        
-        history_window = tk.Toplevel(self.root)
-        history_window.title("Alarm History")
-        history_window.geometry("500x400")
-        
-        history_text = scrolledtext.ScrolledText(history_window, font=("Arial", 10))
-        history_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        if not history:
-            history_text.insert(tk.END, "No alarm history available.")
-        else:
-            for alarm in reversed(history):
-                time_str = self.alarm_manager.format_alarm_time(alarm)
-                note = alarm.get('note', 'No note')
-                deleted_at = alarm.get('deleted_at', 'Unknown')
-                history_text.insert(tk.END, f"{time_str} - {note}\n")
-                history_text.insert(tk.END, f"  Deleted: {deleted_at}\n\n")
-        
-        history_text.config(state=tk.DISABLED)
+        HistoryWindow(self.root, self.alarm_manager)
     
-    def _on_alarm_select(self, event):
-        selection = self.alarm_listbox.curselection()
-        if selection:
-            index = selection[0]
-            alarms = self.alarm_manager.read_alarms()
-            if index < len(alarms):
-                alarm = alarms[index]
-                self.selected_alarm_id = alarm['id']
-                self._load_alarm_to_form(alarm)
+    def _on_alarm_select(self, alarm_id):
+        alarm = self.alarm_manager.get_alarm_by_id(alarm_id)
+        if alarm is not None:
+            self.selected_alarm_id = alarm_id
+            self._load_alarm_to_form(alarm)
     
     def _load_alarm_to_form(self, alarm):
-        self.hour_var.set(str(alarm.get('hour_12', alarm.get('hour', 0))))
-        self.minute_var.set(str(alarm.get('minute', 0)))
-        self.second_var.set(str(alarm.get('second', 0)))
-        self.period_var.set(alarm.get('period', 'AM'))
+        self.hour_var.set(str(alarm.hour_12))
+        self.minute_var.set(str(alarm.minute))
+        self.second_var.set(str(alarm.second))
+        self.period_var.set(alarm.period)
         self.note_text.delete("1.0", tk.END)
-        self.note_text.insert("1.0", alarm.get('note', ''))
+        self.note_text.insert("1.0", alarm.note)
     
     def _clear_inputs(self):
         self.hour_var.set("06")
@@ -323,36 +368,51 @@ class AlarmoApp:
         self.period_var.set("AM")
         self.note_text.delete("1.0", tk.END)
     
+    def _format_alarm_row(self, alarm):
+        time_str = self.alarm_manager.format_alarm_time(alarm)
+        note = alarm.note
+        return f"{time_str} {note}"
+    
     def _refresh_alarm_list(self):
-        self.alarm_listbox.delete(0, tk.END)
-        alarms = self.alarm_manager.read_alarms()
-        
-        for alarm in alarms:
-            time_str = self.alarm_manager.format_alarm_time(alarm)
-            note = alarm.get('note', 'No note')
-            display_text = f"{time_str} {note}"
-            self.alarm_listbox.insert(tk.END, display_text)
+        self.alarm_list.set_alarms(self.alarm_manager.read_alarms())
+    
+    def _on_alarms_changed(self, event, payload):
+        # Mutations from the form arrive on the Tk thread; reloads come from the checker thread
+        if threading.current_thread() is threading.main_thread():
+            self.alarm_list.apply(event, payload)
+        else:
+            self.root.after(0, lambda: self.alarm_list.apply(event, payload))
     
     def _check_alarms_loop(self):
-        import time
+        loaded = self.alarm_manager.snapshot()
+        self.time_checker.load(loaded)
+        # Subscribed only now, with anything edited during the load replayed, so load() cannot wipe it
+        self.alarm_manager.add_listener_since(self.time_checker.on_alarm_event, loaded)
+        if self.running:
+            self.root.after(0, self._on_data_loaded)
         while self.running:
             try:
-                alarms = self.alarm_manager.read_alarms()
-                triggered = self.time_checker.check_alarms(alarms)
+                triggered = self.time_checker.wait_for_due()
+                started = time.perf_counter()
                 for alarm in triggered:
-                    play_alarm_sound()
-                    self.root.after(0, lambda a=alarm: self._show_alarm_notification(a))
-                time.sleep(1)
+                    self.sound_player.request()
+                    self.notifier.submit(alarm)
+                if triggered and self.metrics is not None:
+                    self.metrics.observe('gui.dispatch', time.perf_counter() - started)
             except Exception as e:
                 print(f"Error checking alarms: {e}")
                 time.sleep(1)
     
-    def _show_alarm_notification(self, alarm):
-        time_str = self.alarm_manager.format_alarm_time(alarm)
-        note = alarm.get('note', 'No note')
-        messagebox.showinfo("Alarm!", f"{time_str}\n{note}")
-    
     def on_closing(self):
         self.running = False
+        self.time_checker.wake()
+        self.time_checker.close()
+        self.sound_player.stop()
+        # Sinks finish queued batches on their own thread; the closed panel no longer touches Tk
+        self.notification_panel.close()
+        threading.Thread(target=self.notifier.stop, name="alarmo-notifier-stop").start()
+        self.alarm_manager.close()
+        if self.metrics is not None:
+            self.metrics.stop_writer()
         self.root.destroy()
 
@@ -0,0 +1,162 @@
+import queue
+import threading
+import tkinter as tk
+from collections import deque
+from tkinter import scrolledtext
+
+# Entries fetched per background page and rendered per Tk callback
+PAGE_SIZE = 50
+RENDER_CHUNK = 10
+POLL_INTERVAL_MS = 15
+
+
+class HistoryWindow:
+    """History viewer that pages entries in on a background thread
+
+    The loader thread pulls one page at a time from
+    AlarmManager.search_history() and waits until the user scrolls near
+    the bottom before fetching the next. The Tk side renders queued
+    entries a few at a time through root.after so the window never
+    blocks on a large history.
+    """
+
+    def __init__(self, root, alarm_manager):
+        self.root = root
+        self.alarm_manager = alarm_manager
+        self.window = tk.Toplevel(root)
+        self.window.title("Alarm History")
+        self.window.geometry("500x400")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        filter_frame = tk.Frame(self.window)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        self.text_var = tk.StringVar()
+        self.since_var = tk.StringVar()
+        self.until_var = tk.StringVar()
+        tk.Label(filter_frame, text="note").grid(row=0, column=0, sticky=tk.W)
+        text_entry = tk.Entry(filter_frame, textvariable=self.text_var, width=18)
+        text_entry.grid(row=0, column=1, padx=(2, 8))
+        tk.Label(filter_frame, text="from").grid(row=0, column=2, sticky=tk.W)
+        tk.Entry(filter_frame, textvariable=self.since_var, width=11).grid(row=0, column=3, padx=(2, 8))
+        tk.Label(filter_frame, text="before").grid(row=0, column=4, sticky=tk.W)
+        tk.Entry(filter_frame, textvariable=self.until_var, width=11).grid(row=0, column=5, padx=(2, 8))
+        tk.Button(filter_frame, text="FILTER", command=self.start_query).grid(row=0, column=6)
+        self.window.bind('<Return>', lambda e: self.start_query())
+
+        self.history_text = scrolledtext.ScrolledText(self.window, font=("Arial", 10))
+        self.history_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.history_text.configure(yscrollcommand=self._on_scroll)
+
+        self._results = queue.Queue()
+        self._pending = deque()
+        self._generation = 0
+        self._more = threading.Event()
+        self._exhausted = False
+        self._rendered = 0
+        self._closed = False
+        self._polling = False
+
+        self.alarm_manager.prepare_history_search()
+        self.start_query()
+        text_entry.focus_set()
+
+    def start_query(self):
+        """(Re)start loading with the current filter values"""
+        self._generation += 1
+        self._more.set()
+        self._more = threading.Event()
+        self._more.set()
+        self._pending.clear()
+        self._exhausted = False
+        self._rendered = 0
+        self.history_text.config(state=tk.NORMAL)
+        self.history_text.delete("1.0", tk.END)
+        self.history_text.config(state=tk.DISABLED)
+
+        filters = (
+            self.text_var.get().strip() or None,
+            self.since_var.get().strip() or None,
+            self.until_var.get().strip() or None
+        )
+        loader = threading.Thread(
+            target=self._load_pages, args=(self._generation, filters, self._more), daemon=True
+        )
+        loader.start()
+        self._polling = True
+        self.window.after(0, self._poll, self._generation)
+
+    def close(self):
+        self._closed = True
+        self._more.set()
+        self.window.destroy()
+
+    def _load_pages(self, generation, filters, more):
+        """Background thread: push one page, then wait until more is wanted"""
+        try:
+            page = []
+            for entry in self.alarm_manager.search_history(*filters):
+                page.append(entry)
+                if len(page) == PAGE_SIZE:
+                    self._results.put((generation, page))
+                    page = []
+                    more.clear()
+                    more.wait()
+                    if self._closed or generation != self._generation:
+                        return
+            self._results.put((generation, page))
+            self._results.put((generation, None))
+        except Exception as e:
+            print(f"Error loading history: {e}")
+            self._results.put((generation, None))
+
+    def _poll(self, generation):
+        """Tk thread: move loaded pages into the pending queue and render a chunk"""
+        if self._closed or generation != self._generation:
+            return
+        while True:
+            try:
+                item_generation, page = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if item_generation != generation:
+                continue
+            if page is None:
+                self._exhausted = True
+            else:
+                self._pending.extend(page)
+
+        self._render_chunk()
+        if self._pending or not self._results.empty() or (not self._exhausted and self._more.is_set()):
+            self.window.after(POLL_INTERVAL_MS, self._poll, generation)
+        else:
+            # Idle until the reader scrolls for more
+            self._polling = False
+            if self._exhausted and self._rendered == 0:
+                self._insert("No alarm history available.")
+
+    def _render_chunk(self):
+        if not self._pending:
+            return
+        lines = []
+        for _ in range(min(RENDER_CHUNK, len(self._pending))):
+            alarm = self._pending.popleft()
+            time_str = self.alarm_manager.format_alarm_time(alarm)
+            note = alarm.note
+            deleted_at = alarm.deleted_at or 'Unknown'
+            lines.append(f"{time_str} - {note}\n  Deleted: {deleted_at}\n\n")
+            self._rendered += 1
+        self._insert("".join(lines))
+
+    def _insert(self, text):
+        self.history_text.config(state=tk.NORMAL)
+        self.history_text.insert(tk.END, text)
+        self.history_text.config(state=tk.DISABLED)
+
+    def _on_scroll(self, first, last):
+        self.history_text.vbar.set(first, last)
+        # Ask the loader for the next page once the reader nears the end
+        if float(last) > 0.9 and not self._pending and not self._exhausted and not self._more.is_set():
+            self._more.set()
+            if not self._polling:
+                self._polling = True
+                self.window.after(POLL_INTERVAL_MS, self._poll, self._generation)
@@ -0,0 +1,75 @@
+import tkinter as tk
+from datetime import datetime
+from typing import List
+
+# Rows kept in the panel; older ones scroll off the bottom
+MAX_ROWS = 500
+
+
+class NotificationPanel:
+    """Non-modal window listing triggered alarms, newest first
+
+    Acts as a notification sink: deliver() runs on a dispatcher worker
+    and hands each batch to the Tk thread, which opens the panel if
+    needed and adds the whole batch at once. A burst of alarms therefore
+    becomes one update of one window instead of a stack of modal dialogs,
+    and the main window stays usable while the panel is open.
+    """
+
+    name = 'panel'
+
+    def __init__(self, root):
+        self.root = root
+        self.window = None
+        self.listbox = None
+        self.count_var = None
+        self.unseen = 0
+        self.closed = False
+
+    def deliver(self, batch: List):
+        if not self.closed:
+            self.root.after(0, self._show, batch)
+
+    def close(self):
+        """Stop accepting batches, e.g. while the main window shuts down"""
+        self.closed = True
+
+    def _build(self):
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Alarms")
+        self.window.geometry("420x300")
+        self.window.protocol("WM_DELETE_WINDOW", self.dismiss)
+        self.count_var = tk.StringVar()
+        tk.Label(self.window, textvariable=self.count_var, font=("Arial", 14, "bold")).pack(pady=(10, 5))
+        frame = tk.Frame(self.window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        scrollbar = tk.Scrollbar(frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(frame, font=("Arial", 11), yscrollcommand=scrollbar.set)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.listbox.yview)
+        tk.Button(self.window, text="DISMISS", command=self.dismiss).pack(pady=10)
+
+    def _show(self, batch: List):
+        if self.closed:
+            return
+        if self.window is None or not self.window.winfo_exists():
+            self._build()
+        rows = [
+            f"{datetime.fromtimestamp(n.fired_at).strftime('%H:%M:%S')}  {n.text}  {n.alarm.note}"
+            for n in reversed(batch)
+        ]
+        self.listbox.insert(0, *rows)
+        if self.listbox.size() > MAX_ROWS:
+            self.listbox.delete(MAX_ROWS, tk.END)
+        self.unseen += len(batch)
+        self.count_var.set(f"{self.unseen} alarm{'s' if self.unseen != 1 else ''}")
+        self.window.deiconify()
+        self.window.lift()
+
+    def dismiss(self):
+        """Close the panel and forget the alarms it listed"""
+        if self.window is not None:
+            self.window.destroy()
+        self.window = None
+        self.unseen = 0
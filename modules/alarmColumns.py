@@ -0,0 +1,189 @@
+"""
+Alarm Columns Module - Handles array-backed alarm storage for batch trigger evaluation
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress, islice
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+from modules.alarmRecord import Alarm
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DAY = 86400
+
+# Batches larger than this are merged by re-sorting rather than row by row
+REBUILD_BATCH = 256
+
+
+class AlarmColumns:
+    """Alarm IDs, seconds-of-day and active flags in parallel arrays sorted by time
+
+    Every question the scheduler asks - what fell due in a window, what
+    comes next - becomes a binary search plus a slice, so its cost
+    depends on the number of matching alarms rather than the total.
+    Uses NumPy arrays when it is installed, stdlib arrays otherwise.
+    """
+
+    def __init__(self, use_numpy: Optional[bool] = None):
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ImportError("NumPy is not installed")
+        self.use_numpy = use_numpy
+        self.alarms: Dict[int, Alarm] = {}
+        self.load([])
+
+    def __len__(self) -> int:
+        return len(self.tods)
+
+    # Building ----------------------------------------------------------------
+
+    def load(self, alarms: Iterable[Alarm]):
+        """Replace the columns with a full alarm set"""
+        ordered = sorted(alarms, key=attrgetter('tod'))
+        self.alarms = {a.id: a for a in ordered}
+        if len(self.alarms) != len(ordered):
+            ordered = sorted(self.alarms.values(), key=attrgetter('tod'))
+        if self.use_numpy:
+            size = len(ordered)
+            self.tods = numpy.fromiter((a.tod for a in ordered), dtype=numpy.int32, count=size)
+            self.ids = numpy.fromiter((a.id for a in ordered), dtype=numpy.int64, count=size)
+            self.active = numpy.fromiter((a.active for a in ordered), dtype=numpy.bool_, count=size)
+        else:
+            self.tods = array('l', [a.tod for a in ordered])
+            self.ids = array('q', [a.id for a in ordered])
+            self.active = array('b', [a.active for a in ordered])
+
+    def add(self, alarm: Alarm):
+        """Insert or replace one alarm"""
+        current = self.alarms.get(alarm.id)
+        if current is not None and current.tod == alarm.tod:
+            # Same slot: flip the flag in place instead of shifting rows
+            self.active[self._row(current)] = alarm.active
+            self.alarms[alarm.id] = alarm
+            return
+        if current is not None:
+            self.remove(alarm.id)
+        row = self._search(alarm.tod)
+        if self.use_numpy:
+            self.tods = numpy.insert(self.tods, row, alarm.tod)
+            self.ids = numpy.insert(self.ids, row, alarm.id)
+            self.active = numpy.insert(self.active, row, alarm.active)
+        else:
+            self.tods.insert(row, alarm.tod)
+            self.ids.insert(row, alarm.id)
+            self.active.insert(row, alarm.active)
+        self.alarms[alarm.id] = alarm
+
+    def add_many(self, alarms: List[Alarm]):
+        """Insert a batch, re-sorting once if it is large"""
+        if len(alarms) > REBUILD_BATCH:
+            merged = dict(self.alarms)
+            merged.update((a.id, a) for a in alarms)
+            self.load(merged.values())
+        else:
+            for alarm in alarms:
+                self.add(alarm)
+
+    def remove(self, alarm_id: int):
+        """Drop one alarm if present"""
+        alarm = self.alarms.pop(alarm_id, None)
+        if alarm is None:
+            return
+        row = self._row(alarm)
+        if self.use_numpy:
+            self.tods = numpy.delete(self.tods, row)
+            self.ids = numpy.delete(self.ids, row)
+            self.active = numpy.delete(self.active, row)
+        else:
+            del self.tods[row]
+            del self.ids[row]
+            del self.active[row]
+
+    def _row(self, alarm: Alarm) -> int:
+        """Locate an alarm's row among those sharing its time"""
+        lo = self._search(alarm.tod, 'left')
+        hi = self._search(alarm.tod)
+        for row in range(lo, hi):
+            if self.ids[row] == alarm.id:
+                return row
+        raise KeyError(alarm.id)
+
+    def _search(self, tod: float, side: str = 'right') -> int:
+        """Insertion row for tod in the sorted time column"""
+        if self.use_numpy:
+            return int(numpy.searchsorted(self.tods, tod, side))
+        return (bisect_right if side == 'right' else bisect_left)(self.tods, tod)
+
+    # Queries -----------------------------------------------------------------
+
+    def _segments(self, start_sod: float, span: float) -> List[Tuple[int, int, int]]:
+        """Row ranges (lo, hi, day offset) with start_sod < tod <= start_sod + span, wrapping midnight"""
+        end = start_sod + span
+        lo = self._search(start_sod)
+        if end < DAY:
+            return [(lo, self._search(end), 0)]
+        return [(lo, len(self.tods), 0), (0, self._search(end - DAY), DAY)]
+
+    def due(self, start_sod: float, span: float) -> List[Tuple[float, Alarm]]:
+        """Return (seconds after start, alarm) for active alarms in (start_sod, start_sod + span]
+
+        span is capped at one day, so each alarm appears at most once.
+        """
+        if span <= 0 or not len(self.tods):
+            return []
+        span = min(span, DAY)
+        result = []
+        for lo, hi, wrap in self._segments(start_sod, span):
+            if lo >= hi:
+                continue
+            if self.use_numpy:
+                mask = self.active[lo:hi]
+                tods = (self.tods[lo:hi][mask] + wrap - start_sod).tolist()
+                ids = self.ids[lo:hi][mask].tolist()
+            else:
+                flags = self.active[lo:hi]
+                tods = [tod + wrap - start_sod for tod in compress(self.tods[lo:hi], flags)]
+                ids = list(compress(self.ids[lo:hi], flags))
+            alarms = self.alarms
+            result.extend(zip(tods, [alarms[i] for i in ids]))
+        return result
+
+    def count_due(self, start_sod: float, span: float) -> int:
+        """Number of active alarms in (start_sod, start_sod + span]"""
+        if span <= 0 or not len(self.tods):
+            return 0
+        if span >= DAY:
+            return int(numpy.count_nonzero(self.active)) if self.use_numpy else sum(self.active)
+        total = 0
+        for lo, hi, _ in self._segments(start_sod, span):
+            if lo < hi:
+                flags = self.active[lo:hi]
+                total += int(numpy.count_nonzero(flags)) if self.use_numpy else sum(flags)
+        return total
+
+    def upcoming(self, after_sod: float, limit: int) -> List[Alarm]:
+        """The next `limit` active alarms strictly after after_sod, wrapping past midnight"""
+        size = len(self.tods)
+        start = self._search(after_sod)
+        result = []
+        for lo, hi in ((start, size), (0, start)):
+            if len(result) >= limit:
+                break
+            wanted = limit - len(result)
+            if self.use_numpy:
+                ids = self.ids[lo:hi][self.active[lo:hi]][:wanted].tolist()
+            else:
+                active, ids = self.active, self.ids
+                ids = list(islice((ids[row] for row in range(lo, hi) if active[row]), wanted))
+            result.extend(self.alarms[i] for i in ids)
+        return result
+
+    def next_after(self, after_sod: float) -> Optional[int]:
+        """Seconds-of-day of the first active alarm strictly after after_sod, wrapping"""
+        upcoming = self.upcoming(after_sod, 1)
+        return upcoming[0].tod if upcoming else None
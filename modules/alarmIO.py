@@ -0,0 +1,104 @@
+"""
+Alarm IO Module - Streaming CSV and JSONL import/export of alarms
+"""
+import csv
+import json
+from typing import Dict, Iterable, Iterator, TextIO
+
+FORMATS = ('csv', 'jsonl')
+CSV_FIELDS = ['id', 'hour', 'minute', 'second', 'period', 'hour_12', 'note', 'created_at', 'active', 'repeat']
+
+
+def repeat_of(record: Dict):
+    """The record's repeat rule, reading a legacy top-level days list as a weekday set"""
+    repeat = record.get('repeat')
+    if repeat in (None, '', {}) and record.get('days'):
+        return {'days': record['days']}
+    return repeat
+
+
+def guess_format(path: str, default: str = 'jsonl') -> str:
+    """Pick 'csv' or 'jsonl' from a file name"""
+    lowered = path.lower()
+    if lowered.endswith('.csv'):
+        return 'csv'
+    if lowered.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return default
+
+
+def read_csv(stream: TextIO) -> Iterator[Dict]:
+    """Yield one record per CSV row; the header names the fields"""
+    for row in csv.DictReader(stream):
+        yield {key.strip(): value for key, value in row.items() if key}
+
+
+def read_jsonl(stream: TextIO) -> Iterator[Dict]:
+    """Yield one record per non-blank JSONL line"""
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from None
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Dict]:
+    """Yield alarm records from a CSV or JSONL stream"""
+    if fmt == 'csv':
+        return read_csv(stream)
+    if fmt == 'jsonl':
+        return read_jsonl(stream)
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+def iter_csv_lines(alarms: Iterable[Dict]) -> Iterator[str]:
+    """Yield CSV text for alarms, header first"""
+    yield ",".join(CSV_FIELDS) + "\r\n"
+    buffer = _LineBuffer()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    for alarm in alarms:
+        repeat = repeat_of(alarm)
+        # One cell holds the whole rule as compact JSON, the form CSV import parses
+        row = dict(alarm, repeat=json.dumps(repeat, separators=(',', ':')) if repeat else '')
+        writer.writerow(row)
+        yield buffer.pop()
+
+
+def iter_jsonl_lines(alarms: Iterable[Dict]) -> Iterator[str]:
+    """Yield one JSON line per alarm"""
+    for alarm in alarms:
+        yield json.dumps(alarm, separators=(',', ':')) + "\n"
+
+
+def write_alarms(alarms: Iterable[Dict], stream: TextIO, fmt: str = 'jsonl') -> int:
+    """Stream alarms to a CSV or JSONL file object, returning the count written"""
+    if fmt == 'csv':
+        lines = iter_csv_lines(alarms)
+        stream.write(next(lines))
+    elif fmt == 'jsonl':
+        lines = iter_jsonl_lines(alarms)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+    count = 0
+    for line in lines:
+        stream.write(line)
+        count += 1
+    return count
+
+
+class _LineBuffer:
+    """Minimal file-like sink so csv.writer output can be yielded row by row"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, text: str):
+        self._parts.append(text)
+
+    def pop(self) -> str:
+        text = "".join(self._parts)
+        self._parts = []
+        return text
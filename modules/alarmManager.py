@@ -1,160 +1,393 @@
 """
 Alarm Manager Module - Handles CRUD operations for alarms
 """
-import json
-import os
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+from datetime import date, datetime
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, TextIO, Tuple
+from modules.alarmIO import repeat_of, write_alarms
+from modules.alarmRecord import Alarm, now_timestamp, to_seconds_of_day
+from modules.fileWatcher import DEFAULT_POLL_INTERVAL, FileWatcher
+from modules.recurrence import Recurrence, parse_repeat, recurrence_for
+from modules.storage import DEFAULT_BATCH_WINDOW, DURABILITY_EVERY_OP, StorageBackend, open_storage
+
+def validate_alarm_fields(hour: int, minute: int, second: int, period: str) -> int:
+    """Apply the alarm form's range checks, returning the normalized 12-hour value
+
+    Raises ValueError with a user-facing message on the first failing check.
+    """
+    if not (0 <= hour <= 12):
+        raise ValueError("Hour must be between 0 and 12")
+    if not (0 <= minute <= 59):
+        raise ValueError("Minute must be between 0 and 59")
+    if not (0 <= second <= 59):
+        raise ValueError("Second must be between 0 and 59")
+    if period not in ("AM", "PM"):
+        raise ValueError("Period must be AM or PM")
+    return 12 if hour == 0 else hour
 
 class AlarmManager:
-    def __init__(self, db_path: str = "database/alarms.json", history_path: str = "database/history.json"):
+    """CRUD over a storage backend, safe to share between threads
+
+    Mutations are serialized behind a lock. Readers get immutable
+    snapshots (tuples of alarm records that are never modified after
+    publication): a write builds new records and marks the snapshot
+    stale, so a reader holding an old one never sees a half-applied
+    change. Alarms are kept in ID-keyed dicts, so keyed operations
+    never scan; the next snapshot is built by the first read after a
+    change rather than by every write.
+    """
+
+    def __init__(self, db_path: str = "database/alarms.json", history_path: str = "database/history.jsonl",
+                 storage: Optional[StorageBackend] = None, durability: str = DURABILITY_EVERY_OP,
+                 batch_window: float = DEFAULT_BATCH_WINDOW):
         self.db_path = db_path
         self.history_path = history_path
-        self._ensure_directories()
-        self._ensure_files()
-    
-    def _ensure_directories(self):
-        """Ensure database directory exists"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
-    
-    def _ensure_files(self):
-        """Ensure JSON files exist"""
-        if not os.path.exists(self.db_path):
-            with open(self.db_path, 'w') as f:
-                json.dump([], f)
-        if not os.path.exists(self.history_path):
-            with open(self.history_path, 'w') as f:
-                json.dump([], f)
-    
-    def _load_alarms(self) -> List[Dict]:
-        """Load alarms from JSON file"""
-        try:
-            with open(self.db_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
-    
-    def _save_alarms(self, alarms: List[Dict]):
-        """Save alarms to JSON file"""
-        with open(self.db_path, 'w') as f:
-            json.dump(alarms, f, indent=2)
-    
-    def _load_history(self) -> List[Dict]:
-        """Load alarm history from JSON file"""
-        try:
-            with open(self.history_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
-    
-    def _save_history(self, history: List[Dict]):
-        """Save alarm history to JSON file"""
-        with open(self.history_path, 'w') as f:
-            json.dump(history, f, indent=2)
-    
-    def create_alarm(self, hour: int, minute: int, second: int, period: str, note: str) -> Dict:
-        """Create a new alarm"""
-        alarms = self._load_alarms()
-        
-        # Convert to 24-hour format
-        hour_24 = hour if period == "AM" and hour != 12 else (hour + 12 if period == "PM" and hour != 12 else (0 if hour == 12 and period == "AM" else 12))
+        if storage is None:
+            storage = open_storage(db_path, history_path, durability, batch_window)
+        self.storage = storage
+        self._lock = threading.RLock()
+        self._by_id: Optional[Dict[int, Alarm]] = None
+        self._active_by_id: Dict[int, Alarm] = {}
+        self._snapshot: Optional[Tuple[Tuple[Alarm, ...], Tuple[Alarm, ...]]] = None
+        self._snapshot_stale = False
+        self._cache_signature = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._listeners: List[Callable] = []
+        self._watcher: Optional[FileWatcher] = None
+    
+    def add_listener(self, callback: Callable):
+        """Register callback(event, payload) for 'created', 'updated', 'deleted', 'imported' and 'reloaded'"""
+        self._listeners.append(callback)
+    
+    def add_listener_since(self, callback: Callable, seen: Tuple[Alarm, ...]):
+        """Register callback, first replaying to it every change since `seen` was taken from snapshot()
+
+        Lets a listener load a snapshot without holding the lock and still
+        miss no mutation made while it was loading.
+        """
+        with self._lock:
+            current = self.snapshot()
+            if current is not seen:
+                added, changed, removed = self._diff(seen, current)
+                if added:
+                    callback('imported', added)
+                for alarm in changed:
+                    callback('updated', alarm)
+                for alarm in removed:
+                    callback('deleted', alarm)
+            self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable):
+        """Unregister a change listener"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify(self, event: str, payload):
+        """Dispatch a change event to every listener"""
+        for callback in list(self._listeners):
+            try:
+                callback(event, payload)
+            except Exception as e:
+                print(f"Error in alarm listener: {e}")
+    
+    def _load_alarms(self, blocking: bool = True) -> Dict[int, Alarm]:
+        """Return the ID index, going to storage only if alarms changed there (caller holds the lock)
+
+        With blocking=False a storage write in progress skips the check and
+        the index is returned as it stands.
+        """
+        signature = self.storage.signature(blocking)
+        if signature is None and self._by_id is not None:
+            return self._by_id
+        if signature is None:
+            signature = self.storage.signature()
+        if self._by_id is not None and signature == self._cache_signature:
+            self.cache_hits += 1
+            return self._by_id
         
-        # Generate new ID
-        new_id = max([a.get('id', 0) for a in alarms], default=0) + 1
+        self.cache_misses += 1
+        previous = self._by_id
+        alarms = self.storage.load_alarms()
+        self._by_id = {a.id: a for a in alarms}
+        self._active_by_id = {a.id: a for a in alarms if a.active}
+        self._cache_signature = signature
+        self._publish()
+        if previous is not None:
+            self._notify_reload(list(previous.values()), alarms)
+        return self._by_id
+    
+    @staticmethod
+    def _diff(old: Iterable[Alarm], new: Iterable[Alarm]) -> Tuple[List[Alarm], List[Alarm], List[Alarm]]:
+        """Split the difference between two alarm sets into (added active, changed, removed)"""
+        old_by_id = {a.id: a for a in old}
+        added = []
+        changed = []
+        for alarm in new:
+            before = old_by_id.pop(alarm.id, None)
+            if before is None:
+                if alarm.active:
+                    added.append(alarm)
+            elif before is not alarm and before != alarm:
+                changed.append(alarm)
+        return added, changed, list(old_by_id.values())
+    
+    def _notify_reload(self, old: List[Alarm], new: List[Alarm]):
+        """Report a reload as per-alarm events, or one 'reloaded' if most alarms changed"""
+        added, changed, removed = self._diff(old, new)
         
-        alarm = {
-            'id': new_id,
-            'hour': hour_24,
-            'minute': minute,
-            'second': second,
-            'period': period,
-            'hour_12': hour,
-            'note': note,
-            'created_at': datetime.now().isoformat(),
-            'active': True
+        if len(added) + len(changed) + len(removed) > len(new) // 2 + 1:
+            self._notify('reloaded', list(self._active_by_id.values()))
+            return
+        if added:
+            self._notify('imported', added)
+        for alarm in changed:
+            self._notify('updated', alarm)
+        for alarm in removed:
+            self._notify('deleted', alarm)
+    
+    def _publish(self):
+        """Swap in a fresh immutable snapshot of the indexes"""
+        self._snapshot = (tuple(self._by_id.values()), tuple(self._active_by_id.values()))
+        self._snapshot_stale = False
+    
+    def _mark_saved(self):
+        """Record that the in-memory copy matches what storage now holds; the next read publishes it"""
+        signature = self.storage.signature()
+        if self._cache_signature is not None and signature[0] != self._cache_signature[0]:
+            # Another process wrote too; storage merged it, so pick it up on the next read
+            signature = None
+        self._cache_signature = signature
+        self._snapshot_stale = True
+    
+    def snapshot(self, include_inactive: bool = False) -> Tuple[Alarm, ...]:
+        """Return the current alarms as an immutable tuple without waiting on writers
+
+        Storage is only checked for external changes when no mutation or
+        flush is in progress; otherwise the last published snapshot is
+        returned as is.
+        """
+        if self._lock.acquire(blocking=False):
+            try:
+                self._load_alarms(blocking=False)
+                if self._snapshot_stale:
+                    self._publish()
+            finally:
+                self._lock.release()
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                self._load_alarms()
+                if self._snapshot_stale:
+                    self._publish()
+                snapshot = self._snapshot
+        return snapshot[0] if include_inactive else snapshot[1]
+    
+    def refresh(self):
+        """Pick up changes other processes made to storage, notifying listeners"""
+        with self._lock:
+            self._load_alarms()
+    
+    def watch_storage(self, poll_interval: float = DEFAULT_POLL_INTERVAL) -> Optional[FileWatcher]:
+        """Refresh whenever another process changes storage, instead of polling it"""
+        paths = self.storage.watch_paths()
+        if self._watcher is None and paths:
+            self._watcher = FileWatcher(paths, self.refresh, poll_interval)
+            self._watcher.start()
+        return self._watcher
+    
+    def invalidate_cache(self):
+        """Force the next read to go back to storage"""
+        with self._lock:
+            self._by_id = None
+            self._cache_signature = None
+    
+    def cache_stats(self) -> Dict:
+        """Return alarm cache hit/miss counters"""
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'cached': self._by_id is not None
         }
-        
-        alarms.append(alarm)
-        self._save_alarms(alarms)
+    
+    def _new_alarm(self, alarm_id: int, hour: int, minute: int, second: int, period: str, note: str,
+                   rule: Optional[Recurrence] = None) -> Alarm:
+        """Build a new alarm record"""
+        extra = {'repeat': rule.to_dict()} if rule is not None else None
+        return Alarm(alarm_id, to_seconds_of_day(hour, minute, second, period), note, now_timestamp(), extra=extra)
+    
+    def create_alarm(self, hour: int, minute: int, second: int, period: str, note: str,
+                     repeat: Optional[Dict] = None) -> Alarm:
+        """Create a new alarm; repeat is an optional rule such as {"days": ["Mon", "Fri"]}
+
+        Raises ValueError if the repeat rule is invalid.
+        """
+        rule = parse_repeat(repeat, date.today())
+        with self._lock:
+            alarms = self._load_alarms()
+            alarm = self._new_alarm(self.storage.allocate_ids(), hour, minute, second, period, note, rule)
+            
+            self.storage.insert_alarm(alarm)
+            alarms[alarm.id] = alarm
+            self._active_by_id[alarm.id] = alarm
+            self._mark_saved()
+            self._notify('created', alarm)
         return alarm
     
-    def read_alarms(self) -> List[Dict]:
+    def import_alarms(self, records: Iterable[Dict]) -> List[Alarm]:
+        """Validate a whole batch of alarm records, then create them with a single write
+
+        Each record carries hour (1-12, or 0 for 12), minute, second, period
+        and optional note and repeat rule (or a legacy days list); exported
+        records with hour_12 are accepted too. Nothing is written if any record fails validation.
+        """
+        fields = []
+        errors = []
+        for number, record in enumerate(records, start=1):
+            try:
+                hour = int(record.get('hour_12') or record.get('hour'))
+                minute = int(record.get('minute', 0))
+                second = int(record.get('second', 0))
+                period = str(record.get('period', 'AM')).upper()
+                hour = validate_alarm_fields(hour, minute, second, period)
+                rule = parse_repeat(repeat_of(record), date.today())
+            except (TypeError, ValueError) as e:
+                errors.append(f"record {number}: {e}")
+                continue
+            fields.append((hour, minute, second, period, record.get('note') or '', rule))
+        if errors:
+            raise ValueError(f"{len(errors)} invalid record(s); " + "; ".join(errors[:5]))
+        
+        with self._lock:
+            alarms = self._load_alarms()
+            first_id = self.storage.allocate_ids(len(fields)) if fields else 0
+            created = [self._new_alarm(first_id + i, *values) for i, values in enumerate(fields)]
+            if created:
+                self.storage.insert_alarms(created)
+                for alarm in created:
+                    alarms[alarm.id] = alarm
+                    self._active_by_id[alarm.id] = alarm
+                self._mark_saved()
+                self._notify('imported', created)
+        return created
+    
+    def export_alarms(self, stream: TextIO, fmt: str = 'jsonl') -> int:
+        """Write every alarm to a CSV or JSONL stream, returning the count"""
+        return write_alarms((a.to_dict() for a in self.snapshot(include_inactive=True)), stream, fmt)
+    
+    def read_alarms(self) -> List[Alarm]:
         """Read all active alarms"""
-        alarms = self._load_alarms()
-        return [a for a in alarms if a.get('active', True)]
+        return list(self.snapshot())
     
-    def read_all_alarms(self) -> List[Dict]:
+    def read_all_alarms(self) -> List[Alarm]:
         """Read all alarms including inactive ones"""
-        return self._load_alarms()
+        return list(self.snapshot(include_inactive=True))
     
     def update_alarm(self, alarm_id: int, hour: int = None, minute: int = None, 
-                     second: int = None, period: str = None, note: str = None) -> Optional[Dict]:
-        """Update an existing alarm"""
-        alarms = self._load_alarms()
-        
-        for alarm in alarms:
-            if alarm['id'] == alarm_id:
-                if hour is not None:
-                    alarm['hour_12'] = hour
-                    # Convert to 24-hour format
-                    hour_24 = hour if period == "AM" and hour != 12 else (hour + 12 if period == "PM" and hour != 12 else (0 if hour == 12 and period == "AM" else 12))
-                    alarm['hour'] = hour_24
-                if minute is not None:
-                    alarm['minute'] = minute
-                if second is not None:
-                    alarm['second'] = second
-                if period is not None:
-                    alarm['period'] = period
-                    # Recalculate 24-hour format if period changed
-                    if hour is not None:
-                        hour_24 = alarm['hour_12'] if period == "AM" and alarm['hour_12'] != 12 else (alarm['hour_12'] + 12 if period == "PM" and alarm['hour_12'] != 12 else (0 if alarm['hour_12'] == 12 and period == "AM" else 12))
-                        alarm['hour'] = hour_24
-                if note is not None:
-                    alarm['note'] = note
-                
-                self._save_alarms(alarms)
-                return alarm
-        
-        return None
+                     second: int = None, period: str = None, note: str = None,
+                     repeat: Optional[Dict] = None) -> Optional[Alarm]:
+        """Update an existing alarm; repeat={} makes it daily again
+
+        Raises ValueError if the repeat rule is invalid.
+        """
+        rule = parse_repeat(repeat, date.today()) if repeat is not None else None
+        with self._lock:
+            alarms = self._load_alarms()
+            current = alarms.get(alarm_id)
+            if current is None:
+                return None
+            
+            # Published snapshots share the old record, so build a new one
+            tod = to_seconds_of_day(
+                current.hour_12 if hour is None else hour,
+                current.minute if minute is None else minute,
+                current.second if second is None else second,
+                current.period if period is None else period
+            )
+            changes = {} if note is None else {'note': note}
+            if tod != current.tod or hour is not None or period is not None:
+                changes['tod'] = tod
+            if repeat is not None:
+                extra = {k: v for k, v in (current.extra or {}).items() if k not in ('repeat', 'days')}
+                if rule is not None:
+                    extra['repeat'] = rule.to_dict()
+                changes['extra'] = extra or None
+            alarm = current.replace(**changes)
+            
+            self.storage.update_alarm(alarm)
+            alarms[alarm_id] = alarm
+            self._replace_active(current, alarm)
+            self._mark_saved()
+            self._notify('updated', alarm)
+        return alarm
+    
+    def _replace_active(self, old: Alarm, new: Optional[Alarm]):
+        """Swap (or with new=None, drop) one alarm in the active index"""
+        if self._active_by_id.get(old.id) is old:
+            if new is None:
+                del self._active_by_id[old.id]
+            else:
+                self._active_by_id[old.id] = new
     
     def delete_alarm(self, alarm_id: int) -> bool:
         """Delete an alarm (move to history)"""
-        alarms = self._load_alarms()
-        history = self._load_history()
-        
-        for i, alarm in enumerate(alarms):
-            if alarm['id'] == alarm_id:
-                # Add to history
-                alarm_copy = alarm.copy()
-                alarm_copy['deleted_at'] = datetime.now().isoformat()
-                history.append(alarm_copy)
-                
-                # Remove from active alarms
-                alarms.pop(i)
-                self._save_alarms(alarms)
-                self._save_history(history)
-                return True
-        
-        return False
+        with self._lock:
+            alarms = self._load_alarms()
+            alarm = alarms.get(alarm_id)
+            if alarm is None:
+                return False
+            
+            # Add to history
+            history_entry = alarm.to_dict()
+            history_entry['deleted_at'] = datetime.now().isoformat()
+            
+            # Remove from active alarms
+            self.storage.delete_alarm(alarm_id, history_entry)
+            del alarms[alarm_id]
+            self._replace_active(alarm, None)
+            self._mark_saved()
+            self._notify('deleted', alarm)
+        return True
     
-    def get_history(self) -> List[Dict]:
+    def get_history(self) -> List[Alarm]:
         """Get alarm history"""
-        return self._load_history()
+        return [Alarm.from_dict(entry) for entry in self.storage.iter_history()]
+    
+    def iter_history(self, newest_first: bool = False) -> Iterator[Alarm]:
+        """Stream alarm history without loading it all"""
+        return map(Alarm.from_dict, self.storage.iter_history(newest_first))
+    
+    def search_history(self, text: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Iterator[Alarm]:
+        """Stream history newest first, filtered by note words and a deleted_at range [since, until)"""
+        return map(Alarm.from_dict, self.storage.search_history(text, since, until))
+    
+    def prepare_history_search(self):
+        """Start building the history search index in the background"""
+        self.storage.prepare_history_search()
+    
+    def compact_history(self, max_entries: Optional[int] = None, background: bool = True):
+        """Compact stored history, rotating entries beyond max_entries"""
+        return self.storage.compact_history(max_entries, background)
     
-    def get_alarm_by_id(self, alarm_id: int) -> Optional[Dict]:
+    def get_alarm_by_id(self, alarm_id: int) -> Optional[Alarm]:
         """Get a specific alarm by ID"""
-        alarms = self._load_alarms()
-        for alarm in alarms:
-            if alarm['id'] == alarm_id:
-                return alarm
-        return None
-    
-    def format_alarm_time(self, alarm: Dict) -> str:
-        """Format alarm time for display"""
-        hour_12 = alarm.get('hour_12', alarm.get('hour', 0))
-        minute = alarm.get('minute', 0)
-        period = alarm.get('period', 'AM')
-        
-        return f"{hour_12:02d}:{minute:02d} {period}"
-
+        with self._lock:
+            return self._load_alarms().get(alarm_id)
+    
+    def flush(self):
+        """Write any batched mutations to disk now"""
+        self.storage.flush()
+    
+    def close(self):
+        """Stop watching, then flush and close the storage backend"""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+        self.storage.close()
+    
+    def format_alarm_time(self, alarm: Alarm) -> str:
+        """Format alarm time for display, with its repeat rule if it has one"""
+        text = f"{alarm.hour_12:02d}:{alarm.minute:02d} {alarm.period}"
+        rule = recurrence_for(alarm) if alarm.extra is not None else None
+        return text if rule is None else f"{text} ({rule.describe()})"
@@ -0,0 +1,208 @@
+"""
+Alarm Record Module - Handles the compact in-memory alarm type and its JSON schema
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+# JSON keys the record stores natively; anything else is carried in `extra`
+SCHEMA_KEYS = ('id', 'hour', 'minute', 'second', 'period', 'hour_12', 'note', 'created_at', 'active')
+LEGACY_KEYS = ('id', 'time', 'label', 'active')
+_SCHEMA_SET = frozenset(SCHEMA_KEYS)
+
+# Local epoch of each 'YYYY-MM-DDTHH:MM' seen, so parsing skips mktime per alarm;
+# NaN marks a minute that does not survive the trip back (a DST gap)
+_minute_epochs: Dict[str, float] = {}
+
+
+def to_seconds_of_day(hour_12: int, minute: int, second: int, period: str) -> int:
+    """Convert a 12-hour clock time to seconds since midnight"""
+    hour_24 = hour_12 % 12 + (12 if period == "PM" else 0)
+    return hour_24 * 3600 + minute * 60 + second
+
+
+def parse_timestamp(text) -> Optional[float]:
+    """Return the epoch of a naive datetime.isoformat() string, or None if it is not one
+
+    Only strings format_timestamp() gives back unchanged are accepted, so
+    callers can keep anything else verbatim: wall times inside a
+    spring-forward gap, zero microseconds written out, leap seconds.
+    """
+    try:
+        base = _minute_epochs.get(text[:16])
+        if base is None:
+            if len(text) not in (19, 26) or text[10] != 'T':
+                return None
+            if len(_minute_epochs) > 65536:
+                _minute_epochs.clear()
+            minute = text[:16]
+            base = datetime.fromisoformat(minute).timestamp()
+            if datetime.fromtimestamp(base).isoformat(timespec='minutes') != minute:
+                base = float('nan')
+            _minute_epochs[minute] = base
+        elif len(text) not in (19, 26):
+            return None
+        if base != base or text[17:19] >= '60' or text.endswith('.000000'):
+            return None
+        # Seconds and microseconds in one parse; the sum stays well within 1us
+        return base + float(text[17:])
+    except (TypeError, ValueError):
+        return None
+
+
+def format_timestamp(epoch: float) -> str:
+    """Inverse of parse_timestamp"""
+    return datetime.fromtimestamp(epoch).isoformat()
+
+
+def now_timestamp() -> float:
+    """Current epoch at the microsecond precision stored on disk, so reloads compare equal"""
+    return parse_timestamp(datetime.now().isoformat())
+
+
+class Alarm:
+    """One alarm: ID, seconds-of-day, note, epoch creation time and active flag
+
+    Records are shared between threads and snapshots, so treat them as
+    immutable and derive changed copies with replace(). from_dict() and
+    to_dict() convert losslessly to the JSON schema: keys the record does
+    not model (deleted_at on history entries, days on legacy ones) and
+    stored values that disagree with the derived ones ride along in
+    `extra`. Legacy entries using time/label round-trip in that form.
+    """
+
+    __slots__ = ('id', 'tod', 'note', 'created_at', 'active', 'extra', 'legacy')
+
+    def __init__(self, id: int, tod: int, note: str = '', created_at: Optional[float] = None,
+                 active: bool = True, extra: Optional[Dict] = None, legacy: bool = False):
+        self.id = id
+        self.tod = tod
+        self.note = note
+        self.created_at = created_at
+        self.active = active
+        self.extra = extra
+        self.legacy = legacy
+
+    # Derived clock fields ----------------------------------------------------
+
+    @property
+    def hour(self) -> int:
+        return self.tod // 3600
+
+    @property
+    def minute(self) -> int:
+        return self.tod // 60 % 60
+
+    @property
+    def second(self) -> int:
+        return self.tod % 60
+
+    @property
+    def hour_12(self) -> int:
+        if self.extra is not None and 'hour_12' in self.extra:
+            return self.extra['hour_12']
+        return self.hour % 12 or 12
+
+    @property
+    def period(self) -> str:
+        if self.extra is not None and 'period' in self.extra:
+            return self.extra['period']
+        return "AM" if self.tod < 12 * 3600 else "PM"
+
+    @property
+    def deleted_at(self) -> Optional[str]:
+        """Deletion time of a history entry"""
+        return self.extra.get('deleted_at') if self.extra is not None else None
+
+    # Copies and comparison ---------------------------------------------------
+
+    def replace(self, **changes) -> 'Alarm':
+        """Return a copy with some fields changed; a new tod drops stale 12-hour overrides"""
+        fields = {name: getattr(self, name) for name in Alarm.__slots__}
+        fields.update(changes)
+        if 'tod' in changes and fields['extra'] is not None:
+            extra = {k: v for k, v in fields['extra'].items() if k not in ('hour_12', 'period', 'time')}
+            fields['extra'] = extra or None
+        return Alarm(**fields)
+
+    def _key(self):
+        return (self.id, self.tod, self.note, self.created_at, self.active, self.extra, self.legacy)
+
+    def __eq__(self, other):
+        if not isinstance(other, Alarm):
+            return NotImplemented
+        return self._key() == other._key()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Alarm(id={self.id!r}, tod={self.tod!r}, note={self.note!r}, active={self.active!r})"
+
+    # JSON schema -------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Alarm':
+        """Build a record from a stored alarm or history entry (current or legacy schema)"""
+        if 'hour' not in data and 'time' in data:
+            return cls._from_legacy(data)
+        hour = data.get('hour', 0)
+        created_at = data.get('created_at')
+        if len(data) == len(SCHEMA_KEYS) and data.keys() == _SCHEMA_SET:
+            # Fast path: a well-formed record needs no extras
+            epoch = parse_timestamp(created_at)
+            if epoch is not None and data['hour_12'] == (hour % 12 or 12) and data['period'] == ("AM" if hour < 12 else "PM"):
+                return cls(data['id'], hour * 3600 + data['minute'] * 60 + data['second'],
+                           data['note'], epoch, data['active'])
+        epoch = parse_timestamp(created_at) if created_at is not None else None
+        extra = None
+        if len(data) != len(SCHEMA_KEYS) or data.keys() != _SCHEMA_SET:
+            extra = {k: data[k] for k in data.keys() - _SCHEMA_SET}
+        if epoch is None and created_at is not None:
+            extra = extra if extra is not None else {}
+            extra['created_at'] = created_at
+        # Keep stored 12-hour values that disagree with the 24-hour time
+        if data.get('hour_12') not in (None, hour % 12 or 12):
+            extra = extra if extra is not None else {}
+            extra['hour_12'] = data['hour_12']
+        if data.get('period') not in (None, "AM" if hour < 12 else "PM"):
+            extra = extra if extra is not None else {}
+            extra['period'] = data['period']
+        return cls(data['id'], hour * 3600 + data.get('minute', 0) * 60 + data.get('second', 0),
+                   data.get('note', ''), epoch, data.get('active', True), extra or None)
+
+    @classmethod
+    def _from_legacy(cls, data: Dict) -> 'Alarm':
+        parts = [int(p) for p in str(data['time']).split(':')] + [0, 0]
+        alarm = cls(data.get('id'), parts[0] * 3600 + parts[1] * 60 + parts[2], data.get('label', ''),
+                    None, data.get('active', True), legacy=True)
+        extra = {k: v for k, v in data.items() if k not in LEGACY_KEYS}
+        if alarm._legacy_time() != data['time']:
+            extra['time'] = data['time']
+        alarm.extra = extra or None
+        return alarm
+
+    def _legacy_time(self) -> str:
+        text = f"{self.hour:02d}:{self.minute:02d}"
+        return text + f":{self.second:02d}" if self.second else text
+
+    def to_dict(self) -> Dict:
+        """Serialize to the JSON schema this record was read from"""
+        if self.legacy:
+            data = {'id': self.id, 'time': self._legacy_time(), 'label': self.note, 'active': self.active}
+        else:
+            hour = self.tod // 3600
+            data = {
+                'id': self.id,
+                'hour': hour,
+                'minute': self.tod // 60 % 60,
+                'second': self.tod % 60,
+                'period': "AM" if hour < 12 else "PM",
+                'hour_12': hour % 12 or 12,
+                'note': self.note,
+                'created_at': format_timestamp(self.created_at) if self.created_at is not None else None,
+                'active': self.active
+            }
+            if self.created_at is None:
+                del data['created_at']
+        if self.extra is not None:
+            data.update(self.extra)
+        return data
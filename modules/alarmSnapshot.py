@@ -0,0 +1,179 @@
+"""
+Alarm Snapshot Module - Handles the memory-mapped binary copy of the alarms used for fast cold loads
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+from itertools import accumulate
+from typing import List, Optional
+from modules.alarmRecord import Alarm
+
+MAGIC = b"ALMSNAP1"
+# Columns are written in native byte order; a file from another architecture is treated as stale
+BYTE_ORDER_MARK = 0x0A0B0C0D
+# magic, byte order mark, signature length, alarm count, string heap size
+HEADER = struct.Struct("=8sIIQQ")
+
+FLAG_ACTIVE = 1
+FLAG_LEGACY = 2
+FLAG_EXTRA = 4
+
+# (name, array typecode) in file order; 8-byte columns first so every column stays aligned
+COLUMNS = (('ids', 'q'), ('created', 'd'), ('note_offsets', 'Q'), ('extra_offsets', 'Q'), ('tods', 'i'),
+           ('flags', 'B'))
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+class SnapshotAlarm(Alarm):
+    """Alarm whose note stays in the snapshot's string heap until it is first read
+
+    Scheduling only touches id, tod and active, so a cold load never
+    decodes notes; the GUI or a notification reading `note` pulls that
+    one string out of the mapping. Pickles as a plain Alarm.
+    """
+
+    __slots__ = ('_snapshot', '_row')
+
+    def __init__(self, snapshot: 'AlarmSnapshot', row: int, id: int, tod: int, created_at: Optional[float],
+                 active: bool, extra, legacy: bool):
+        self._snapshot = snapshot
+        self._row = row
+        self.id = id
+        self.tod = tod
+        self.created_at = created_at
+        self.active = active
+        self.extra = extra
+        self.legacy = legacy
+
+    @property
+    def note(self) -> str:
+        try:
+            return _note_slot.__get__(self, Alarm)
+        except AttributeError:
+            note = self._snapshot.note(self._row)
+            _note_slot.__set__(self, note)
+            # Once every note a record needs is read, it no longer pins the mapping
+            self._snapshot = None
+            return note
+
+    @note.setter
+    def note(self, value: str):
+        _note_slot.__set__(self, value)
+
+    def __reduce__(self):
+        return Alarm, (self.id, self.tod, self.note, self.created_at, self.active, self.extra, self.legacy)
+
+
+_note_slot = Alarm.__dict__['note']
+
+
+class AlarmSnapshot:
+    """Read-only view of a snapshot file
+
+    The columns are memoryviews straight onto the mapping, so opening a
+    snapshot copies nothing; alarms() builds records from them without
+    any parsing. The mapping stays open while records still hold
+    unread notes.
+    """
+
+    def __init__(self, data: mmap.mmap, signature, count: int, columns: dict, heap: memoryview):
+        self._data = data
+        self.signature = signature
+        self.count = count
+        self.ids = columns['ids']
+        self.created = columns['created']
+        self.note_offsets = columns['note_offsets']
+        self.extra_offsets = columns['extra_offsets']
+        self.tods = columns['tods']
+        self.flags = columns['flags']
+        self._heap = heap
+
+    @classmethod
+    def open(cls, path: str) -> Optional['AlarmSnapshot']:
+        """Map a snapshot file, or return None if it is missing or unreadable"""
+        try:
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, mark, signature_size, count, heap_size = HEADER.unpack_from(data)
+            if magic != MAGIC or mark != BYTE_ORDER_MARK:
+                return None
+            offset = HEADER.size
+            signature = json.loads(bytes(data[offset:offset + signature_size]))
+            offset += signature_size + _padding(signature_size)
+            view = memoryview(data)
+            columns = {}
+            for name, typecode in COLUMNS:
+                size = array(typecode).itemsize * (count + 1 if name.endswith('_offsets') else count)
+                columns[name] = view[offset:offset + size].cast(typecode)
+                offset += size + _padding(size)
+            if offset + heap_size != len(data):
+                return None
+            return cls(data, signature, count, columns, view[offset:])
+        except (struct.error, ValueError, TypeError) as e:
+            print(f"Ignoring unreadable alarm snapshot {path}: {e}")
+            return None
+
+    def note(self, row: int) -> str:
+        return str(self._heap[self.note_offsets[row]:self.note_offsets[row + 1]], 'utf-8')
+
+    def extra(self, row: int):
+        start, end = self.extra_offsets[row], self.extra_offsets[row + 1]
+        return json.loads(bytes(self._heap[start:end])) if end > start else None
+
+    def alarms(self) -> List[Alarm]:
+        """Build every record in file order, leaving notes in the heap"""
+        result = []
+        append = result.append
+        for row, (alarm_id, tod, created_at, flags) in enumerate(zip(self.ids, self.tods, self.created, self.flags)):
+            append(SnapshotAlarm(
+                self, row, alarm_id, tod,
+                # NaN marks a missing creation time
+                created_at if created_at == created_at else None,
+                flags & FLAG_ACTIVE == FLAG_ACTIVE,
+                self.extra(row) if flags & FLAG_EXTRA else None,
+                flags & FLAG_LEGACY == FLAG_LEGACY
+            ))
+        return result
+
+
+def write_snapshot(path: str, alarms: List[Alarm], signature):
+    """Atomically replace the snapshot at path with these alarms, tagged with their source's signature"""
+    notes = [a.note.encode('utf-8') for a in alarms]
+    extras = [json.dumps(a.extra, separators=(',', ':')).encode() if a.extra is not None else b"" for a in alarms]
+    note_offsets = array('Q', accumulate(map(len, notes), initial=0))
+    columns = {
+        'ids': array('q', [a.id for a in alarms]),
+        'created': array('d', [float('nan') if a.created_at is None else a.created_at for a in alarms]),
+        'note_offsets': note_offsets,
+        'extra_offsets': array('Q', accumulate(map(len, extras), initial=note_offsets[-1])),
+        'tods': array('i', [a.tod for a in alarms]),
+        'flags': array('B', [(FLAG_ACTIVE if a.active else 0) | (FLAG_LEGACY if a.legacy else 0)
+                             | (FLAG_EXTRA if a.extra is not None else 0) for a in alarms])
+    }
+    heap = b"".join(notes) + b"".join(extras)
+    encoded_signature = json.dumps(signature).encode()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, BYTE_ORDER_MARK, len(encoded_signature), len(alarms), len(heap)))
+        f.write(encoded_signature + b"\0" * _padding(len(encoded_signature)))
+        for name, _ in COLUMNS:
+            data = columns[name].tobytes()
+            f.write(data + b"\0" * _padding(len(data)))
+        f.write(heap)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, signature) -> Optional[List[Alarm]]:
+    """Alarms from the snapshot at path if it was built from a source with this signature, else None"""
+    snapshot = AlarmSnapshot.open(path)
+    if snapshot is None or snapshot.signature != signature:
+        return None
+    return snapshot.alarms()
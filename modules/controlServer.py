@@ -0,0 +1,290 @@
+"""
+Control Server Module - Local HTTP/JSON API over AlarmManager (stdlib asyncio only)
+"""
+import asyncio
+import io
+import json
+import os
+from http import HTTPStatus
+from itertools import islice
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from modules.alarmIO import read_records
+from modules.alarmManager import AlarmManager, validate_alarm_fields
+from modules.alarmRecord import Alarm
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+DEFAULT_HISTORY_LIMIT = 100
+# Routes that parse, stream or scan whole data sets; they run on the default executor
+BLOCKING_ROUTES = {('POST', '/alarms/import'), ('GET', '/alarms/export'), ('GET', '/history')}
+
+
+class RequestError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ControlServer:
+    """Serves alarm CRUD, history and bulk operations to local clients
+
+    Requests are parsed on the asyncio loop and all clients share the
+    one in-memory AlarmManager state without re-reading the DB. Small
+    handlers run on the loop thread; bulk import, export and history
+    reads (BLOCKING_ROUTES) run on the loop's executor so one large
+    request cannot stall every other client. Listens on localhost TCP,
+    a Unix socket, or both; keep-alive connections are supported.
+
+    Routes:
+        GET    /alarms[?all=1]             list active (or all) alarms
+        POST   /alarms                     create {hour, minute, second, period, note, repeat}
+        GET    /alarms/<id>                fetch one alarm
+        PATCH  /alarms/<id>                change any of the create fields
+        DELETE /alarms/<id>                delete (moves to history)
+        POST   /alarms/import              bulk create from a JSON array, JSONL or CSV body
+        GET    /alarms/export?format=csv   stream every alarm as JSONL (default) or CSV
+        GET    /history?text=&since=&until=&limit=&offset=
+        GET    /stats                      cache and request counters, plus metrics when attached
+    """
+
+    def __init__(self, alarm_manager: AlarmManager, host: str = "127.0.0.1", port: Optional[int] = 8765,
+                 unix_path: Optional[str] = None, metrics=None):
+        self.alarm_manager = alarm_manager
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.requests_served = 0
+        self._servers = []
+
+    async def start(self):
+        """Start listening on the configured TCP port and/or Unix socket"""
+        if self.port is not None:
+            server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+        if self.unix_path is not None:
+            self._servers.append(await asyncio.start_unix_server(self._handle_connection, self.unix_path))
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self.unix_path is not None and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._send(writer, HTTPStatus.BAD_REQUEST, {'error': 'Malformed request line'}, False)
+                    break
+                headers = await self._read_headers(reader)
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._send(writer, HTTPStatus.BAD_REQUEST, {'error': 'Invalid Content-Length'}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._send(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                try:
+                    if (method, urlsplit(target).path.rstrip('/')) in BLOCKING_ROUTES:
+                        status, payload, content_type = await asyncio.get_running_loop().run_in_executor(
+                            None, self.dispatch, method, target, body, headers)
+                    else:
+                        status, payload, content_type = self.dispatch(method, target, body, headers)
+                except RequestError as e:
+                    status, payload, content_type = e.status, {'error': str(e)}, None
+                except Exception as e:
+                    print(f"Error handling {method} {target}: {e}")
+                    status, payload, content_type = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}, None
+                self.requests_served += 1
+                await self._send(writer, status, payload, keep_alive, content_type)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: HTTPStatus, payload, keep_alive: bool,
+                    content_type: Optional[str] = None):
+        if content_type is None:
+            body = json.dumps(payload).encode()
+            content_type = 'application/json'
+        else:
+            body = payload.encode()
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    # Routing ---------------------------------------------------------------
+
+    def dispatch(self, method: str, target: str, body: bytes, headers: Dict[str, str]) -> Tuple:
+        """Route one request; returns (status, payload, content_type or None for JSON)"""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split('/') if p]
+
+        if parts == ['alarms']:
+            if method == 'GET':
+                alarms = self.alarm_manager.snapshot(include_inactive=bool(query.get('all')))
+                return HTTPStatus.OK, [a.to_dict() for a in alarms], None
+            if method == 'POST':
+                return HTTPStatus.CREATED, self._create(self._json_body(body)), None
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on /alarms")
+
+        if parts == ['alarms', 'import'] and method == 'POST':
+            try:
+                created = self.alarm_manager.import_alarms(self._import_records(body, headers))
+            except ValueError as e:
+                raise RequestError(HTTPStatus.BAD_REQUEST, str(e))
+            return HTTPStatus.CREATED, {'imported': len(created)}, None
+
+        if parts == ['alarms', 'export'] and method == 'GET':
+            fmt = query.get('format', 'jsonl')
+            stream = io.StringIO()
+            try:
+                self.alarm_manager.export_alarms(stream, fmt)
+            except ValueError as e:
+                raise RequestError(HTTPStatus.BAD_REQUEST, str(e))
+            content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+            return HTTPStatus.OK, stream.getvalue(), content_type
+
+        if len(parts) == 2 and parts[0] == 'alarms':
+            alarm_id = self._parse_id(parts[1])
+            if method == 'GET':
+                return HTTPStatus.OK, self._require(self.alarm_manager.get_alarm_by_id(alarm_id)).to_dict(), None
+            if method in ('PATCH', 'PUT'):
+                return HTTPStatus.OK, self._update(alarm_id, self._json_body(body)), None
+            if method == 'DELETE':
+                if not self.alarm_manager.delete_alarm(alarm_id):
+                    raise RequestError(HTTPStatus.NOT_FOUND, f"Alarm {alarm_id} not found")
+                return HTTPStatus.OK, {'deleted': alarm_id}, None
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on /alarms/<id>")
+
+        if parts == ['history'] and method == 'GET':
+            try:
+                limit = int(query.get('limit', DEFAULT_HISTORY_LIMIT))
+                offset = int(query.get('offset', 0))
+            except ValueError:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "limit and offset must be integers")
+            entries = self.alarm_manager.search_history(query.get('text'), query.get('since'), query.get('until'))
+            return HTTPStatus.OK, [e.to_dict() for e in islice(entries, offset, offset + limit)], None
+
+        if parts == ['stats'] and method == 'GET':
+            stats = {
+                'cache': self.alarm_manager.cache_stats(),
+                'requests_served': self.requests_served
+            }
+            if self.metrics is not None:
+                stats['metrics'] = self.metrics.snapshot()
+            return HTTPStatus.OK, stats, None
+
+        raise RequestError(HTTPStatus.NOT_FOUND, f"No route for {method} {url.path}")
+
+    # Handlers --------------------------------------------------------------
+
+    @staticmethod
+    def _json_body(body: bytes) -> Dict:
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}")
+        if not isinstance(data, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+        return data
+
+    @staticmethod
+    def _parse_id(value: str) -> int:
+        try:
+            return int(value)
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid alarm id: {value}")
+
+    @staticmethod
+    def _require(alarm: Optional[Alarm]) -> Alarm:
+        if alarm is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, "Alarm not found")
+        return alarm
+
+    @staticmethod
+    def _time_fields(data: Dict, current: Optional[Alarm] = None) -> Tuple[int, int, int, str]:
+        """Validate hour/minute/second/period, defaulting to the current alarm's values"""
+        try:
+            hour = int(data.get('hour', current.hour_12 if current else 12))
+            minute = int(data.get('minute', current.minute if current else 0))
+            second = int(data.get('second', current.second if current else 0))
+            period = str(data.get('period', current.period if current else 'AM')).upper()
+            hour = validate_alarm_fields(hour, minute, second, period)
+        except (TypeError, ValueError) as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(e))
+        return hour, minute, second, period
+
+    def _create(self, data: Dict) -> Dict:
+        if 'hour' not in data:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "hour is required")
+        hour, minute, second, period = self._time_fields(data)
+        try:
+            alarm = self.alarm_manager.create_alarm(hour, minute, second, period, str(data.get('note', '')),
+                                                    repeat=data.get('repeat'))
+        except ValueError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(e))
+        return alarm.to_dict()
+
+    def _update(self, alarm_id: int, data: Dict) -> Dict:
+        current = self._require(self.alarm_manager.get_alarm_by_id(alarm_id))
+        hour, minute, second, period = self._time_fields(data, current)
+        note = data.get('note')
+        # An explicit "repeat": null makes the alarm daily again
+        repeat = (data['repeat'] or {}) if 'repeat' in data else None
+        try:
+            alarm = self.alarm_manager.update_alarm(
+                alarm_id, hour=hour, minute=minute, second=second, period=period,
+                note=None if note is None else str(note), repeat=repeat
+            )
+        except ValueError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(e))
+        return self._require(alarm).to_dict()
+
+    @staticmethod
+    def _import_records(body: bytes, headers: Dict[str, str]):
+        text = body.decode('utf-8')
+        content_type = headers.get('content-type', '')
+        if 'csv' in content_type:
+            return list(read_records(io.StringIO(text), 'csv'))
+        stripped = text.lstrip()
+        try:
+            if stripped.startswith('['):
+                return json.loads(stripped)
+            return list(read_records(io.StringIO(text), 'jsonl'))
+        except ValueError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid import body: {e}")
@@ -0,0 +1,173 @@
+"""
+Daemon Module - Headless alarm engine running on an asyncio event loop
+"""
+import asyncio
+import signal
+import time
+from typing import Callable, List, Optional
+from modules.alarmManager import AlarmManager
+from modules.alarmRecord import Alarm
+from modules.metrics import DEFAULT_STATS_INTERVAL, Metrics, instrument_engine
+from modules.notifier import LogFileSink, NotificationDispatcher, StdoutSink, WebhookSink
+from modules.storage import DURABILITY_BATCHED
+from modules.timeUtils import TimeChecker
+
+
+class AlarmDaemon:
+    """Runs AlarmManager + TimeChecker without a display
+
+    The loop sleeps until the scheduler's next fire instant, or until an
+    AlarmManager change event (local, or another process's write seen by
+    the storage watcher) wakes it. Mutations can come from any
+    thread; they are marshalled onto the loop with call_soon_threadsafe.
+    Without an on_trigger callback, alarms go through a
+    NotificationDispatcher to `sinks` (stdout by default).
+    """
+
+    def __init__(self, alarm_manager: AlarmManager, time_checker: Optional[TimeChecker] = None,
+                 on_trigger: Optional[Callable[[Alarm], None]] = None, sound: bool = False,
+                 metrics: Optional[Metrics] = None, sinks: Optional[List] = None):
+        self.alarm_manager = alarm_manager
+        self.time_checker = time_checker if time_checker is not None else TimeChecker()
+        self.notifier = None
+        if on_trigger is None:
+            self.notifier = NotificationDispatcher(sinks or [StdoutSink()], alarm_manager.format_alarm_time)
+            on_trigger = self.notifier.submit
+        self.on_trigger = on_trigger
+        self.sound_player = None
+        if sound:
+            from modules.soundPlayer import SoundPlayer
+            self.sound_player = SoundPlayer()
+        self.metrics = metrics
+        if metrics is not None:
+            instrument_engine(metrics, alarm_manager, self.time_checker, self.sound_player, self.notifier)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def _on_alarm_event(self, event: str, payload):
+        """AlarmManager listener: the scheduler is updated by its own listener, just wake the loop"""
+        if self.loop is not None and self._wake is not None:
+            self.loop.call_soon_threadsafe(self._wake.set)
+
+    async def run(self):
+        """Fire alarms until stop() is called"""
+        self.loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        if hasattr(self.time_checker, 'on_ready'):
+            # Sharded workers report due alarms from another thread; without this the loop sleeps through them
+            self.time_checker.on_ready = lambda: self.loop.call_soon_threadsafe(self._wake.set)
+        loaded = self.alarm_manager.snapshot()
+        self.time_checker.load(loaded)
+        # Edits made by other threads while the scheduler loaded are replayed to it, not wiped
+        self.alarm_manager.add_listener_since(self.time_checker.on_alarm_event, loaded)
+        self.alarm_manager.add_listener(self._on_alarm_event)
+        # External edits reload the scheduler through the listener
+        self.alarm_manager.watch_storage()
+        if self.sound_player is not None:
+            self.sound_player.start()
+        if self.notifier is not None:
+            self.notifier.start()
+        try:
+            while not self._stopping:
+                triggered = self.time_checker.pop_due()
+                started = time.perf_counter()
+                for alarm in triggered:
+                    if self.sound_player is not None:
+                        self.sound_player.request()
+                    try:
+                        self.on_trigger(alarm)
+                    except Exception as e:
+                        print(f"Error handling alarm: {e}")
+                if triggered and self.metrics is not None:
+                    self.metrics.observe('daemon.dispatch', time.perf_counter() - started)
+
+                delay = self.time_checker.max_sleep
+                next_at = self.time_checker.next_due_at()
+                if next_at is not None:
+                    delay = min(delay, max(0.0, next_at - time.time()))
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self.time_checker.wakeups += 1
+        finally:
+            self.alarm_manager.remove_listener(self._on_alarm_event)
+            self.alarm_manager.remove_listener(self.time_checker.on_alarm_event)
+            if self.sound_player is not None:
+                self.sound_player.stop()
+            if self.notifier is not None:
+                # Off the loop thread, so a slow sink finishing its batch cannot stall shutdown handlers
+                await asyncio.get_running_loop().run_in_executor(None, self.notifier.stop)
+
+    def stop(self):
+        """Ask run() to return; safe to call from any thread or signal handler"""
+        self._stopping = True
+        if self.loop is not None and self._wake is not None:
+            self.loop.call_soon_threadsafe(self._wake.set)
+
+
+def run_daemon(db_path: str = "database/alarms.json", history_path: str = "database/history.jsonl",
+               sound: bool = False, http_port: Optional[int] = None, host: str = "127.0.0.1",
+               unix_socket: Optional[str] = None, stats_file: Optional[str] = None,
+               stats_interval: float = DEFAULT_STATS_INTERVAL, notify_log: Optional[str] = None,
+               webhook: Optional[str] = None, shards: int = 0) -> int:
+    """Run the headless daemon until SIGINT/SIGTERM, optionally serving the control API
+
+    Triggered alarms are printed, and also appended to notify_log and
+    POSTed to webhook when those are given. With stats_file, metrics are
+    collected and written there every stats_interval seconds, on
+    SIGUSR1, and at exit. With shards, alarms are scheduled by that many
+    worker processes instead of in-process.
+    """
+    alarm_manager = AlarmManager(db_path, history_path, durability=DURABILITY_BATCHED)
+    metrics = Metrics() if stats_file is not None else None
+    sinks = [StdoutSink()]
+    if notify_log:
+        sinks.append(LogFileSink(notify_log))
+    if webhook:
+        sinks.append(WebhookSink(webhook))
+    time_checker = None
+    if shards:
+        from modules.shardedScheduler import ShardedScheduler
+        time_checker = ShardedScheduler(shards)
+    daemon = AlarmDaemon(alarm_manager, time_checker, sound=sound, metrics=metrics, sinks=sinks)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, daemon.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        if metrics is not None:
+            metrics.start_writer(stats_file, stats_interval)
+            if hasattr(signal, 'SIGUSR1'):
+                loop.add_signal_handler(signal.SIGUSR1, metrics.dump, stats_file)
+        server = None
+        if http_port is not None or unix_socket is not None:
+            from modules.controlServer import ControlServer
+            server = ControlServer(alarm_manager, host=host, port=http_port, unix_path=unix_socket,
+                                   metrics=metrics)
+            await server.start()
+            if http_port is not None:
+                print(f"Control API listening on http://{host}:{server.port}", flush=True)
+            if unix_socket is not None:
+                print(f"Control API listening on {unix_socket}", flush=True)
+        try:
+            await daemon.run()
+        finally:
+            if server is not None:
+                await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.time_checker.close()
+        alarm_manager.close()
+        if metrics is not None:
+            metrics.stop_writer()
+    return 0
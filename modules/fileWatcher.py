@@ -0,0 +1,163 @@
+"""
+File Watcher Module - Handles change notification for files shared between processes
+"""
+import ctypes
+import ctypes.util
+import os
+import platform
+import select
+import struct
+import threading
+from typing import Callable, Dict, List, Optional
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+def _load_inotify():
+    """Return libc if it provides inotify, else None"""
+    if platform.system() != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """Calls callback() from a background thread whenever a watched file changes
+
+    On Linux the thread blocks on inotify watches of the files' parent
+    directories, so it costs nothing while nothing changes and still sees
+    atomic replace-by-rename writes. Elsewhere, or if inotify is
+    unavailable, it falls back to comparing os.stat() every poll_interval.
+    """
+
+    def __init__(self, paths: List[str], callback: Callable[[], None],
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None
+        self.notifications = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Write end of the running inotify thread's wake pipe; the thread closes it on exit
+        self._wake_w: Optional[int] = None
+        self._wake_lock = threading.Lock()
+        self._names: Dict[int, set] = {}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # A fresh event per run: a thread that outlived stop()'s join must not be revived
+        self._stop = stop = threading.Event()
+        inotify_fd = self._open_inotify()
+        if inotify_fd is not None:
+            self.mode = 'inotify'
+            wake_r, self._wake_w = os.pipe()
+            target, args = self._run_inotify, (stop, inotify_fd, wake_r, self._wake_w)
+        else:
+            self.mode = 'poll'
+            target, args = self._run_poll, (stop,)
+        self._thread = threading.Thread(target=target, args=args, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching; the thread closes its own descriptors, even if it outlives the join"""
+        self._stop.set()
+        with self._wake_lock:
+            if self._wake_w is not None:
+                os.write(self._wake_w, b"x")
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _notify(self):
+        self.notifications += 1
+        try:
+            self.callback()
+        except Exception as e:
+            print(f"Error in file watcher callback: {e}")
+
+    # inotify ---------------------------------------------------------------
+
+    def _open_inotify(self) -> Optional[int]:
+        libc = _load_inotify()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        self._names = {}
+        for directory in {os.path.dirname(p) for p in self.paths}:
+            wd = libc.inotify_add_watch(fd, directory.encode(), WATCH_MASK)
+            if wd < 0:
+                os.close(fd)
+                return None
+            self._names[wd] = {os.path.basename(p) for p in self.paths if os.path.dirname(p) == directory}
+        return fd
+
+    def _run_inotify(self, stop: threading.Event, fd: int, wake_r: int, wake_w: int):
+        try:
+            while not stop.is_set():
+                readable, _, _ = select.select([fd, wake_r], [], [])
+                if stop.is_set():
+                    break
+                if fd not in readable:
+                    continue
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                # One callback per batch of events, however many touched our files
+                if self._matches(data):
+                    self._notify()
+        finally:
+            with self._wake_lock:
+                if self._wake_w == wake_w:
+                    self._wake_w = None
+                for descriptor in (fd, wake_r, wake_w):
+                    os.close(descriptor)
+
+    def _matches(self, data: bytes) -> bool:
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].split(b"\0", 1)[0].decode(errors='replace')
+            offset += length
+            if name in self._names.get(wd, ()):
+                return True
+        return False
+
+    # stat polling fallback ---------------------------------------------------
+
+    def _stat_all(self):
+        stats = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stats.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append(None)
+        return stats
+
+    def _run_poll(self, stop: threading.Event):
+        last = self._stat_all()
+        while not stop.wait(self.poll_interval):
+            current = self._stat_all()
+            if current != last:
+                last = current
+                self._notify()
@@ -0,0 +1,346 @@
+"""
+History Log Module - Append-only line-delimited storage for deleted alarms
+"""
+import bisect
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+READ_BLOCK_SIZE = 64 * 1024
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def note_tokens(text: str) -> List[str]:
+    """Split note text into lowercase search tokens"""
+    return WORD_PATTERN.findall(text.lower())
+
+
+@contextmanager
+def advisory_lock(path: str, exclusive: bool):
+    """Hold an fcntl lock on path, shared with other processes locking the same file"""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def entry_tokens(entry: Dict) -> set:
+    """Distinct search tokens of a history entry's note (or legacy label)"""
+    return set(note_tokens(str(entry.get('note', entry.get('label', '')))))
+
+
+class HistoryIndex:
+    """In-memory index over a HistoryLog: line offsets, deleted_at values and note tokens
+
+    The index catches up incrementally from the last indexed byte, and it
+    is rebuilt from scratch when the file is replaced (e.g. by compaction).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.offsets: List[int] = []
+        self.deleted_at: List[str] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._chronological = True
+        self._indexed_size = 0
+        self._inode = None
+
+    def refresh(self):
+        """Index any lines appended since the last refresh"""
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                self._reset()
+                return
+            if st.st_ino != self._inode or st.st_size < self._indexed_size:
+                self._reset()
+                self._inode = st.st_ino
+            if st.st_size == self._indexed_size:
+                return
+            with open(self.path, 'rb') as f:
+                f.seek(self._indexed_size)
+                data = f.read(st.st_size - self._indexed_size)
+            offset = self._indexed_size
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].split(b"\n")[:-1]:
+                entry = HistoryLog._parse(line)
+                if entry is not None:
+                    self._add(offset, entry)
+                offset += len(line) + 1
+            self._indexed_size += end
+
+    def _add(self, offset: int, entry: Dict):
+        position = len(self.offsets)
+        deleted_at = entry.get('deleted_at') or ''
+        if self.deleted_at and deleted_at < self.deleted_at[-1]:
+            self._chronological = False
+        self.offsets.append(offset)
+        self.deleted_at.append(deleted_at)
+        for token in entry_tokens(entry):
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = [position]
+                self._vocabulary_dirty = True
+            else:
+                postings.append(position)
+
+    def _token_matches(self, word: str) -> set:
+        """Positions whose note has a token starting with `word`"""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        matches = set()
+        start = bisect.bisect_left(self._vocabulary, word)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(word):
+                break
+            matches.update(self._postings[token])
+        return matches
+
+    def search(self, text: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None) -> List[int]:
+        """Return byte offsets of matching entries, newest first
+
+        `text` matches entries whose note has a word starting with every
+        query word; `since` is inclusive and `until` exclusive, both
+        compared against the ISO deleted_at string.
+        """
+        self.refresh()
+        with self._lock:
+            if self._chronological:
+                low = bisect.bisect_left(self.deleted_at, since) if since else 0
+                high = bisect.bisect_left(self.deleted_at, until) if until else len(self.deleted_at)
+                in_range = lambda p: low <= p < high
+            else:
+                in_range = lambda p: ((not since or self.deleted_at[p] >= since)
+                                      and (not until or self.deleted_at[p] < until))
+            words = note_tokens(text) if text else []
+            if words:
+                candidates = None
+                for word in words:
+                    matches = self._token_matches(word)
+                    candidates = matches if candidates is None else candidates & matches
+                positions = sorted(p for p in candidates if in_range(p))
+            elif self._chronological:
+                positions = range(low, high)
+            else:
+                positions = [p for p in range(len(self.offsets)) if in_range(p)]
+            return [self.offsets[p] for p in reversed(positions)]
+
+
+class HistoryLog:
+    """Append-only history shared between processes
+
+    Appenders hold the fcntl lock on lock_path shared and compaction holds
+    it exclusively, so no append can land in a file compaction is about
+    to replace. JsonStorage passes its own lock file.
+    """
+
+    def __init__(self, path: str = "database/history.jsonl", legacy_path: Optional[str] = None,
+                 lock_path: Optional[str] = None):
+        self.path = path
+        self.legacy_path = legacy_path if legacy_path is not None else os.path.splitext(path)[0] + ".json"
+        self.lock_path = lock_path if lock_path is not None else path + ".lock"
+        self._lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._ensure_file()
+        self.index = HistoryIndex(path)
+
+    def _ensure_file(self):
+        """Create the log, migrating a legacy history.json on first run"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(self.path):
+            if os.path.exists(self.legacy_path):
+                self.migrate_legacy()
+            else:
+                open(self.path, 'a').close()
+
+    def migrate_legacy(self) -> int:
+        """Convert a legacy JSON-array history file into the line log, returning the entry count"""
+        try:
+            with open(self.legacy_path, 'r') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = []
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        os.replace(tmp_path, self.path)
+        return len(entries)
+
+    def append(self, entry: Dict):
+        """Append a single history entry"""
+        self.append_many([entry])
+
+    def append_many(self, entries: List[Dict], sync: bool = False, locked: bool = False):
+        """Append several entries with one write, optionally fsyncing afterwards
+
+        Set locked when the caller already holds lock_path exclusively.
+        """
+        data = "".join(json.dumps(entry, separators=(',', ':')) + "\n" for entry in entries)
+        if not locked:
+            with advisory_lock(self.lock_path, exclusive=False):
+                self._write(data, sync)
+        else:
+            self._write(data, sync)
+
+    def _write(self, data: str, sync: bool):
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(data)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def iter_entries(self, reverse: bool = False) -> Iterator[Dict]:
+        """Stream history entries oldest-first, or newest-first when reverse is set"""
+        lines = self._iter_lines_reverse() if reverse else self._iter_lines()
+        for line in lines:
+            entry = self._parse(line)
+            if entry is not None:
+                yield entry
+
+    def search(self, text: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None) -> Iterator[Dict]:
+        """Stream entries matching a note/deleted_at filter, newest first"""
+        if not text and not since and not until:
+            yield from self.iter_entries(reverse=True)
+            return
+        offsets = self.index.search(text, since, until)
+        with open(self.path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                entry = self._parse(f.readline())
+                if entry is not None:
+                    yield entry
+
+    def max_alarm_id(self) -> int:
+        """Highest alarm ID in the log or its rotated `<path>.1`, or 0 if there is none"""
+        highest = 0
+        for path in (self.path, self.path + ".1"):
+            try:
+                with open(path, 'rb') as f:
+                    for line in f:
+                        entry = self._parse(line)
+                        if entry is not None and isinstance(entry.get('id'), int):
+                            highest = max(highest, entry['id'])
+            except FileNotFoundError:
+                continue
+        return highest
+
+    def _iter_lines(self) -> Iterator[bytes]:
+        """Yield raw lines from the start of the file"""
+        try:
+            with open(self.path, 'rb') as f:
+                yield from f
+        except FileNotFoundError:
+            return
+
+    def _iter_lines_reverse(self) -> Iterator[bytes]:
+        """Yield lines from the end of the file backwards, one block at a time"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b""
+            while position > 0:
+                size = min(READ_BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                block = f.read(size) + remainder
+                lines = block.split(b"\n")
+                remainder = lines[0]
+                for line in reversed(lines[1:]):
+                    if line:
+                        yield line
+            if remainder:
+                yield remainder
+
+    @staticmethod
+    def _parse(line: bytes) -> Optional[Dict]:
+        """Decode one log line, skipping blank or torn lines"""
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+
+    def compact(self, max_entries: Optional[int] = None) -> Dict:
+        """Rewrite the log without torn lines, rotating the oldest entries beyond max_entries
+
+        Rotated entries are appended to `<path>.1`. Appends made while the
+        rewrite runs, by this or another process, are carried over before
+        the new file is swapped in.
+        """
+        with self._lock:
+            snapshot_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+        entries = []
+        with open(self.path, 'rb') as f:
+            for line in f.read(snapshot_size).split(b"\n"):
+                entry = self._parse(line)
+                if entry is not None:
+                    entries.append(entry)
+
+        rotated = []
+        if max_entries is not None and len(entries) > max_entries:
+            cut = len(entries) - max_entries
+            rotated, entries = entries[:cut], entries[cut:]
+            with open(self.path + ".1", 'a') as f:
+                for entry in rotated:
+                    f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+
+        # File lock first, as appenders take it: no one can append between the tail copy and the swap
+        with advisory_lock(self.lock_path, exclusive=True), self._lock:
+            with open(self.path, 'rb') as src:
+                src.seek(snapshot_size)
+                tail = src.read()
+            with open(tmp_path, 'ab') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+        return {'kept': len(entries), 'rotated': len(rotated)}
+
+    def compact_in_background(self, max_entries: Optional[int] = None) -> threading.Thread:
+        """Run compact() on a daemon thread, reusing one that is still running"""
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return self._compaction_thread
+        self._compaction_thread = threading.Thread(
+            target=self.compact, kwargs={'max_entries': max_entries}, daemon=True
+        )
+        self._compaction_thread.start()
+        return self._compaction_thread
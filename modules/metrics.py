@@ -0,0 +1,214 @@
+"""
+Metrics Module - Handles opt-in timing histograms, counters and gauges with JSON export
+"""
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+# Histogram bucket upper bounds in seconds; one set covers both sub-millisecond
+# operations and alarms that fire an hour late
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, 300.0, 3600.0)
+
+DEFAULT_STATS_INTERVAL = 60.0
+
+
+class Histogram:
+    """Counts of observed durations per bucket, plus count/sum/min/max"""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (max for the overflow bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict:
+        buckets = {f"le_{bound:g}": n for bound, n in zip(BUCKETS, self.counts) if n}
+        if self.counts[-1]:
+            buckets['inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': buckets
+        }
+
+
+class Metrics:
+    """Registry of histograms, counters and gauges shared by the engine's components
+
+    Nothing is measured unless a Metrics object is attached: instrument()
+    replaces an object's methods with timed wrappers on that one instance,
+    and components holding metrics=None skip recording entirely, so a
+    disabled build pays at most an `is None` check on its hot paths.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_path: Optional[str] = None
+        self._stop = threading.Event()
+
+    # Recording ---------------------------------------------------------------
+
+    def observe(self, name: str, seconds: float):
+        """Add one duration to the named histogram"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    def count(self, name: str, amount: int = 1):
+        """Add to a named counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name: str, read: Callable[[], float]):
+        """Register a callable sampled at every snapshot, e.g. a queue's qsize"""
+        self.gauges[name] = read
+
+    def timed(self, name: str, function: Callable) -> Callable:
+        """Wrap a callable so each call's duration lands in the named histogram"""
+        observe = self.observe
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(name, perf_counter() - start)
+        return wrapper
+
+    def instrument(self, obj, prefix: str, names: Optional[Iterable[str]] = None):
+        """Time every public method of obj (or just `names`) as '<prefix>.<method>'
+
+        Wrappers are set on the instance, so calls the object makes on
+        itself are timed too and other instances are unaffected. Private
+        helpers are left alone: a wrapped context manager or generator
+        would only time creating the generator, not the work it does.
+        """
+        if names is None:
+            names = [name for name in dir(type(obj))
+                     if not name.startswith('_') and callable(getattr(type(obj), name, None))]
+        for name in names:
+            setattr(obj, name, self.timed(f"{prefix}.{name}", getattr(obj, name)))
+
+    # Export ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict:
+        """Return every metric as JSON-serializable data"""
+        with self._lock:
+            histograms = {name: h.to_dict() for name, h in sorted(self.histograms.items())}
+            counters = dict(sorted(self.counters.items()))
+        gauges = {}
+        for name, read in sorted(self.gauges.items()):
+            try:
+                gauges[name] = read()
+            except Exception:
+                gauges[name] = None
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'uptime': time.time() - self.started,
+            'histograms': histograms,
+            'counters': counters,
+            'gauges': gauges
+        }
+
+    def dump(self, path: str) -> bool:
+        """Write a snapshot to path atomically, returning False if it could not be written"""
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error writing stats to {path}: {e}")
+            return False
+        return True
+
+    def start_writer(self, path: str, interval: float = DEFAULT_STATS_INTERVAL):
+        """Dump to path every interval seconds from a background thread"""
+        if self._writer is not None:
+            return
+        self._stop.clear()
+        self._writer_path = path
+
+        def run():
+            while not self._stop.wait(interval):
+                self.dump(path)
+        self._writer = threading.Thread(target=run, name="alarmo-stats", daemon=True)
+        self._writer.start()
+
+    def stop_writer(self):
+        """Stop the periodic writer after one final dump"""
+        if self._writer is None:
+            return
+        self._stop.set()
+        self._writer.join(timeout=2.0)
+        self._writer = None
+        self.dump(self._writer_path)
+
+
+def instrument_engine(metrics: Metrics, alarm_manager, time_checker, sound_player=None, notifier=None):
+    """Attach metrics to the alarm engine
+
+    Times every public AlarmManager and storage method and the scheduler's
+    entry points (time_checker.pop_due is the checker tick), records
+    trigger lateness, and samples queue depths.
+    """
+    metrics.instrument(alarm_manager, 'alarm_manager')
+    metrics.instrument(alarm_manager.storage, 'storage')
+    metrics.instrument(time_checker, 'time_checker', [
+        name for name in ('load', 'schedule', 'schedule_many', 'unschedule', 'next_due_at', 'pop_due',
+                          'check_alarms', 'upcoming')
+        if hasattr(time_checker, name)
+    ])
+    time_checker.metrics = metrics
+    metrics.gauge('queue.scheduled_alarms', time_checker.scheduled_count)
+    metrics.gauge('scheduler.skipped_triggers', lambda: time_checker.skipped_triggers)
+    if sound_player is not None:
+        metrics.gauge('queue.sound', sound_player.queue_depth)
+        metrics.gauge('sound.dropped', lambda: sound_player.dropped)
+    if notifier is not None:
+        metrics.gauge('queue.notifications', notifier.queue_depth)
+        metrics.gauge('notifications.dropped', lambda: notifier.dropped)
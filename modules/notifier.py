@@ -0,0 +1,211 @@
+"""
+Notifier Module - Handles delivering triggered alarms to pluggable sinks in coalesced batches
+"""
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from modules.alarmRecord import Alarm
+
+
+class Notification:
+    """One alarm trigger: the alarm, when it fired and its display time"""
+
+    __slots__ = ('alarm', 'fired_at', 'text')
+
+    def __init__(self, alarm: Alarm, fired_at: float, text: str):
+        self.alarm = alarm
+        self.fired_at = fired_at
+        self.text = text
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.alarm.id,
+            'time': self.text,
+            'note': self.alarm.note,
+            'fired_at': datetime.fromtimestamp(self.fired_at).isoformat(timespec='seconds')
+        }
+
+
+class StdoutSink:
+    """Print one line per alarm, as the daemon always has"""
+
+    name = 'stdout'
+
+    def deliver(self, batch: List[Notification]):
+        for notification in batch:
+            fired_at = datetime.fromtimestamp(notification.fired_at).isoformat(timespec='seconds')
+            print(f"[{fired_at}] Alarm! {notification.text} - {notification.alarm.note}", flush=True)
+
+
+class LogFileSink:
+    """Append one JSON line per alarm to a log file"""
+
+    name = 'log'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def deliver(self, batch: List[Notification]):
+        data = "".join(json.dumps(n.to_dict()) + "\n" for n in batch)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+
+
+class WebhookSink:
+    """POST each batch as {"alarms": [...]} to a local HTTP endpoint"""
+
+    name = 'webhook'
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, batch: List[Notification]):
+        body = json.dumps({'alarms': [n.to_dict() for n in batch]}).encode()
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class NotificationDispatcher:
+    """Bounded queue feeding batched alarm notifications to sinks on a worker pool
+
+    submit() never blocks the scheduler: when the queue is full the
+    notification is dropped and counted. A coalescing thread gathers
+    everything submitted within coalesce_window into one batch, and each
+    sink receives that batch on the pool. A sink that already has
+    max_in_flight batches outstanding loses new ones rather than queueing
+    without limit, so a slow sink cannot hold up the others or the queue.
+    A sink is any object with deliver(batch), or a plain callable.
+    """
+
+    def __init__(self, sinks: List, formatter: Optional[Callable[[Alarm], str]] = None, max_pending: int = 1024,
+                 coalesce_window: float = 0.25, max_batch: int = 200, workers: int = 2, max_in_flight: int = 4):
+        self.sinks = list(sinks)
+        self.formatter = formatter
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.submitted = 0
+        self.dropped = 0
+        self.batches = 0
+        self.delivered = 0
+        self.failed = 0
+        self.sink_dropped: Dict[str, int] = {}
+        self._in_flight = [0] * len(self.sinks)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def sink_name(sink) -> str:
+        return getattr(sink, 'name', None) or getattr(sink, '__name__', type(sink).__name__)
+
+    def start(self):
+        """Start the coalescing thread and the sink worker pool"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="alarmo-notify")
+        self._thread = threading.Thread(target=self._run, name="alarmo-notifier", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Deliver what is already queued, then stop the thread and the pool"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+        self._pool.shutdown(wait=True)
+        self._pool = None
+
+    def submit(self, alarm: Alarm, fired_at: Optional[float] = None) -> bool:
+        """Queue a triggered alarm; returns False if the queue is full and it was dropped"""
+        if self.formatter is not None:
+            text = self.formatter(alarm)
+        else:
+            text = f"{alarm.hour_12:02d}:{alarm.minute:02d}:{alarm.second:02d} {alarm.period}"
+        try:
+            self._queue.put_nowait(Notification(alarm, time.time() if fired_at is None else fired_at, text))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def queue_depth(self) -> int:
+        """Number of notifications waiting to be batched"""
+        return self._queue.qsize()
+
+    def stats(self) -> Dict:
+        return {
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'sink_dropped': dict(self.sink_dropped),
+            'queued': self.queue_depth()
+        }
+
+    def _run(self):
+        """Take one notification, gather the rest of the burst, hand the batch to every sink"""
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.coalesce_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[Notification]):
+        self.batches += 1
+        for index, sink in enumerate(self.sinks):
+            with self._lock:
+                if self._in_flight[index] >= self.max_in_flight:
+                    name = self.sink_name(sink)
+                    self.sink_dropped[name] = self.sink_dropped.get(name, 0) + len(batch)
+                    continue
+                self._in_flight[index] += 1
+            self._pool.submit(self._deliver, index, sink, batch)
+
+    def _deliver(self, index: int, sink, batch: List[Notification]):
+        try:
+            getattr(sink, 'deliver', sink)(batch)
+            with self._lock:
+                self.delivered += len(batch)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+            print(f"Error in {self.sink_name(sink)} notification sink: {e}")
+        finally:
+            with self._lock:
+                self._in_flight[index] -= 1
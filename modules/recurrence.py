@@ -0,0 +1,267 @@
+"""
+Recurrence Module - Handles alarm repeat rules and their next-occurrence functions
+"""
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Optional
+from modules.alarmRecord import Alarm
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_WEEKDAY_INDEX = {name.lower(): i for i, name in enumerate(WEEKDAYS)}
+_WEEKDAY_INDEX.update({name.lower(): i for i, name in enumerate(
+    ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'))})
+
+# Rule keys accepted under an alarm's "repeat" field
+RULE_KEYS = ('days', 'every', 'start', 'date', 'skip', 'until')
+
+
+def _parse_date(value, field: str) -> int:
+    """Return the ordinal of a 'YYYY-MM-DD' string"""
+    try:
+        return date.fromisoformat(str(value)).toordinal()
+    except ValueError:
+        raise ValueError(f"{field} must be a date like 2026-01-31, not {value!r}") from None
+
+
+def _format_date(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+class Recurrence:
+    """Which days an alarm fires on; no rule at all means every day
+
+    Covers weekday sets ("days"), intervals ("every" N days, or N weeks
+    when combined with days, counted from "start"), one-shot dates
+    ("date"), skipped dates ("skip") and an inclusive end ("until").
+    Dates are kept as proleptic ordinals so rules compile to integer math.
+    """
+
+    __slots__ = ('weekdays', 'every', 'start', 'date', 'skip', 'until')
+
+    def __init__(self, weekdays: Optional[FrozenSet[int]] = None, every: int = 1, start: Optional[int] = None,
+                 date: Optional[int] = None, skip: FrozenSet[int] = frozenset(), until: Optional[int] = None):
+        self.weekdays = weekdays
+        self.every = every
+        self.start = start
+        self.date = date
+        self.skip = skip
+        self.until = until
+
+    def _key(self):
+        return (self.weekdays, self.every, self.start, self.date, self.skip, self.until)
+
+    def __eq__(self, other):
+        if not isinstance(other, Recurrence):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Recurrence({self.to_dict()!r})"
+
+    @classmethod
+    def from_dict(cls, data: Dict, default_start: Optional[date] = None) -> 'Recurrence':
+        """Validate a repeat rule, raising ValueError with a user-facing message"""
+        if not isinstance(data, dict):
+            raise ValueError("repeat must be an object")
+        unknown = set(data) - set(RULE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown repeat field(s): {', '.join(sorted(unknown))}")
+
+        weekdays = None
+        if data.get('days') is not None:
+            days = data['days']
+            if isinstance(days, str):
+                days = [d for d in days.replace(',', ' ').split() if d]
+            elif not isinstance(days, (list, tuple)):
+                raise ValueError("days must be a list of weekdays")
+            unknown_days = [d for d in days if str(d).strip().lower() not in _WEEKDAY_INDEX]
+            if unknown_days:
+                raise ValueError(f"Unknown weekday: {unknown_days[0]}")
+            weekdays = frozenset(_WEEKDAY_INDEX[str(d).strip().lower()] for d in days)
+            if not weekdays:
+                raise ValueError("days must name at least one weekday")
+
+        try:
+            every = 1 if data.get('every') is None else int(data['every'])
+        except (TypeError, ValueError):
+            raise ValueError("every must be a whole number") from None
+        if every < 1:
+            raise ValueError("every must be at least 1")
+
+        start = _parse_date(data['start'], 'start') if data.get('start') else None
+        if every > 1 and start is None:
+            if default_start is None:
+                raise ValueError("start is required when every is greater than 1")
+            start = default_start.toordinal()
+
+        one_shot = _parse_date(data['date'], 'date') if data.get('date') else None
+        if one_shot is not None and (weekdays is not None or every > 1):
+            raise ValueError("date cannot be combined with days or every")
+
+        skip = data.get('skip') or ()
+        if not isinstance(skip, (list, tuple)):
+            raise ValueError("skip must be a list of dates")
+        skip = frozenset(_parse_date(d, 'skip') for d in skip)
+        until = _parse_date(data['until'], 'until') if data.get('until') else None
+        return cls(weekdays, every, start, one_shot, skip, until)
+
+    def to_dict(self) -> Dict:
+        """Serialize to the stored "repeat" form"""
+        data = {}
+        if self.weekdays is not None:
+            data['days'] = [WEEKDAYS[i] for i in sorted(self.weekdays)]
+        if self.every > 1:
+            data['every'] = self.every
+        if self.start is not None:
+            data['start'] = _format_date(self.start)
+        if self.date is not None:
+            data['date'] = _format_date(self.date)
+        if self.skip:
+            data['skip'] = [_format_date(d) for d in sorted(self.skip)]
+        if self.until is not None:
+            data['until'] = _format_date(self.until)
+        return data
+
+    def describe(self) -> str:
+        """Short human-readable summary, e.g. 'every 2 weeks on Mon, Thu'"""
+        if self.date is not None:
+            text = f"on {_format_date(self.date)}"
+        elif self.weekdays is not None:
+            days = ", ".join(WEEKDAYS[i] for i in sorted(self.weekdays))
+            text = f"every {self.every} weeks on {days}" if self.every > 1 else days
+        elif self.every > 1:
+            text = f"every {self.every} days"
+        else:
+            text = "daily"
+        if self.until is not None:
+            text += f" until {_format_date(self.until)}"
+        if self.skip:
+            text += f", skipping {len(self.skip)} date{'s' if len(self.skip) > 1 else ''}"
+        return text
+
+    def _first_day(self) -> Callable[[int], Optional[int]]:
+        """Return f(ordinal) -> first matching ordinal >= it, ignoring skip and until"""
+        if self.date is not None:
+            one_shot = self.date
+            return lambda day: one_shot if day <= one_shot else None
+
+        start = self.start
+        every = self.every
+        if self.weekdays is None:
+            if every == 1:
+                return lambda day: day if start is None or day >= start else start
+
+            def every_n_days(day: int) -> int:
+                if day <= start:
+                    return start
+                return day + (start - day) % every
+            return every_n_days
+
+        # Days until the next listed weekday, indexed by weekday (Mon=0)
+        ahead = [min((w - d) % 7 for w in self.weekdays) for d in range(7)]
+        if every == 1:
+            def weekly(day: int) -> int:
+                if start is not None and day < start:
+                    day = start
+                return day + ahead[(day - 1) % 7]
+            return weekly
+
+        # Every N weeks, counted from the Monday of the start week
+        first_monday = start - (start - 1) % 7
+
+        def every_n_weeks(day: int) -> int:
+            if day < start:
+                day = start
+            week = (day - first_monday) // 7
+            if week % every:
+                week += every - week % every
+                day = first_monday + week * 7
+            candidate = day + ahead[(day - 1) % 7]
+            if (candidate - first_monday) // 7 != week:
+                # Ran past this week's last listed day; jump to the next active week
+                week += every
+                monday = first_monday + week * 7
+                candidate = monday + ahead[0]
+            return candidate
+        return every_n_weeks
+
+    def first_day(self) -> Callable[[int], Optional[int]]:
+        """Return f(ordinal) -> first ordinal >= it the rule fires on, or None once it has ended"""
+        base = self._first_day()
+        skip = self.skip
+        until = self.until
+
+        def first(day: int) -> Optional[int]:
+            day = base(day)
+            while day is not None and day in skip:
+                day = base(day + 1)
+            if day is not None and until is not None and day > until:
+                return None
+            return day
+        return first
+
+
+@lru_cache(maxsize=4096)
+def _day_function(rule: Recurrence) -> Callable[[int], Optional[int]]:
+    return rule.first_day()
+
+
+def compile_rule(rule: Recurrence, tod: int) -> Callable[[float], Optional[float]]:
+    """Return f(after) -> first epoch instant strictly after `after`, or None when the rule has ended
+
+    The day matcher is built once per distinct rule and shared between alarms.
+    """
+    first_day = _day_function(rule)
+    hour, minute, second = tod // 3600, tod // 60 % 60, tod % 60
+
+    def next_occurrence(after: float) -> Optional[float]:
+        day = first_day(date.fromtimestamp(after).toordinal())
+        while day is not None:
+            d = date.fromordinal(day)
+            instant = datetime(d.year, d.month, d.day, hour, minute, second).timestamp()
+            if instant > after:
+                return instant
+            day = first_day(day + 1)
+        return None
+    return next_occurrence
+
+
+def parse_repeat(value, default_start: Optional[date] = None) -> Optional[Recurrence]:
+    """Parse a repeat rule given as a dict, a JSON string (CSV cells) or nothing"""
+    if value is None or value == '' or value == {}:
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ValueError("repeat must be a JSON object") from None
+    return Recurrence.from_dict(value, default_start)
+
+
+def recurrence_for(alarm: Alarm) -> Optional[Recurrence]:
+    """Return the alarm's rule, or None if it fires every day
+
+    Legacy entries carry a plain "days" list, read as a weekday set.
+    """
+    extra = alarm.extra
+    if extra is None:
+        return None
+    data = extra.get('repeat')
+    if data is None:
+        if not extra.get('days'):
+            return None
+        data = {'days': extra['days']}
+    try:
+        return _cached_rule(json.dumps(data, sort_keys=True))
+    except ValueError as e:
+        print(f"Ignoring invalid repeat rule on alarm {alarm.id}: {e}")
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _cached_rule(text: str) -> Recurrence:
+    return Recurrence.from_dict(json.loads(text))
@@ -0,0 +1,392 @@
+"""
+Sharded Scheduler Module - Handles splitting the fire queue across worker processes by time of day
+"""
+import heapq
+import itertools
+import multiprocessing
+import signal
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from modules.alarmColumns import DAY
+from modules.alarmRecord import Alarm
+from modules.timeUtils import CATCH_UP_FIRE, TimeChecker
+
+# A shard holding more than this multiple of its fair share triggers a re-split
+REBALANCE_FACTOR = 2.0
+# ...but not while the shards are this small
+REBALANCE_MIN_ALARMS = 1024
+# Seconds to wait for a worker to answer a query
+QUERY_TIMEOUT = 10.0
+
+
+def _pack(alarms: List[Alarm]) -> Tuple[array, array, list]:
+    """Shrink alarms to what a worker needs; plain arrays pickle far faster than records"""
+    ids = array('q')
+    tods = array('l')
+    recurring = []
+    for alarm in alarms:
+        if alarm.extra is None:
+            ids.append(alarm.id)
+            tods.append(alarm.tod)
+        else:
+            recurring.append((alarm.id, alarm.tod, alarm.active, alarm.extra))
+    return ids, tods, recurring
+
+
+def _unpack(packed: Tuple[array, array, list]) -> List[Alarm]:
+    ids, tods, recurring = packed
+    alarms = [Alarm(alarm_id, tod) for alarm_id, tod in zip(ids, tods)]
+    alarms.extend(Alarm(alarm_id, tod, active=active, extra=extra) for alarm_id, tod, active, extra in recurring)
+    return alarms
+
+
+def _shard_main(index: int, conn, results, max_sleep: float, catch_up_window: float, catch_up_policy: str,
+                columnar: Optional[bool]):
+    """Worker process: owns one shard's TimeChecker and reports due alarm IDs to the parent"""
+    # Ctrl+C reaches the whole process group; the parent decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    checker = TimeChecker(max_sleep, catch_up_window, catch_up_policy, columnar)
+
+    def report_due():
+        due = checker.pop_due_timed()
+        if due:
+            fired = [(alarm.id, fire_at) for fire_at, alarm in due]
+            results.put(('due', index, fired, checker.next_due_at(), checker.skipped_triggers))
+
+    while True:
+        next_at = checker.next_due_at()
+        timeout = max_sleep if next_at is None else min(max_sleep, max(0.0, next_at - time.time()))
+        if conn.poll(timeout):
+            try:
+                command, *args = conn.recv()
+            except EOFError:
+                return
+            if command == 'stop':
+                return
+            # Fire what is already due first, so a reload never swallows it
+            report_due()
+            if command == 'load':
+                checker.load(_unpack(args[0]), args[1])
+            elif command == 'schedule':
+                checker.schedule_many(_unpack(args[0]), args[1])
+            elif command == 'unschedule':
+                for alarm_id in args[0]:
+                    checker.unschedule(alarm_id)
+            elif command == 'upcoming':
+                limit, query = args
+                conn.send((query, [(fire_at, alarm.id) for fire_at, alarm in checker.upcoming(limit)]))
+            results.put(('next', index, checker.next_due_at(), checker.skipped_triggers))
+        report_due()
+
+
+class ShardedScheduler:
+    """TimeChecker stand-in that spreads alarms over worker processes
+
+    The day is cut into as many seconds-of-day ranges as there are
+    shards, at quantiles of the loaded alarm times so each worker gets a
+    similar share. Every worker runs its own TimeChecker over its range,
+    so evaluating due alarms runs on several cores instead of one thread
+    under the GIL. Workers send back only the IDs of due alarms; a
+    collector thread turns them into this process's Alarm records.
+    Moving an alarm to a time in another range moves it to that shard,
+    and a shard that grows past REBALANCE_FACTOR times its fair share
+    makes the ranges be recomputed. Workers follow the wall clock, so
+    the `now` arguments TimeChecker accepts for testing are ignored here.
+    """
+
+    def __init__(self, shards: int = 0, max_sleep: float = 60.0, catch_up_window: float = 3600.0,
+                 catch_up_policy: str = CATCH_UP_FIRE, columnar: Optional[bool] = None):
+        self.shards = shards or multiprocessing.cpu_count()
+        self.max_sleep = max_sleep
+        self.catch_up_window = catch_up_window
+        self.catch_up_policy = catch_up_policy
+        self.columnar = columnar
+        self.last_tick: Optional[float] = None
+        self.wakeups = 0
+        self.lateness_log = deque(maxlen=1000)
+        self.metrics = None
+        # Called from the collector thread whenever due alarms arrive, e.g. to wake an event loop
+        self.on_ready: Optional[Callable[[], None]] = None
+        self.rebalances = 0
+        self._bounds: List[int] = []
+        self._alarms: Dict[int, Alarm] = {}
+        self._owner: Dict[int, int] = {}
+        self._counts = [0] * self.shards
+        self._next_at: List[Optional[float]] = [None] * self.shards
+        self._skipped = [0] * self.shards
+        self._ready: List[int] = []
+        self._cond = threading.Condition()
+        self._lock = threading.RLock()
+        self._processes = []
+        self._conns = []
+        self._conn_locks = []
+        # Tags 'upcoming' queries so a late answer to one that timed out is never taken for the next
+        self._queries = itertools.count(1)
+        self._results = None
+        self._collector: Optional[threading.Thread] = None
+
+    # Worker lifecycle --------------------------------------------------------
+
+    def start(self):
+        """Start the worker processes and the collector thread"""
+        if self._processes:
+            return
+        # Spawned rather than forked: the parent runs Tk and watcher threads that must not be copied
+        context = multiprocessing.get_context('spawn')
+        self._results = context.Queue()
+        for index in range(self.shards):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_shard_main, name=f"alarmo-shard-{index}", daemon=True,
+                args=(index, child_conn, self._results, self.max_sleep, self.catch_up_window,
+                      self.catch_up_policy, self.columnar)
+            )
+            process.start()
+            self._processes.append(process)
+            self._conns.append(parent_conn)
+            self._conn_locks.append(threading.Lock())
+        self._collector = threading.Thread(target=self._collect, name="alarmo-shard-collector", daemon=True)
+        self._collector.start()
+
+    def close(self):
+        """Stop the workers"""
+        for index in range(len(self._processes)):
+            self._send(index, ('stop',))
+        for process in self._processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        if self._results is not None:
+            self._results.put(None)
+        if self._collector is not None:
+            self._collector.join(timeout=2.0)
+        self._processes = []
+        self._conns = []
+        self._conn_locks = []
+        self._collector = None
+
+    def _send(self, index: int, message):
+        with self._conn_locks[index]:
+            try:
+                self._conns[index].send(message)
+            except (BrokenPipeError, OSError) as e:
+                print(f"Scheduler shard {index} is gone: {e}")
+
+    def _collect(self):
+        """Collector thread: turn worker reports into ready alarms"""
+        while True:
+            try:
+                message = self._results.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            if message[0] == 'next':
+                _, index, next_at, skipped = message
+                self._next_at[index] = next_at
+                self._skipped[index] = skipped
+                continue
+            _, index, fired, next_at, skipped = message
+            received = time.time()
+            for alarm_id, fire_at in fired:
+                lateness = received - fire_at
+                self.lateness_log.append((alarm_id, fire_at, lateness))
+                if self.metrics is not None:
+                    self.metrics.observe('trigger_lateness', lateness)
+            with self._cond:
+                self._next_at[index] = next_at
+                self._skipped[index] = skipped
+                self._ready.extend(alarm_id for alarm_id, _ in fired)
+                self._cond.notify_all()
+            if self.on_ready is not None:
+                self.on_ready()
+
+    # Partitioning ------------------------------------------------------------
+
+    def _split(self, alarms: List[Alarm]):
+        """Cut the day at quantiles of the alarm times so each shard gets a similar share"""
+        tods = sorted(a.tod for a in alarms)
+        if len(tods) < self.shards * 2:
+            self._bounds = [DAY * i // self.shards for i in range(1, self.shards)]
+            return
+        bounds = []
+        for i in range(1, self.shards):
+            bound = tods[len(tods) * i // self.shards]
+            bounds.append(max(bound, bounds[-1] + 1 if bounds else 1))
+        self._bounds = bounds
+
+    def shard_for(self, tod: int) -> int:
+        return bisect_right(self._bounds, tod)
+
+    def load(self, alarms: List[Alarm], now: float = None):
+        """Re-split the day and give every worker its share of a full alarm set"""
+        self.start()
+        now = time.time() if now is None else now
+        active = [a for a in alarms if a.active]
+        with self._lock:
+            self._split(active)
+            self._alarms = {a.id: a for a in active}
+            self._owner = {}
+            parts = [[] for _ in range(self.shards)]
+            for alarm in active:
+                index = self.shard_for(alarm.tod)
+                self._owner[alarm.id] = index
+                parts[index].append(alarm)
+            self._counts = [len(part) for part in parts]
+            for index, part in enumerate(parts):
+                self._send(index, ('load', _pack(part), now))
+
+    def schedule(self, alarm: Alarm, now: float = None):
+        """Add or reschedule one alarm, moving it to another shard if its time left this one's range"""
+        self.schedule_many([alarm], now)
+
+    def schedule_many(self, alarms: List[Alarm], now: float = None):
+        """Add or reschedule a batch with one message per affected shard"""
+        self.start()
+        now = time.time() if now is None else now
+        with self._lock:
+            added = [[] for _ in range(self.shards)]
+            removed = [[] for _ in range(self.shards)]
+            for alarm in alarms:
+                old = self._owner.get(alarm.id)
+                if not alarm.active:
+                    if old is not None:
+                        removed[old].append(alarm.id)
+                        self._forget(alarm.id, old)
+                    continue
+                index = self.shard_for(alarm.tod)
+                if old is not None and old != index:
+                    removed[old].append(alarm.id)
+                    self._forget(alarm.id, old)
+                    old = None
+                if old is None:
+                    self._counts[index] += 1
+                self._owner[alarm.id] = index
+                self._alarms[alarm.id] = alarm
+                added[index].append(alarm)
+            for index in range(self.shards):
+                if removed[index]:
+                    self._send(index, ('unschedule', removed[index]))
+                if added[index]:
+                    self._send(index, ('schedule', _pack(added[index]), now))
+            self._maybe_rebalance(now)
+
+    def unschedule(self, alarm_id: int):
+        """Remove an alarm from whichever shard holds it"""
+        with self._lock:
+            index = self._owner.get(alarm_id)
+            if index is None:
+                return
+            self._forget(alarm_id, index)
+            self._send(index, ('unschedule', [alarm_id]))
+
+    def _forget(self, alarm_id: int, index: int):
+        del self._owner[alarm_id]
+        self._alarms.pop(alarm_id, None)
+        self._counts[index] -= 1
+
+    def _maybe_rebalance(self, now: float):
+        fair = len(self._owner) / self.shards
+        if fair >= REBALANCE_MIN_ALARMS and max(self._counts) > REBALANCE_FACTOR * fair:
+            self.rebalances += 1
+            self.load(list(self._alarms.values()), now)
+
+    def on_alarm_event(self, event: str, payload):
+        """AlarmManager listener keeping the shards in step with mutations"""
+        if event in ('created', 'updated'):
+            self.schedule(payload)
+        elif event == 'imported':
+            self.schedule_many(payload)
+        elif event == 'deleted':
+            self.unschedule(payload.id)
+        elif event == 'reloaded':
+            self.load(payload)
+
+    # Firing ------------------------------------------------------------------
+
+    def pop_due(self, now: float = None) -> List[Alarm]:
+        """Return the alarms workers have reported due since the last call"""
+        with self._cond:
+            due_ids, self._ready = self._ready, []
+            self.last_tick = time.time()
+        alarms = self._alarms
+        return [alarms[alarm_id] for alarm_id in due_ids if alarm_id in alarms]
+
+    def wait_for_due(self, timeout: float = None) -> List[Alarm]:
+        """Block until a worker reports due alarms, wake() is called or max_sleep passes"""
+        with self._cond:
+            if not self._ready:
+                self._cond.wait(self.max_sleep if timeout is None else min(timeout, self.max_sleep))
+                self.wakeups += 1
+        return self.pop_due()
+
+    def wake(self):
+        """Wake a thread blocked in wait_for_due"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def next_due_at(self) -> Optional[float]:
+        """Earliest next instant the workers last reported, or now if due alarms are waiting
+
+        Instants already passed are left out: their report is on its way
+        and on_ready or wait_for_due will pick it up.
+        """
+        now = time.time()
+        if self._ready:
+            return now
+        upcoming = [t for t in self._next_at if t is not None and t > now]
+        return min(upcoming, default=None)
+
+    def upcoming(self, limit: int = 10) -> List[Tuple[float, Alarm]]:
+        """Return the next `limit` (fire instant, alarm) pairs across all shards"""
+        merged = []
+        for index in range(len(self._conns)):
+            with self._conn_locks[index]:
+                try:
+                    merged.extend(self._query_upcoming(index, limit))
+                except (BrokenPipeError, EOFError, OSError) as e:
+                    print(f"Scheduler shard {index} is gone: {e}")
+        alarms = self._alarms
+        pairs = [(fire_at, alarms[alarm_id]) for fire_at, alarm_id in merged if alarm_id in alarms]
+        return heapq.nsmallest(limit, pairs, key=lambda pair: pair[0])
+
+    def _query_upcoming(self, index: int, limit: int) -> List[Tuple[float, int]]:
+        """Ask one worker for its next instants, skipping answers to earlier queries (caller holds its lock)"""
+        conn = self._conns[index]
+        query = next(self._queries)
+        conn.send(('upcoming', limit, query))
+        deadline = time.monotonic() + QUERY_TIMEOUT
+        while conn.poll(max(0.0, deadline - time.monotonic())):
+            answered, pairs = conn.recv()
+            if answered == query:
+                return pairs
+        print(f"Scheduler shard {index} did not answer")
+        return []
+
+    # Reporting ---------------------------------------------------------------
+
+    @property
+    def skipped_triggers(self) -> int:
+        return sum(self._skipped)
+
+    def scheduled_count(self) -> int:
+        """Number of alarms assigned to the shards"""
+        return len(self._owner)
+
+    def shard_sizes(self) -> List[int]:
+        return list(self._counts)
+
+    def lateness_report(self) -> Dict:
+        """Summarize how late recent alarms reached this process relative to their instant"""
+        values = [lateness for _, _, lateness in self.lateness_log]
+        return {
+            'count': len(values),
+            'mean': sum(values) / len(values) if values else 0.0,
+            'max': max(values, default=0.0),
+            'last': values[-1] if values else None,
+            'skipped': self.skipped_triggers
+        }
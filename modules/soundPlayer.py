@@ -1,29 +1,115 @@
 """
 Sound Player Module - Handles alarm sound playback
 """
-import os
-import sys
 import platform
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from typing import List, Optional
 
-def play_alarm_sound():
-    """Play alarm sound notification"""
-    try:
-        # Try to use system beep or notification sound
-        system = platform.system()
-        
-        if system == "Windows":
-            # Windows beep
-            import winsound
-            winsound.Beep(1000, 500)  # Frequency 1000Hz, duration 500ms
-            winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
-        elif system == "Darwin":  # macOS
-            os.system('afplay /System/Library/Sounds/Glass.aiff')
-        elif system == "Linux":
-            os.system('paplay /usr/share/sounds/freedesktop/stereo/alarm-clock-elapsed.oga 2>/dev/null || echo -e "\a"')
-        else:
-            # Fallback: print bell character
+
+def _sound_command() -> Optional[List[str]]:
+    """Return the argv used to play the alarm sound without a shell, if a player exists"""
+    system = platform.system()
+    if system == "Darwin":
+        return ['afplay', '/System/Library/Sounds/Glass.aiff']
+    if system == "Linux" and shutil.which('paplay'):
+        return ['paplay', '/usr/share/sounds/freedesktop/stereo/alarm-clock-elapsed.oga']
+    return None
+
+
+class SoundPlayer:
+    """Background alarm sound worker
+
+    request() never blocks: it enqueues onto a bounded queue and returns.
+    The worker drains every request that arrives within coalesce_window
+    and plays them as one sound, and it does not start a second player
+    process while the previous one is still audible. paplay and afplay
+    play one file and exit, so there is no resident player to feed.
+    """
+
+    def __init__(self, max_pending: int = 64, coalesce_window: float = 0.05):
+        self.coalesce_window = coalesce_window
+        self.played = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._command = _sound_command()
+        self._process: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self):
+        """Start the worker thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="alarmo-sound", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the worker and any sound still playing"""
+        self._running = False
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+    def request(self) -> bool:
+        """Ask for the alarm sound; returns False if the queue is full and the request was dropped"""
+        try:
+            self._queue.put_nowait(True)
+            return True
+        except queue.Full:
+            # A full queue already guarantees a sound is about to play
+            self.dropped += 1
+            return False
+
+    def queue_depth(self) -> int:
+        """Number of sound requests waiting for the worker"""
+        return self._queue.qsize()
+
+    def _run(self):
+        """Worker loop: take one request, absorb the rest of the burst, play once"""
+        while self._running:
+            item = self._queue.get()
+            if item is None:
+                break
+            deadline = time.monotonic() + self.coalesce_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    extra = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if extra is None:
+                    self._running = False
+                    break
+                self.coalesced += 1
+            self._play()
+
+    def _play(self):
+        """Play one sound, reusing the player if it is still running"""
+        if self._process is not None and self._process.poll() is None:
+            self.coalesced += 1
+            return
+        self.played += 1
+        try:
+            if self._command is not None:
+                self._process = subprocess.Popen(
+                    self._command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            elif platform.system() == "Windows":
+                import winsound
+                winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
+            else:
+                print('\a')
+        except Exception as e:
             print('\a')
-    except Exception as e:
-        # Fallback: print bell character
-        print('\a')
-        print(f"Could not play sound: {e}")
+            print(f"Could not play sound: {e}")
@@ -0,0 +1,825 @@
+"""
+Storage Module - Pluggable persistence backends for alarms and history
+"""
+import atexit
+import functools
+import json
+import os
+import sqlite3
+import threading
+import weakref
+from typing import Dict, Iterator, List, Optional
+from modules.alarmRecord import Alarm, format_timestamp, parse_timestamp
+from modules.alarmSnapshot import load_snapshot, write_snapshot
+from modules.historyLog import HistoryLog, advisory_lock, entry_tokens, note_tokens
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+HISTORY_PAGE_SIZE = 500
+
+# Durability modes: write through on every mutation, or group-commit per batch window
+DURABILITY_EVERY_OP = 'every_op'
+DURABILITY_BATCHED = 'batched'
+DEFAULT_BATCH_WINDOW = 0.5
+
+
+def _alarm_hook(data: Dict):
+    """json object_hook turning top-level alarm objects into Alarm records"""
+    if 'id' in data and ('hour' in data or 'time' in data):
+        return Alarm.from_dict(data)
+    return data
+
+
+def _flush_at_exit(ref: weakref.ref):
+    """atexit hook flushing a batched storage, unless it was already collected"""
+    storage = ref()
+    if storage is not None:
+        storage.flush()
+
+
+class StorageBackend:
+    """Interface AlarmManager uses to persist alarms and history
+
+    Backends call _changed() after each mutation. With DURABILITY_EVERY_OP
+    that flushes immediately; with DURABILITY_BATCHED mutations collect in
+    memory and one flush per batch_window writes them all.
+
+    With a snapshot_path, full loads first try a binary snapshot tagged
+    with the signature of the source state it was built from, and a load
+    that had to parse the source rebuilds it in the background.
+    """
+
+    def __init__(self, durability: str = DURABILITY_EVERY_OP, batch_window: float = DEFAULT_BATCH_WINDOW,
+                 snapshot_path: Optional[str] = None):
+        if durability not in (DURABILITY_EVERY_OP, DURABILITY_BATCHED):
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.durability = durability
+        self.batch_window = batch_window
+        self.flush_count = 0
+        self._lock = threading.RLock()
+        self._flush_timer: Optional[threading.Timer] = None
+        self.snapshot_path = snapshot_path
+        self._snapshot_signature = None
+        self._snapshot_writer: Optional[threading.Thread] = None
+        self._exit_flush = None
+        if durability == DURABILITY_BATCHED:
+            # Weakly referenced, so the hook never keeps a dropped storage alive until exit
+            self._exit_flush = functools.partial(_flush_at_exit, weakref.ref(self))
+            atexit.register(self._exit_flush)
+
+    def _changed(self):
+        """Flush now or schedule a group commit, depending on durability"""
+        if self.durability == DURABILITY_EVERY_OP:
+            self.flush()
+            return
+        with self._lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.batch_window, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """Write every pending mutation to disk"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._flush_pending():
+                self.flush_count += 1
+
+    def _flush_pending(self) -> bool:
+        """Persist pending mutations, returning True if anything was written"""
+        return False
+
+    def _drop_exit_flush(self):
+        """Unregister the atexit flush once close() has flushed"""
+        if self._exit_flush is not None:
+            atexit.unregister(self._exit_flush)
+            self._exit_flush = None
+
+    def _cached_alarms(self, signature) -> Optional[List[Alarm]]:
+        """Alarms from the snapshot if it was built from the source in this exact state"""
+        if self.snapshot_path is None:
+            return None
+        alarms = load_snapshot(self.snapshot_path, signature)
+        if alarms is not None:
+            self._snapshot_signature = signature
+        return alarms
+
+    def _save_snapshot(self, alarms: List[Alarm], signature, background: bool = True):
+        """Rebuild the snapshot from alarms read from the source in the state `signature` describes"""
+        if self.snapshot_path is None or signature == self._snapshot_signature:
+            return
+        self._snapshot_signature = signature
+        self._join_snapshot_writer()
+
+        def write():
+            try:
+                write_snapshot(self.snapshot_path, alarms, signature)
+            except OSError as e:
+                print(f"Error writing alarm snapshot: {e}")
+        if not background:
+            write()
+            return
+        self._snapshot_writer = threading.Thread(target=write, name="alarmo-snapshot", daemon=True)
+        self._snapshot_writer.start()
+
+    def _join_snapshot_writer(self):
+        if self._snapshot_writer is not None:
+            self._snapshot_writer.join()
+            self._snapshot_writer = None
+
+    def signature(self, blocking: bool = True):
+        """Return (external change count, local change count); either moving means the alarms changed
+
+        With blocking=False, return None rather than wait while a write or
+        flush holds the storage lock.
+        """
+        raise NotImplementedError
+
+    def watch_paths(self) -> List[str]:
+        """Files whose modification by another process may change the stored alarms"""
+        return []
+
+    def load_alarms(self) -> List[Alarm]:
+        """Load every alarm"""
+        raise NotImplementedError
+
+    def allocate_ids(self, count: int = 1) -> int:
+        """Reserve `count` consecutive new alarm IDs, returning the first
+
+        IDs come from a persisted sequence that only moves forward, so an
+        ID is never handed out again, even after its alarm moved to history.
+        """
+        raise NotImplementedError
+
+    def seed_id_sequence(self, floor: int = 0):
+        """Move the sequence past every stored alarm and history ID (and floor)"""
+        raise NotImplementedError
+
+    def insert_alarm(self, alarm: Alarm):
+        """Persist a new alarm"""
+        raise NotImplementedError
+
+    def insert_alarms(self, alarms: List[Alarm]):
+        """Persist many new alarms as one mutation"""
+        raise NotImplementedError
+
+    def update_alarm(self, alarm: Alarm):
+        """Persist changes to an existing alarm"""
+        raise NotImplementedError
+
+    def delete_alarm(self, alarm_id: int, history_entry: Dict):
+        """Remove an alarm and record it in history"""
+        raise NotImplementedError
+
+    def iter_history(self, newest_first: bool = False) -> Iterator[Dict]:
+        """Stream history entries"""
+        raise NotImplementedError
+
+    def search_history(self, text: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Iterator[Dict]:
+        """Stream history entries matching a note/deleted_at filter, newest first"""
+        raise NotImplementedError
+
+    def prepare_history_search(self):
+        """Warm any search index in the background"""
+
+    def compact_history(self, max_entries: Optional[int] = None, background: bool = True):
+        """Compact history, rotating entries beyond max_entries"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any open handles"""
+
+
+class JsonStorage(StorageBackend):
+    """Alarms in a JSON array file, history in an append-only JSONL log
+
+    Several processes may share the files. Reads take a shared fcntl lock
+    and flushes an exclusive one on a sibling .lock file; a flush that
+    finds the file rewritten by someone else re-reads it and applies only
+    this process's pending changes on top instead of overwriting theirs.
+    """
+
+    def __init__(self, db_path: str = "database/alarms.json", history_path: str = "database/history.jsonl",
+                 durability: str = DURABILITY_EVERY_OP, batch_window: float = DEFAULT_BATCH_WINDOW,
+                 snapshot_path: Optional[str] = None):
+        super().__init__(durability, batch_window, snapshot_path)
+        self.db_path = db_path
+        self.lock_path = db_path + ".lock"
+        self.sequence_path = db_path + ".seq"
+        self.history = HistoryLog(history_path, lock_path=self.lock_path)
+        self._records: Dict[int, Alarm] = {}
+        self._max_id = 0
+        self._sequence_unsynced = False
+        self._dirty_ids = set()
+        self._deleted_ids = set()
+        self._disk_signature = None
+        self._stale = True
+        self._external_changes = 0
+        self._generation = 0
+        self._dirty = False
+        self._pending_history: List[Dict] = []
+        self._ensure_file()
+
+    def _ensure_file(self):
+        """Ensure the alarms file exists"""
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        if not os.path.exists(self.db_path):
+            with open(self.db_path, 'w') as f:
+                json.dump([], f)
+
+    def _file_lock(self, exclusive: bool):
+        """Hold an advisory lock shared with other processes using the same file"""
+        return advisory_lock(self.lock_path, exclusive)
+
+    def _stat(self):
+        """Return (inode, mtime_ns, size) of the alarms file, or None if missing"""
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def watch_paths(self) -> List[str]:
+        return [self.db_path]
+
+    def _read_file(self) -> Optional[List[Alarm]]:
+        """Parse the alarms file, or return None if it is half-written"""
+        try:
+            with open(self.db_path, 'r') as f:
+                # Convert each object as it is parsed so the dicts never pile up
+                return json.load(f, object_hook=_alarm_hook)
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError as e:
+            print(f"Error reading alarms file, keeping previous alarms: {e}")
+            return None
+
+    def signature(self, blocking: bool = True):
+        """Return (external change count, local mutation count)
+
+        A file change we did not write ourselves bumps the external count.
+        Pending batched mutations win over external edits until flushed.
+        """
+        if not self._lock.acquire(blocking):
+            return None
+        try:
+            disk = self._stat()
+            if disk != self._disk_signature and not self._dirty:
+                self._disk_signature = disk
+                self._external_changes += 1
+                self._stale = True
+            return (self._external_changes, self._generation)
+        finally:
+            self._lock.release()
+
+    def _refresh(self):
+        """Re-parse the alarms file if it changed since the last load"""
+        self.signature()
+        if not self._stale:
+            return
+        with self._file_lock(exclusive=False):
+            # The file's stat identifies its content; it cannot change while the lock is held
+            disk = self._stat()
+            alarms = self._cached_alarms(list(disk)) if disk is not None else None
+            parsed = alarms is None
+            if parsed:
+                alarms = self._read_file()
+        # Half-written by a program that skips the lock: keep the last good
+        # copy rather than reporting no alarms; its next write changes the stat
+        if alarms is not None:
+            self._records = {a.id: a for a in alarms}
+            self._max_id = max(self._records, default=0)
+            if parsed and disk is not None:
+                self._save_snapshot(alarms, list(disk))
+        self._stale = False
+
+    def _mutated(self):
+        self._generation += 1
+        self._dirty = True
+        self._changed()
+
+    def _flush_pending(self) -> bool:
+        """Sync the ID sequence, append pending history, then atomically replace the alarms file"""
+        if not self._dirty and not self._pending_history and not self._sequence_unsynced:
+            return False
+        with self._file_lock(exclusive=True):
+            if self._sequence_unsynced:
+                # Before history, so a crash can never leave a used ID ahead of the sequence
+                self._sync_sequence()
+            if self._pending_history:
+                self.history.append_many(self._pending_history, sync=True, locked=True)
+                self._pending_history = []
+            if self._dirty:
+                if self._stat() != self._disk_signature:
+                    self._merge_external()
+                tmp_path = self.db_path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump([a.to_dict() for a in self._records.values()], f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.db_path)
+                self._disk_signature = self._stat()
+                self._dirty = False
+                self._dirty_ids.clear()
+                self._deleted_ids.clear()
+        return True
+
+    def _merge_external(self):
+        """Rebase pending local changes onto a file another process rewrote (lock held)"""
+        alarms = self._read_file()
+        if alarms is None:
+            return
+        merged = {a.id: a for a in alarms}
+        for alarm_id in self._deleted_ids:
+            merged.pop(alarm_id, None)
+        for alarm_id in self._dirty_ids:
+            merged[alarm_id] = self._records[alarm_id]
+        self._records = merged
+        self._external_changes += 1
+
+    def load_alarms(self) -> List[Alarm]:
+        with self._lock:
+            self._refresh()
+            return list(self._records.values())
+
+    def _read_sequence(self) -> Optional[int]:
+        """Last allocated ID from the sequence file, or None if there is no usable one"""
+        try:
+            with open(self.sequence_path, 'r') as f:
+                return int(json.load(f)['last_id'])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Error reading ID sequence, rebuilding it: {e}")
+            return None
+
+    def _write_sequence(self, last_id: int):
+        """Replace the sequence file; fsynced now with every-op durability, else at the next flush"""
+        tmp_path = self.sequence_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_id': last_id}, f)
+            if self.durability == DURABILITY_EVERY_OP:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.sequence_path)
+        self._sequence_unsynced = self.durability != DURABILITY_EVERY_OP
+
+    def _sync_sequence(self):
+        try:
+            with open(self.sequence_path, 'rb') as f:
+                os.fsync(f.fileno())
+        except FileNotFoundError:
+            pass
+        self._sequence_unsynced = False
+
+    def allocate_ids(self, count: int = 1) -> int:
+        with self._lock:
+            self._refresh()
+            # The file lock makes the read-increment-write atomic between processes
+            with self._file_lock(exclusive=True):
+                last_id = self._read_sequence()
+                if last_id is None:
+                    last_id = self.history.max_alarm_id()
+                first = max(last_id, self._max_id) + 1
+                self._write_sequence(first + count - 1)
+            return first
+
+    def seed_id_sequence(self, floor: int = 0):
+        with self._lock:
+            self._refresh()
+            with self._file_lock(exclusive=True):
+                last_id = max(self._read_sequence() or 0, self.history.max_alarm_id(), self._max_id, floor)
+                self._write_sequence(last_id)
+
+    def insert_alarm(self, alarm: Alarm):
+        with self._lock:
+            self._refresh()
+            self._records[alarm.id] = alarm
+            self._max_id = max(self._max_id, alarm.id)
+            self._dirty_ids.add(alarm.id)
+            self._mutated()
+
+    def insert_alarms(self, alarms: List[Alarm]):
+        with self._lock:
+            self._refresh()
+            for alarm in alarms:
+                self._records[alarm.id] = alarm
+                self._dirty_ids.add(alarm.id)
+            self._max_id = max(self._max_id, max((a.id for a in alarms), default=0))
+            self._mutated()
+
+    def update_alarm(self, alarm: Alarm):
+        with self._lock:
+            self._refresh()
+            self._records[alarm.id] = alarm
+            self._dirty_ids.add(alarm.id)
+            self._mutated()
+
+    def delete_alarm(self, alarm_id: int, history_entry: Dict):
+        with self._lock:
+            self._refresh()
+            self._pending_history.append(history_entry)
+            self._records.pop(alarm_id, None)
+            self._dirty_ids.discard(alarm_id)
+            self._deleted_ids.add(alarm_id)
+            self._mutated()
+
+    def iter_history(self, newest_first: bool = False) -> Iterator[Dict]:
+        self.flush()
+        return self.history.iter_entries(reverse=newest_first)
+
+    def search_history(self, text: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Iterator[Dict]:
+        self.flush()
+        return self.history.search(text, since, until)
+
+    def prepare_history_search(self):
+        threading.Thread(target=self.history.index.refresh, daemon=True).start()
+
+    def compact_history(self, max_entries: Optional[int] = None, background: bool = True):
+        self.flush()
+        if background:
+            return self.history.compact_in_background(max_entries)
+        return self.history.compact(max_entries)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._drop_exit_flush()
+            # Local writes left the snapshot behind the file; catch it up so the next start skips parsing
+            if self.snapshot_path is not None and not self._stale and not self._dirty:
+                with self._file_lock(exclusive=False):
+                    disk = self._stat()
+                    if disk is not None and disk == self._disk_signature:
+                        self._save_snapshot(list(self._records.values()), list(disk), background=False)
+            self._join_snapshot_writer()
+
+
+class SqliteStorage(StorageBackend):
+    """Alarms and history in an indexed SQLite database running in WAL mode"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS alarms (
+            id INTEGER PRIMARY KEY,
+            hour INTEGER NOT NULL,
+            minute INTEGER NOT NULL,
+            second INTEGER NOT NULL,
+            period TEXT,
+            hour_12 INTEGER,
+            note TEXT,
+            created_at TEXT,
+            active INTEGER NOT NULL DEFAULT 1,
+            time_of_day INTEGER NOT NULL,
+            repeat TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_alarms_active ON alarms(active);
+        CREATE INDEX IF NOT EXISTS idx_alarms_time_of_day ON alarms(time_of_day);
+        CREATE TABLE IF NOT EXISTS history (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            alarm_id INTEGER,
+            note TEXT,
+            deleted_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_deleted_at ON history(deleted_at);
+        -- Note words of each history entry, so text search is a prefix range on the key
+        CREATE TABLE IF NOT EXISTS history_tokens (
+            token TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (token, seq)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS history_archive (
+            seq INTEGER PRIMARY KEY,
+            alarm_id INTEGER,
+            note TEXT,
+            deleted_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS id_sequence (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        -- 'alarms_version' counts every change to alarms, whoever makes it; it tags the binary snapshot
+        INSERT OR IGNORE INTO id_sequence (name, value) VALUES ('alarms_version', 0);
+        CREATE TRIGGER IF NOT EXISTS alarms_version_insert AFTER INSERT ON alarms BEGIN
+            UPDATE id_sequence SET value = value + 1 WHERE name = 'alarms_version';
+        END;
+        CREATE TRIGGER IF NOT EXISTS alarms_version_update AFTER UPDATE ON alarms BEGIN
+            UPDATE id_sequence SET value = value + 1 WHERE name = 'alarms_version';
+        END;
+        CREATE TRIGGER IF NOT EXISTS alarms_version_delete AFTER DELETE ON alarms BEGIN
+            UPDATE id_sequence SET value = value + 1 WHERE name = 'alarms_version';
+        END;
+    """
+
+    COLUMNS = ('id', 'hour', 'minute', 'second', 'period', 'hour_12', 'note', 'created_at', 'active', 'repeat')
+
+    def __init__(self, path: str = "database/alarms.db", durability: str = DURABILITY_EVERY_OP,
+                 batch_window: float = DEFAULT_BATCH_WINDOW, snapshot_path: Optional[str] = None):
+        super().__init__(durability, batch_window, snapshot_path)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._local_changes = 0
+        self._uncommitted = False
+        self._closed = False
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Every-op durability fsyncs each commit; batched relies on one commit per window
+        self._conn.execute("PRAGMA synchronous=FULL" if durability == DURABILITY_EVERY_OP else "PRAGMA synchronous=NORMAL")
+        tokenized = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_tokens'"
+        ).fetchone() is not None
+        self._conn.executescript(self.SCHEMA)
+        if not tokenized:
+            # Databases created before history was tokenized
+            for seq, data in self._conn.execute("SELECT seq, data FROM history").fetchall():
+                self._insert_tokens(seq, json.loads(data))
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(alarms)")}
+        if 'repeat' not in columns:
+            # Databases created before repeat rules existed
+            self._conn.execute("ALTER TABLE alarms ADD COLUMN repeat TEXT")
+        if self._conn.execute("SELECT 1 FROM id_sequence WHERE name = 'alarms'").fetchone() is None:
+            # Databases created before the sequence existed: start past every ID already used
+            self._seed_sequence()
+        self._conn.commit()
+
+    def _seed_sequence(self, floor: int = 0):
+        self._conn.execute(
+            "INSERT INTO id_sequence (name, value) VALUES ('alarms', MAX(?, "
+            "(SELECT COALESCE(MAX(id), 0) FROM alarms), "
+            "(SELECT COALESCE(MAX(alarm_id), 0) FROM history), "
+            "(SELECT COALESCE(MAX(alarm_id), 0) FROM history_archive), "
+            "COALESCE((SELECT value FROM id_sequence WHERE name = 'alarms'), 0))) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (floor,)
+        )
+
+    def _row_to_alarm(self, row) -> Alarm:
+        alarm_id, hour, minute, second, period, hour_12, note, created_at, active, repeat = row
+        epoch = parse_timestamp(created_at)
+        if repeat is None and epoch is not None and hour_12 == (hour % 12 or 12) and period == ("AM" if hour < 12 else "PM"):
+            return Alarm(alarm_id, hour * 3600 + minute * 60 + second, note, epoch, bool(active))
+        alarm = dict(zip(self.COLUMNS, row))
+        alarm['active'] = bool(alarm['active'])
+        if repeat is None:
+            del alarm['repeat']
+        else:
+            alarm['repeat'] = json.loads(repeat)
+        return Alarm.from_dict(alarm)
+
+    @staticmethod
+    def _alarm_params(alarm: Alarm) -> tuple:
+        created_at = alarm.created_at
+        if created_at is not None:
+            created_at = format_timestamp(created_at)
+        elif alarm.extra is not None:
+            created_at = alarm.extra.get('created_at')
+        repeat = None
+        if alarm.extra is not None:
+            # Legacy weekday lists are stored as the equivalent rule
+            rule = alarm.extra.get('repeat') or ({'days': alarm.extra['days']} if alarm.extra.get('days') else None)
+            repeat = json.dumps(rule, separators=(',', ':')) if rule else None
+        return (
+            alarm.hour, alarm.minute, alarm.second, alarm.period, alarm.hour_12,
+            alarm.note, created_at, int(alarm.active), alarm.tod, repeat, alarm.id
+        )
+
+    def _mutated(self):
+        self._local_changes += 1
+        self._uncommitted = True
+        self._changed()
+
+    def _flush_pending(self) -> bool:
+        """Commit the open transaction holding every pending mutation"""
+        if not self._uncommitted:
+            return False
+        self._conn.commit()
+        self._uncommitted = False
+        return True
+
+    def signature(self, blocking: bool = True):
+        """Return (data_version, local change count); data_version moves on other connections' commits"""
+        if not self._lock.acquire(blocking):
+            return None
+        try:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return (data_version, self._local_changes)
+        finally:
+            self._lock.release()
+
+    def watch_paths(self) -> List[str]:
+        # Commits from other connections land in the WAL before a checkpoint
+        return [self.path, self.path + "-wal"]
+
+    def _alarms_signature(self) -> list:
+        """The alarms change counter, plus the inode that tells a restored or replaced database apart"""
+        version = self._conn.execute("SELECT value FROM id_sequence WHERE name = 'alarms_version'").fetchone()[0]
+        return [os.stat(self.path).st_ino, version]
+
+    def _query_alarms(self) -> List[Alarm]:
+        cursor = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM alarms ORDER BY id")
+        return [self._row_to_alarm(row) for row in cursor]
+
+    def load_alarms(self) -> List[Alarm]:
+        with self._lock:
+            # Read before the rows: a commit landing in between leaves the snapshot looking stale, never fresh
+            signature = self._alarms_signature()
+            alarms = self._cached_alarms(signature)
+            if alarms is not None:
+                return alarms
+            alarms = self._query_alarms()
+            # Uncommitted changes could still be lost and their version number reused
+            if not self._uncommitted:
+                self._save_snapshot(alarms, signature)
+            return alarms
+
+    def allocate_ids(self, count: int = 1) -> int:
+        with self._lock:
+            # Also clear any ID a writer without the sequence inserted; MAX(id) is a primary key lookup
+            self._conn.execute(
+                "UPDATE id_sequence SET value = MAX(value, (SELECT COALESCE(MAX(id), 0) FROM alarms)) + ? "
+                "WHERE name = 'alarms'", (count,)
+            )
+            last_id = self._conn.execute("SELECT value FROM id_sequence WHERE name = 'alarms'").fetchone()[0]
+            # Committed together with the insert that uses the IDs
+            self._uncommitted = True
+            return last_id - count + 1
+
+    def seed_id_sequence(self, floor: int = 0):
+        with self._lock:
+            self._seed_sequence(floor)
+            self._uncommitted = True
+            self.flush()
+
+    def insert_alarm(self, alarm: Alarm):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO alarms (hour, minute, second, period, hour_12, note, created_at, active, "
+                "time_of_day, repeat, id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._alarm_params(alarm)
+            )
+            self._mutated()
+
+    def insert_alarms(self, alarms: List[Alarm]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO alarms (hour, minute, second, period, hour_12, note, created_at, active, "
+                "time_of_day, repeat, id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._alarm_params(a) for a in alarms)
+            )
+            self._mutated()
+
+    def update_alarm(self, alarm: Alarm):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE alarms SET hour = ?, minute = ?, second = ?, period = ?, hour_12 = ?, note = ?, "
+                "created_at = ?, active = ?, time_of_day = ?, repeat = ? WHERE id = ?",
+                self._alarm_params(alarm)
+            )
+            self._mutated()
+
+    def delete_alarm(self, alarm_id: int, history_entry: Dict):
+        with self._lock:
+            self._conn.execute("DELETE FROM alarms WHERE id = ?", (alarm_id,))
+            self._insert_history(history_entry)
+            self._mutated()
+
+    def _insert_history(self, entry: Dict):
+        cursor = self._conn.execute(
+            "INSERT INTO history (alarm_id, note, deleted_at, data) VALUES (?, ?, ?, ?)",
+            (entry.get('id'), entry.get('note', entry.get('label')), entry.get('deleted_at'),
+             json.dumps(entry, separators=(',', ':')))
+        )
+        self._insert_tokens(cursor.lastrowid, entry)
+
+    def _insert_tokens(self, seq: int, entry: Dict):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO history_tokens (token, seq) VALUES (?, ?)",
+            [(token, seq) for token in entry_tokens(entry)]
+        )
+
+    def append_history(self, entries: List[Dict]):
+        """Append history entries in one transaction"""
+        with self._lock:
+            for entry in entries:
+                self._insert_history(entry)
+            self._mutated()
+
+    def iter_history(self, newest_first: bool = False) -> Iterator[Dict]:
+        """Stream history in pages so no cursor is held between reads"""
+        order, compare = ("DESC", "<") if newest_first else ("ASC", ">")
+        last_seq = None
+        while True:
+            with self._lock:
+                if last_seq is None:
+                    rows = self._conn.execute(
+                        f"SELECT seq, data FROM history ORDER BY seq {order} LIMIT ?", (HISTORY_PAGE_SIZE,)
+                    ).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        f"SELECT seq, data FROM history WHERE seq {compare} ? ORDER BY seq {order} LIMIT ?",
+                        (last_seq, HISTORY_PAGE_SIZE)
+                    ).fetchall()
+            if not rows:
+                return
+            for seq, data in rows:
+                yield json.loads(data)
+            last_seq = rows[-1][0]
+
+    def search_history(self, text: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Iterator[Dict]:
+        """Page through history newest first, narrowed by the deleted_at index and the note tokens
+
+        Like the JSON backend, `text` matches entries whose note has a word
+        starting with every query word.
+        """
+        conditions = []
+        params = []
+        if since:
+            conditions.append("deleted_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("deleted_at < ?")
+            params.append(until)
+        for word in note_tokens(text or ''):
+            # Every token with this prefix sorts in [word, word + U+10FFFF)
+            conditions.append("seq IN (SELECT seq FROM history_tokens WHERE token >= ? AND token < ?)")
+            params.extend((word, word + '\U0010ffff'))
+        where = " AND ".join(conditions) or "1"
+        last_seq = None
+        while True:
+            page_where = where if last_seq is None else f"{where} AND seq < ?"
+            page_params = params if last_seq is None else params + [last_seq]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT seq, data FROM history WHERE {page_where} ORDER BY seq DESC LIMIT ?",
+                    page_params + [HISTORY_PAGE_SIZE]
+                ).fetchall()
+            if not rows:
+                return
+            for seq, data in rows:
+                yield json.loads(data)
+            last_seq = rows[-1][0]
+
+    def compact_history(self, max_entries: Optional[int] = None, background: bool = True):
+        if background:
+            thread = threading.Thread(target=self.compact_history, args=(max_entries, False), daemon=True)
+            thread.start()
+            return thread
+        self.flush()
+        rotated = 0
+        with self._lock, self._conn:
+            if max_entries is not None:
+                cutoff = self._conn.execute(
+                    "SELECT seq FROM history ORDER BY seq DESC LIMIT 1 OFFSET ?", (max_entries,)
+                ).fetchone()
+                if cutoff:
+                    self._conn.execute(
+                        "INSERT INTO history_archive SELECT * FROM history WHERE seq <= ?", (cutoff[0],)
+                    )
+                    rotated = self._conn.execute("DELETE FROM history WHERE seq <= ?", (cutoff[0],)).rowcount
+                    self._conn.execute("DELETE FROM history_tokens WHERE seq <= ?", (cutoff[0],))
+            kept = self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        return {'kept': kept, 'rotated': rotated}
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._drop_exit_flush()
+            # Local writes left the snapshot behind the table; catch it up so the next start skips the query
+            if self.snapshot_path is not None and self._local_changes:
+                signature = self._alarms_signature()
+                if signature != self._snapshot_signature:
+                    self._save_snapshot(self._query_alarms(), signature, background=False)
+            self._conn.close()
+            self._closed = True
+            self._join_snapshot_writer()
+
+
+def open_storage(db_path: str, history_path: str = "database/history.jsonl",
+                 durability: str = DURABILITY_EVERY_OP, batch_window: float = DEFAULT_BATCH_WINDOW,
+                 snapshot: bool = True) -> StorageBackend:
+    """Pick a backend from the database file extension; with snapshot, cold loads use <db_path>.snap"""
+    snapshot_path = db_path + ".snap" if snapshot else None
+    if db_path.endswith(SQLITE_EXTENSIONS):
+        return SqliteStorage(db_path, durability, batch_window, snapshot_path)
+    return JsonStorage(db_path, history_path, durability, batch_window, snapshot_path)
+
+
+def migrate_json_to_sqlite(json_path: str, history_path: str, sqlite_path: str) -> Dict:
+    """Copy alarms and history from the JSON files into a SQLite database"""
+    source = JsonStorage(json_path, history_path)
+    target = SqliteStorage(sqlite_path)
+    try:
+        alarms = source.load_alarms()
+        target.insert_alarms(alarms)
+        history = list(source.iter_history())
+        target.append_history(history)
+        target.seed_id_sequence(source._read_sequence() or 0)
+        return {'alarms': len(alarms), 'history': len(history)}
+    finally:
+        target.close()
@@ -1,44 +1,427 @@
 """
 Time Utilities Module - Handles time checking and alarm triggering
 """
-from datetime import datetime
-from typing import List, Dict
+import heapq
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Callable, List, Dict, Optional, Tuple
+from modules.alarmColumns import DAY, AlarmColumns
+from modules.alarmRecord import Alarm
+from modules.recurrence import compile_rule, recurrence_for
+
+# What to do with triggers that are later than the catch-up window
+CATCH_UP_FIRE = 'fire'
+CATCH_UP_SKIP = 'skip'
+
+# Alarm sets larger than this are scheduled from columns instead of a heap
+COLUMNAR_THRESHOLD = 50000
+
+# Instants computed at a time for each alarm with a repeat rule
+PRECOMPUTE_OCCURRENCES = 8
+
+
+def next_fire_time(alarm: Alarm, after: float) -> float:
+    """Return the first epoch instant strictly after `after` matching the alarm's time of day"""
+    return _next_time_of_day(alarm.tod, after)
+
+
+def _next_time_of_day(tod: int, after: float) -> float:
+    base = datetime.fromtimestamp(after)
+    candidate = base.replace(hour=tod // 3600, minute=tod // 60 % 60, second=tod % 60, microsecond=0)
+    if candidate.timestamp() <= after:
+        candidate += timedelta(days=1)
+    return candidate.timestamp()
+
+
+def fire_time_function(after: float) -> Callable[[int], float]:
+    """Return a function mapping seconds-of-day to the next instant after `after`
+
+    When neither today nor tomorrow has a DST change, the next instant is
+    just local midnight plus the seconds-of-day.
+    """
+    midnight = datetime.fromtimestamp(after).replace(hour=0, minute=0, second=0, microsecond=0)
+    today, tomorrow, day_after = ((midnight + timedelta(days=d)).timestamp() for d in range(3))
+    if tomorrow - today != DAY or day_after - tomorrow != DAY:
+        return lambda tod: _next_time_of_day(tod, after)
+
+    def fire_at(tod: int) -> float:
+        candidate = today + tod
+        return candidate if candidate > after else tomorrow + tod
+    return fire_at
+
+
+def wall_seconds(epoch: float) -> float:
+    """Local wall-clock seconds since midnight at an epoch instant"""
+    dt = datetime.fromtimestamp(epoch)
+    return dt.hour * 3600 + dt.minute * 60 + dt.second + dt.microsecond / 1e6
+
+
+def wall_window(start: float, end: float) -> Tuple[float, float]:
+    """Return (wall seconds-of-day at start, wall-clock seconds from start to end)
+
+    Across a DST change the wall-clock span differs from end - start; in
+    a repeated hour it can be negative.
+    """
+    start_dt = datetime.fromtimestamp(start)
+    span = (datetime.fromtimestamp(end) - start_dt).total_seconds()
+    return start_dt.hour * 3600 + start_dt.minute * 60 + start_dt.second + start_dt.microsecond / 1e6, span
+
 
 class TimeChecker:
-    def __init__(self):
-        self.triggered_alarms = set()
-    
-    def check_alarms(self, alarms: List[Dict]) -> List[Dict]:
-        """Check if any alarms should be triggered"""
-        current_time = datetime.now()
-        current_hour = current_time.hour
-        current_minute = current_time.minute
-        current_second = current_time.second
-        
+    """Fires alarms at their time of day, on the days their repeat rule allows
+
+    Small alarm sets are kept in a heap of next fire instants. Above
+    COLUMNAR_THRESHOLD alarms (or with columnar=True) the daily ones are
+    kept in AlarmColumns instead, and each pop evaluates the whole window
+    since the previous one with a couple of binary searches, so catch-up
+    after a long gap and looking ahead stay cheap at millions of alarms.
+    Alarms with a repeat rule always live in the heap: each rule is
+    compiled once, and PRECOMPUTE_OCCURRENCES of its instants are queued
+    at a time, so a tick only touches the alarms that are due.
+    """
+
+    def __init__(self, max_sleep: float = 60.0, catch_up_window: float = 3600.0,
+                 catch_up_policy: str = CATCH_UP_FIRE, columnar: Optional[bool] = None):
+        if catch_up_policy not in (CATCH_UP_FIRE, CATCH_UP_SKIP):
+            raise ValueError(f"Unknown catch-up policy: {catch_up_policy}")
+        self.max_sleep = max_sleep
+        self.catch_up_window = catch_up_window
+        self.catch_up_policy = catch_up_policy
+        self.last_tick: Optional[float] = None
+        self.wakeups = 0
+        self.skipped_triggers = 0
+        self.lateness_log = deque(maxlen=1000)
+        # Optional modules.metrics.Metrics receiving a 'trigger_lateness' histogram
+        self.metrics = None
+        self._heap = []
+        self._scheduled = {}
+        # Recurring alarms: compiled rule and precomputed upcoming instants by ID
+        self._rules: Dict[int, Callable[[float], Optional[float]]] = {}
+        self._occurrences: Dict[int, deque] = {}
+        self._cond = threading.Condition()
+        self.columnar = columnar
+        self.columns: Optional[AlarmColumns] = None
+        # Columnar mode: alarms fire in (_window_start, now], but never at or
+        # before the instant they were last (re)scheduled
+        self._window_start: Optional[float] = None
+        self._not_before: Dict[int, float] = {}
+        self._checked = None
+
+    def load(self, alarms: List[Alarm], now: float = None):
+        """Rebuild the fire queue from a full alarm set"""
+        now = time.time() if now is None else now
+        if not isinstance(alarms, (list, tuple)):
+            alarms = list(alarms)
+        use_columns = self.columnar if self.columnar is not None else len(alarms) > COLUMNAR_THRESHOLD
+        columns = None
+        if use_columns:
+            daily = [a for a in alarms if a.extra is None or recurrence_for(a) is None]
+            recurring = [a for a in alarms if a.extra is not None and a.active and recurrence_for(a) is not None]
+            columns = AlarmColumns()
+            columns.load(daily)
+            alarms = recurring
+        fire_at = fire_time_function(now)
+        with self._cond:
+            self.columns = columns
+            self._window_start = now
+            self._not_before = {}
+            self._scheduled = {}
+            self._rules = {}
+            self._occurrences = {}
+            for alarm in alarms:
+                if alarm.active:
+                    first = self._first_fire(alarm, now, fire_at)
+                    if first is not None:
+                        self._scheduled[alarm.id] = (first, alarm)
+            self._heap = [(fire_at, alarm_id) for alarm_id, (fire_at, _) in self._scheduled.items()]
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def schedule(self, alarm: Alarm, now: float = None):
+        """Add or reschedule a single alarm"""
+        now = time.time() if now is None else now
+        with self._cond:
+            self._schedule_one(alarm, now, None)
+            self._compact_heap()
+            self._cond.notify_all()
+
+    def schedule_many(self, alarms: List[Alarm], now: float = None):
+        """Add a batch of alarms with a single wakeup"""
+        now = time.time() if now is None else now
+        next_at = fire_time_function(now)
+        with self._cond:
+            if self.columns is not None:
+                daily = [a for a in alarms if a.extra is None or recurrence_for(a) is None]
+                self.columns.add_many(daily)
+                for alarm in daily:
+                    self._not_before[alarm.id] = now
+                    self._scheduled.pop(alarm.id, None)
+                    self._forget_rule(alarm.id)
+                alarms = [a for a in alarms if a.extra is not None and recurrence_for(a) is not None]
+            for alarm in alarms:
+                self._schedule_one(alarm, now, next_at)
+            self._compact_heap()
+            self._cond.notify_all()
+
+    def _schedule_one(self, alarm: Alarm, now: float, fire_at: Optional[Callable[[int], float]]):
+        """Put one alarm in the columns or the heap (caller holds the lock)"""
+        recurring = alarm.extra is not None and recurrence_for(alarm) is not None
+        if self.columns is not None:
+            if not recurring:
+                self._scheduled.pop(alarm.id, None)
+                self._forget_rule(alarm.id)
+                self.columns.add(alarm)
+                self._not_before[alarm.id] = now
+                return
+            self.columns.remove(alarm.id)
+        first = self._first_fire(alarm, now, fire_at) if alarm.active else None
+        if first is None:
+            self._scheduled.pop(alarm.id, None)
+            self._forget_rule(alarm.id)
+            return
+        self._scheduled[alarm.id] = (first, alarm)
+        heapq.heappush(self._heap, (first, alarm.id))
+
+    def _first_fire(self, alarm: Alarm, now: float, fire_at: Optional[Callable[[int], float]]) -> Optional[float]:
+        """Compile the alarm's rule if it has one and return its first instant after now"""
+        rule = recurrence_for(alarm) if alarm.extra is not None else None
+        if rule is None:
+            self._forget_rule(alarm.id)
+            return fire_at(alarm.tod) if fire_at is not None else next_fire_time(alarm, now)
+        compiled = self._rules[alarm.id] = compile_rule(rule, alarm.tod)
+        # Only the first instant up front; later ones are precomputed as they are consumed
+        first = compiled(now)
+        self._occurrences[alarm.id] = deque(() if first is None else (first,))
+        return first
+
+    def _next_fire(self, alarm: Alarm, after: float) -> Optional[float]:
+        """Next instant strictly after `after`, refilling the alarm's precomputed queue as it drains"""
+        rule = self._rules.get(alarm.id)
+        if rule is None:
+            return next_fire_time(alarm, after)
+        queue = self._occurrences[alarm.id]
+        while queue and queue[0] <= after:
+            queue.popleft()
+        if not queue:
+            instant = after
+            for _ in range(PRECOMPUTE_OCCURRENCES):
+                instant = rule(instant)
+                if instant is None:
+                    break
+                queue.append(instant)
+        return queue[0] if queue else None
+
+    def _forget_rule(self, alarm_id: int):
+        self._rules.pop(alarm_id, None)
+        self._occurrences.pop(alarm_id, None)
+
+    def unschedule(self, alarm_id: int):
+        """Remove an alarm from the fire queue"""
+        with self._cond:
+            if self.columns is not None:
+                self.columns.remove(alarm_id)
+            self._scheduled.pop(alarm_id, None)
+            self._forget_rule(alarm_id)
+            self._compact_heap()
+            self._cond.notify_all()
+
+    def on_alarm_event(self, event: str, payload):
+        """AlarmManager listener keeping the fire queue in step with mutations"""
+        if event in ('created', 'updated'):
+            self.schedule(payload)
+        elif event == 'imported':
+            self.schedule_many(payload)
+        elif event == 'deleted':
+            self.unschedule(payload.id)
+        elif event == 'reloaded':
+            self.load(payload)
+
+    def wake(self):
+        """Wake a thread blocked in wait_for_due"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def next_due_at(self) -> Optional[float]:
+        """Return the epoch instant of the next due alarm, if any"""
+        with self._cond:
+            self._drop_stale()
+            next_at = self._heap[0][0] if self._heap else None
+            if self.columns is not None:
+                start = self._window_start
+                tod = self.columns.next_after(wall_seconds(start))
+                if tod is not None:
+                    column_at = fire_time_function(start)(tod)
+                    next_at = column_at if next_at is None else min(next_at, column_at)
+            return next_at
+
+    def upcoming(self, limit: int = 10) -> List[Tuple[float, Alarm]]:
+        """Return the next `limit` (fire instant, alarm) pairs in firing order"""
+        with self._cond:
+            result = heapq.nsmallest(limit, self._scheduled.values(), key=itemgetter(0))
+            if self.columns is not None:
+                start = self._window_start
+                fire_at = fire_time_function(start)
+                result.extend((fire_at(a.tod), a) for a in self.columns.upcoming(wall_seconds(start), limit))
+                result = heapq.nsmallest(limit, result, key=itemgetter(0))
+            return result
+
+    def pop_due(self, now: float = None) -> List[Alarm]:
+        """Return alarms due in (last_tick, now] and queue their next occurrence
+
+        Triggers missed by catch_up_window or more (suspend, long pauses)
+        fire late or are dropped according to catch_up_policy.
+        """
+        return [alarm for _, alarm in self.pop_due_timed(now)]
+
+    def pop_due_timed(self, now: float = None) -> List[Tuple[float, Alarm]]:
+        """pop_due(), pairing each alarm with the instant it was due"""
+        now = time.time() if now is None else now
+        with self._cond:
+            triggered = self._pop_due_columns(now) if self.columns is not None else []
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, alarm_id = heapq.heappop(self._heap)
+                entry = self._scheduled.get(alarm_id)
+                if entry is None or entry[0] != fire_at:
+                    continue
+                alarm = entry[1]
+                if now - fire_at >= self.catch_up_window and self.catch_up_policy == CATCH_UP_SKIP:
+                    self.skipped_triggers += 1
+                    # A later occurrence inside the catch-up window still fires, as in columnar mode
+                    fire_at = self._next_fire(alarm, now - self.catch_up_window)
+                if fire_at is not None and fire_at <= now:
+                    triggered.append((fire_at, alarm))
+                    self._log_lateness(alarm_id, fire_at, now - fire_at)
+                    next_at = self._next_fire(alarm, now)
+                else:
+                    next_at = fire_at
+                if next_at is None:
+                    # A one-shot or ended rule: nothing left to schedule
+                    del self._scheduled[alarm_id]
+                    self._forget_rule(alarm_id)
+                    continue
+                self._scheduled[alarm_id] = (next_at, alarm)
+                heapq.heappush(self._heap, (next_at, alarm_id))
+            self.last_tick = now
+        return triggered
+
+    def _pop_due_columns(self, now: float) -> List[Tuple[float, Alarm]]:
+        self.last_tick = now
+        start_sod, span = wall_window(self._window_start, now)
+        if span <= 0:
+            # Nothing new, or the clock went back through a repeated hour
+            return []
+        if span > self.catch_up_window and self.catch_up_policy == CATCH_UP_SKIP:
+            late = span - self.catch_up_window
+            self.skipped_triggers += self.columns.count_due(start_sod, late)
+            start_sod, span = (start_sod + late) % DAY, self.catch_up_window
+        if span > DAY:
+            # Each alarm fires at most once per pop, for its latest instant
+            start_sod, span = (start_sod + span - DAY) % DAY, DAY
         triggered = []
-        
-        for alarm in alarms:
-            if not alarm.get('active', True):
+        not_before = self._not_before
+        for offset, alarm in self.columns.due(start_sod, span):
+            fire_at = now - (span - offset)
+            if not_before and not_before.get(alarm.id, 0.0) >= fire_at:
                 continue
-            
-            alarm_id = alarm.get('id')
-            alarm_hour = alarm.get('hour', 0)
-            alarm_minute = alarm.get('minute', 0)
-            alarm_second = alarm.get('second', 0)
-            
-            # Check if alarm time matches current time
-            if (current_hour == alarm_hour and 
-                current_minute == alarm_minute and 
-                current_second == alarm_second):
-                
-                # Only trigger if not already triggered in this second
-                if alarm_id not in self.triggered_alarms:
-                    triggered.append(alarm)
-                    self.triggered_alarms.add(alarm_id)
-            else:
-                # Remove from triggered set if time has passed
-                if alarm_id in self.triggered_alarms:
-                    self.triggered_alarms.discard(alarm_id)
-        
+            triggered.append((fire_at, alarm))
+            self._log_lateness(alarm.id, fire_at, now - fire_at)
+        self._window_start = now
+        self._not_before = {}
+        return triggered
+
+    def _log_lateness(self, alarm_id: int, fire_at: float, lateness: float):
+        self.lateness_log.append((alarm_id, fire_at, lateness))
+        if self.metrics is not None:
+            self.metrics.observe('trigger_lateness', lateness)
+
+    def close(self):
+        """Nothing to release; ShardedScheduler stops its workers here"""
+
+    def scheduled_count(self) -> int:
+        """Number of alarms currently in the fire queue"""
+        return len(self._scheduled) + (len(self.columns) if self.columns is not None else 0)
+
+    def lateness_report(self) -> Dict:
+        """Summarize how late recent alarms fired relative to their scheduled instant"""
+        values = [lateness for _, _, lateness in self.lateness_log]
+        return {
+            'count': len(values),
+            'mean': sum(values) / len(values) if values else 0.0,
+            'max': max(values, default=0.0),
+            'last': values[-1] if values else None,
+            'skipped': self.skipped_triggers
+        }
+
+    def wait_for_due(self, timeout: float = None) -> List[Alarm]:
+        """Sleep until the next alarm is due or the schedule changes, then return due alarms"""
+        with self._cond:
+            triggered = self.pop_due()
+            if triggered:
+                return triggered
+            delay = self.max_sleep if timeout is None else min(timeout, self.max_sleep)
+            next_at = self.next_due_at()
+            if next_at is not None:
+                delay = min(delay, max(0.0, next_at - time.time()))
+            self._cond.wait(delay)
+            self.wakeups += 1
+            return self.pop_due()
+
+    def _drop_stale(self):
+        """Discard heap entries superseded by a reschedule or removal"""
+        while self._heap:
+            fire_at, alarm_id = self._heap[0]
+            entry = self._scheduled.get(alarm_id)
+            if entry is not None and entry[0] == fire_at:
+                return
+            heapq.heappop(self._heap)
+
+    def _compact_heap(self):
+        """Rebuild the heap once stale entries outnumber live ones"""
+        if len(self._heap) > 2 * len(self._scheduled) + 64:
+            self._heap = [(fire_at, alarm_id) for alarm_id, (fire_at, _) in self._scheduled.items()]
+            heapq.heapify(self._heap)
+
+    def check_alarms(self, alarms: List[Alarm], now: float = None) -> List[Alarm]:
+        """Check which alarms fell due in the interval since the previous call"""
+        now = time.time() if now is None else now
+        current = int(now)
+        if self.last_tick is None:
+            start = current - 1
+        elif self.catch_up_policy == CATCH_UP_SKIP:
+            start = max(int(self.last_tick), current - int(self.catch_up_window))
+        else:
+            start = int(self.last_tick)
+        self.last_tick = now
+        if current <= start:
+            return []
+
+        # Evaluate every whole second in (start, current] so a late tick never skips one
+        span = min(current - start, DAY)
+        start = current - span
+        columns, recurring = self._columns_for(alarms)
+        triggered = []
+        for offset, alarm in columns.due(wall_seconds(start), span):
+            triggered.append(alarm)
+            self._log_lateness(alarm.id, start + offset, now - (start + offset))
+        for alarm, rule in recurring:
+            fire_at = rule(start)
+            if fire_at is not None and fire_at <= current:
+                triggered.append(alarm)
+                self._log_lateness(alarm.id, fire_at, now - fire_at)
         return triggered
 
+    def _columns_for(self, alarms: List[Alarm]) -> Tuple[AlarmColumns, List[Tuple[Alarm, Callable]]]:
+        """Columns of daily alarms plus compiled rules of the rest, reused while the same snapshot tuple is passed"""
+        if self._checked is not None and self._checked[0] is alarms:
+            return self._checked[1]
+        daily = [a for a in alarms if a.extra is None or recurrence_for(a) is None]
+        recurring = [(a, compile_rule(recurrence_for(a), a.tod)) for a in alarms
+                     if a.extra is not None and a.active and recurrence_for(a) is not None]
+        columns = AlarmColumns()
+        columns.load(daily)
+        if isinstance(alarms, tuple):
+            self._checked = (alarms, (columns, recurring))
+        return columns, recurring
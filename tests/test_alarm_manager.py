@@ -0,0 +1,98 @@
+import pytest
+
+from modules.alarmManager import AlarmManager
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def open_manager(request, tmp_path):
+    db_path = str(tmp_path / ("alarms.json" if request.param == "json" else "alarms.db"))
+    history_path = str(tmp_path / "history.jsonl")
+    managers = []
+
+    def open_manager():
+        manager = AlarmManager(db_path, history_path)
+        managers.append(manager)
+        return manager
+    yield open_manager
+    for manager in managers:
+        manager.close()
+
+
+def test_repeated_reads_hit_the_cache(open_manager):
+    manager = open_manager()
+    manager.create_alarm(7, 30, 0, 'AM', 'wake')
+    manager.read_alarms()
+    misses = manager.cache_misses
+    hits = manager.cache_hits
+
+    for _ in range(3):
+        assert [a.note for a in manager.read_alarms()] == ['wake']
+    assert manager.cache_misses == misses
+    assert manager.cache_hits == hits + 3
+
+
+def test_another_writer_invalidates_the_cache(open_manager):
+    manager = open_manager()
+    manager.create_alarm(7, 30, 0, 'AM', 'mine')
+    manager.read_alarms()
+    misses = manager.cache_misses
+
+    open_manager().create_alarm(8, 0, 0, 'AM', 'theirs')
+
+    assert sorted(a.note for a in manager.read_alarms()) == ['mine', 'theirs']
+    assert manager.cache_misses == misses + 1
+
+
+def test_invalidate_cache_forces_a_reload(open_manager):
+    manager = open_manager()
+    manager.create_alarm(7, 30, 0, 'AM', 'wake')
+    manager.read_alarms()
+    misses = manager.cache_misses
+
+    manager.invalidate_cache()
+
+    assert len(manager.read_alarms()) == 1
+    assert manager.cache_misses == misses + 1
+    assert manager.cache_stats()['cached']
+
+
+def test_ids_are_never_reused_after_delete(open_manager):
+    manager = open_manager()
+    created = [manager.create_alarm(6 + i, 0, 0, 'AM', f"alarm {i}").id for i in range(3)]
+    assert manager.delete_alarm(created[-1])
+
+    assert manager.create_alarm(10, 0, 0, 'AM', 'next').id == created[-1] + 1
+    manager.delete_alarm(created[-1] + 1)
+    manager.close()
+
+    reopened = open_manager()
+    assert reopened.create_alarm(11, 0, 0, 'AM', 'after restart').id == created[-1] + 2
+    assert [a.id for a in reopened.get_history()] == [created[-1], created[-1] + 1]
+
+
+def test_import_with_a_bad_record_writes_nothing(open_manager):
+    manager = open_manager()
+    records = [
+        {'hour': 7, 'minute': 30, 'period': 'AM', 'note': 'good'},
+        {'hour': 7, 'minute': 75, 'period': 'AM', 'note': 'bad minute'},
+        {'hour': 9, 'minute': 0, 'period': 'PM', 'repeat': {'days': ['Someday']}},
+    ]
+
+    with pytest.raises(ValueError, match="2 invalid record"):
+        manager.import_alarms(records)
+
+    assert manager.read_alarms() == []
+    assert open_manager().read_alarms() == []
+    # Nothing was allocated either
+    assert manager.create_alarm(7, 30, 0, 'AM', 'first').id == 1
+
+
+def test_valid_import_creates_every_record(open_manager):
+    manager = open_manager()
+    created = manager.import_alarms([
+        {'hour': 7, 'minute': 30, 'period': 'AM', 'note': 'one'},
+        {'hour_12': 9, 'minute': 0, 'period': 'pm', 'note': 'two', 'repeat': {'days': ['Sat']}},
+    ])
+
+    assert [a.id for a in created] == [1, 2]
+    assert sorted(a.note for a in open_manager().read_alarms()) == ['one', 'two']
@@ -0,0 +1,42 @@
+import pytest
+
+from modules.alarmRecord import Alarm
+
+CURRENT = {'id': 2, 'hour': 22, 'minute': 47, 'second': 5, 'period': 'PM', 'hour_12': 10,
+           'note': 'study', 'created_at': '2025-12-08T10:46:01.046830', 'active': True}
+
+
+@pytest.mark.parametrize("entry", [
+    CURRENT,
+    dict(CURRENT, hour=0, period='AM', hour_12=12, active=False),
+    dict(CURRENT, repeat={'days': ['Mon', 'Fri']}),
+    dict(CURRENT, deleted_at='2025-12-14T22:14:31.812780'),
+    dict(CURRENT, created_at='2025-12-08T10:46:01'),
+    dict(CURRENT, created_at='yesterday'),
+    {'id': 1, 'time': '07:30', 'days': ['Mon', 'Tue', 'Wed'], 'label': 'Daily Morning Routine', 'active': True,
+     'deleted_at': '2025-12-08T10:46:07.031813'},
+    {'id': 3, 'time': '18:05', 'label': '', 'active': False},
+])
+def test_dict_round_trip_is_lossless(entry):
+    assert Alarm.from_dict(entry).to_dict() == entry
+
+
+def test_current_schema_fields():
+    alarm = Alarm.from_dict(CURRENT)
+    assert (alarm.id, alarm.tod, alarm.note, alarm.active) == (2, 22 * 3600 + 47 * 60 + 5, 'study', True)
+    assert not alarm.legacy
+
+
+def test_legacy_entry_reads_time_and_label():
+    alarm = Alarm.from_dict({'id': 1, 'time': '07:30', 'days': ['Mon'], 'label': 'Routine', 'active': True})
+    assert alarm.legacy
+    assert alarm.tod == 7 * 3600 + 30 * 60
+    assert alarm.note == 'Routine'
+
+
+def test_replace_keeps_other_fields():
+    alarm = Alarm.from_dict(CURRENT)
+    changed = alarm.replace(note='new')
+    assert changed.note == 'new'
+    assert changed.to_dict() == dict(CURRENT, note='new')
+    assert alarm.note == 'study'
@@ -0,0 +1,70 @@
+import json
+import sqlite3
+
+import pytest
+
+from modules.alarmRecord import Alarm
+from modules.alarmSnapshot import SnapshotAlarm, load_snapshot, write_snapshot
+from modules.storage import open_storage
+
+ALARMS = [
+    Alarm(1, 7 * 3600, 'wake', 1765000000.5, True),
+    Alarm(2, 13 * 3600 + 5, 'lunch ☕', None, False),
+    Alarm(3, 23 * 3600, '', 1765000100.0, True, {'repeat': {'days': ['Mon']}}),
+    Alarm(4, 6 * 3600 + 1800, 'legacy', None, True, {'days': ['Tue']}, legacy=True),
+]
+
+
+def test_matching_signature_loads_every_field(tmp_path):
+    path = str(tmp_path / "alarms.snap")
+    write_snapshot(path, ALARMS, [1, 2, 3])
+
+    loaded = load_snapshot(path, [1, 2, 3])
+
+    assert all(isinstance(alarm, SnapshotAlarm) for alarm in loaded)
+    assert [a.to_dict() for a in loaded] == [a.to_dict() for a in ALARMS]
+
+
+def test_other_signature_or_missing_file_is_a_miss(tmp_path):
+    path = str(tmp_path / "alarms.snap")
+    assert load_snapshot(path, [1]) is None
+    write_snapshot(path, ALARMS, [1, 2, 3])
+    assert load_snapshot(path, [1, 2, 4]) is None
+
+
+def test_truncated_file_is_a_miss(tmp_path):
+    path = tmp_path / "alarms.snap"
+    write_snapshot(str(path), ALARMS, [1])
+    path.write_bytes(path.read_bytes()[:-3])
+    assert load_snapshot(str(path), [1]) is None
+
+
+@pytest.mark.parametrize("name", ["alarms.json", "alarms.db"])
+def test_storage_cold_load_uses_the_snapshot_until_the_source_changes(tmp_path, name):
+    db_path = str(tmp_path / name)
+    history_path = str(tmp_path / "history.jsonl")
+    storage = open_storage(db_path, history_path)
+    storage.insert_alarms(ALARMS[:2])
+    # Closing after local changes leaves a current snapshot behind
+    storage.close()
+
+    storage = open_storage(db_path, history_path)
+    loaded = storage.load_alarms()
+    assert all(isinstance(a, SnapshotAlarm) for a in loaded)
+    assert [a.to_dict() for a in loaded] == [a.to_dict() for a in ALARMS[:2]]
+    storage.close()
+
+    # Another program edits the source without touching the snapshot
+    if name.endswith(".json"):
+        with open(db_path, 'w') as f:
+            json.dump([ALARMS[0].replace(note='edited').to_dict()], f)
+    else:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE alarms SET note = 'edited' WHERE id = 1")
+        conn.close()
+
+    storage = open_storage(db_path, history_path)
+    loaded = storage.load_alarms()
+    assert not any(isinstance(a, SnapshotAlarm) for a in loaded)
+    assert loaded[0].note == 'edited'
+    storage.close()
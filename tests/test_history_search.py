@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from modules.storage import JsonStorage, SqliteStorage
+
+NOTES = ["stand-up meeting", "grandstand tickets", "Plan ANother", "banana", "standing desk",
+         "an apple", "Café crème", "snake_case note"]
+ENTRIES = [{'id': i, 'note': note, 'deleted_at': f"2026-01-{i:02d}T10:00:00"} for i, note in enumerate(NOTES, 1)]
+ENTRIES.append({'id': 50, 'time': '07:30', 'label': 'Legacy Label', 'deleted_at': '2026-02-01T00:00:00'})
+
+
+@pytest.fixture
+def backends(tmp_path):
+    json_storage = JsonStorage(str(tmp_path / "alarms.json"), str(tmp_path / "history.jsonl"))
+    json_storage.history.append_many(ENTRIES)
+    sqlite_storage = SqliteStorage(str(tmp_path / "alarms.db"))
+    sqlite_storage.append_history(ENTRIES)
+    yield json_storage, sqlite_storage
+    json_storage.close()
+    sqlite_storage.close()
+
+
+def ids(entries):
+    return [entry['id'] for entry in entries]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("an", [6, 3]),
+    ("stand", [5, 1]),
+    ("Stand up", [1]),
+    ("caf", [7]),
+    ("snake_case", [8]),
+    ("leg", [50]),
+    ("zz", []),
+    ("", [50, 8, 7, 6, 5, 4, 3, 2, 1]),
+])
+def test_text_matches_word_prefixes_on_both_backends(backends, text, expected):
+    for storage in backends:
+        assert ids(storage.search_history(text)) == expected
+
+
+def test_date_range_combines_with_text(backends):
+    for storage in backends:
+        assert ids(storage.search_history("stand", since="2026-01-02", until="2026-01-06")) == [5]
+        assert ids(storage.search_history(since="2026-01-08")) == [50, 8]
+
+
+def test_sqlite_text_search_uses_the_token_index(backends):
+    _, sqlite_storage = backends
+    plan = sqlite_storage._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT seq, data FROM history "
+        "WHERE seq IN (SELECT seq FROM history_tokens WHERE token >= ? AND token < ?) ORDER BY seq DESC",
+        ("stand", "stand\U0010ffff")
+    ).fetchall()
+    assert not any(row[3].startswith("SCAN history") for row in plan)
+
+
+def test_sqlite_tokenizes_history_written_before_the_token_table(tmp_path):
+    path = str(tmp_path / "alarms.db")
+    storage = SqliteStorage(path)
+    storage.append_history(ENTRIES)
+    storage._conn.execute("DROP TABLE history_tokens")
+    storage._conn.commit()
+    storage.close()
+
+    storage = SqliteStorage(path)
+    try:
+        assert ids(storage.search_history("stand")) == [5, 1]
+    finally:
+        storage.close()
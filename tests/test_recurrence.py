@@ -0,0 +1,85 @@
+import os
+import time
+from datetime import date, datetime
+
+import pytest
+
+from modules.alarmRecord import Alarm
+from modules.recurrence import compile_rule, parse_repeat
+from modules.timeUtils import TimeChecker, next_fire_time
+
+SEVEN_THIRTY = 7 * 3600 + 30 * 60
+
+
+@pytest.fixture
+def new_york():
+    """Local time with US daylight saving: 2026-03-08 springs forward, 2026-11-01 falls back"""
+    if not hasattr(time, 'tzset'):
+        pytest.skip("time.tzset is not available")
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = 'America/New_York'
+    time.tzset()
+    try:
+        if time.tzname != ('EST', 'EDT'):
+            pytest.skip("no zoneinfo for America/New_York")
+        yield
+    finally:
+        if previous is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = previous
+        time.tzset()
+
+
+def at(*args) -> float:
+    return datetime(*args).timestamp()
+
+
+def occurrences(rule, tod, after, count):
+    next_occurrence = compile_rule(rule, tod)
+    result = []
+    for _ in range(count):
+        after = next_occurrence(after)
+        result.append(datetime.fromtimestamp(after))
+    return result
+
+
+def test_daily_rule_keeps_wall_clock_time_across_spring_forward(new_york):
+    rule = parse_repeat({'every': 1, 'start': '2026-03-01'})
+    fired = occurrences(rule, SEVEN_THIRTY, at(2026, 3, 7, 8, 0), 2)
+    assert fired == [datetime(2026, 3, 8, 7, 30), datetime(2026, 3, 9, 7, 30)]
+    # The day DST starts is an hour short
+    assert at(2026, 3, 8, 7, 30) - at(2026, 3, 7, 7, 30) == 23 * 3600
+
+
+def test_weekday_rule_across_fall_back(new_york):
+    rule = parse_repeat({'days': ['Sat', 'Sun']}, date(2026, 10, 1))
+    fired = occurrences(rule, SEVEN_THIRTY, at(2026, 10, 30, 12, 0), 3)
+    assert fired == [datetime(2026, 10, 31, 7, 30), datetime(2026, 11, 1, 7, 30), datetime(2026, 11, 7, 7, 30)]
+    assert at(2026, 11, 1, 7, 30) - at(2026, 10, 31, 7, 30) == 25 * 3600
+
+
+def test_interval_rule_counts_calendar_days_not_elapsed_hours(new_york):
+    rule = parse_repeat({'every': 2, 'start': '2026-03-06', 'skip': ['2026-03-10'], 'until': '2026-03-14'})
+    fired = occurrences(rule, SEVEN_THIRTY, at(2026, 3, 6, 0, 0), 4)
+    assert fired == [datetime(2026, 3, 6, 7, 30), datetime(2026, 3, 8, 7, 30),
+                     datetime(2026, 3, 12, 7, 30), datetime(2026, 3, 14, 7, 30)]
+    assert compile_rule(rule, SEVEN_THIRTY)(at(2026, 3, 14, 8, 0)) is None
+
+
+def test_one_shot_date(new_york):
+    next_occurrence = compile_rule(parse_repeat({'date': '2026-11-01'}), 90 * 60)
+    assert datetime.fromtimestamp(next_occurrence(at(2026, 10, 31, 0, 0))) == datetime(2026, 11, 1, 1, 30)
+    assert next_occurrence(at(2026, 11, 1, 12, 0)) is None
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_scheduler_fires_daily_alarm_at_local_time_across_dst(new_york, columnar):
+    alarm = Alarm(1, SEVEN_THIRTY, 'wake', None, True)
+    assert datetime.fromtimestamp(next_fire_time(alarm, at(2026, 3, 7, 8, 0))) == datetime(2026, 3, 8, 7, 30)
+
+    checker = TimeChecker(columnar=columnar)
+    checker.load([alarm], now=at(2026, 10, 31, 8, 0))
+    assert checker.pop_due(at(2026, 11, 1, 7, 29)) == []
+    assert checker.pop_due(at(2026, 11, 1, 7, 31)) == [alarm]
+    assert checker.next_due_at() == at(2026, 11, 2, 7, 30)
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pytest
+
+from modules.alarmRecord import Alarm
+from modules.timeUtils import CATCH_UP_FIRE, CATCH_UP_SKIP, TimeChecker
+
+
+def at(*args) -> float:
+    return datetime(*args).timestamp()
+
+
+def alarm(alarm_id: int, hour: int, minute: int, extra=None) -> Alarm:
+    return Alarm(alarm_id, hour * 3600 + minute * 60, f"alarm {alarm_id}", None, True, extra)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize("policy", [CATCH_UP_FIRE, CATCH_UP_SKIP])
+def test_occurrence_inside_catch_up_window_fires_after_a_long_gap(columnar, policy):
+    checker = TimeChecker(catch_up_policy=policy, columnar=columnar)
+    checker.load([alarm(1, 9, 30)], now=at(2026, 6, 10, 9, 0))
+
+    fired = checker.pop_due(at(2026, 6, 11, 9, 45))
+
+    assert [a.id for a in fired] == [1]
+    assert checker.skipped_triggers == (1 if policy == CATCH_UP_SKIP else 0)
+    assert checker.next_due_at() == at(2026, 6, 12, 9, 30)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_skip_policy_drops_triggers_older_than_the_window(columnar):
+    checker = TimeChecker(catch_up_policy=CATCH_UP_SKIP, columnar=columnar)
+    checker.load([alarm(1, 9, 30), alarm(2, 11, 30)], now=at(2026, 6, 10, 9, 0))
+
+    assert checker.pop_due(at(2026, 6, 10, 12, 0)) == [alarm(2, 11, 30)]
+    assert checker.skipped_triggers == 1
+    assert checker.pop_due(at(2026, 6, 10, 12, 1)) == []
+
+
+@pytest.mark.parametrize("policy", [CATCH_UP_FIRE, CATCH_UP_SKIP])
+def test_heap_and_columnar_fire_the_same_alarms(policy):
+    alarms = [alarm(i, i % 24, (i * 7) % 60) for i in range(1, 200)]
+    alarms.append(alarm(500, 8, 15, {'repeat': {'days': ['Wed']}}))
+    start = at(2026, 6, 10, 0, 0)
+    ticks = [start + seconds for seconds in (600, 3600, 3 * 3600, 9 * 3600, 20 * 3600, 30 * 3600, 80 * 3600)]
+    fired = {}
+    for columnar in (False, True):
+        checker = TimeChecker(catch_up_policy=policy, columnar=columnar)
+        checker.load(alarms, now=start)
+        fired[columnar] = [sorted(a.id for a in checker.pop_due(now)) for now in ticks]
+    assert fired[False] == fired[True]